@@ -0,0 +1,656 @@
+"""Benchmarks for the JukeBox library layer.
+
+Run all of them with ``python benchmarks.py`` or pick some by name,
+e.g. ``python benchmarks.py journal``.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from sqlite_backend import SQLiteBackend
+from track_library import StorageBackend, Track, TrackLibrary
+
+
+def make_words(count, seed=7):
+    """A reproducible vocabulary of pronounceable made-up words"""
+    rng = random.Random(seed)
+    syllables = [c + v for c in "bdghklmnprstvy" for v in "aeiou"]
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choice(syllables) for _ in range(rng.randint(1, 4))))
+    return sorted(words)
+
+
+WORDS = make_words(20000)
+
+
+def make_tracks(count):
+    """Build a synthetic catalog of ``count`` tracks keyed by ID"""
+    rng = random.Random(count)
+    return {
+        str(i).zfill(2): Track(
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).title(),
+            f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}",
+            f"https://youtu.be/{i:011d}",
+            i % 97,
+            i % 6
+        )
+        for i in range(1, count + 1)
+    }
+
+
+def bench_journal(sizes=(1000, 10000, 100000), edits=50):
+    """Cost of a single play-count bump: full rewrite vs journal append"""
+    print("journal: per-mutation write latency")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            for journal in (False, True):
+                library = TrackLibrary(
+                    path=os.path.join(tmp, f"library-{journal}.json"),
+                    journal=journal,
+                    compact_every=edits + 1
+                )
+                library.tracks = make_tracks(size)
+                library.save_to_file()
+
+                start = time.perf_counter()
+                for _ in range(edits):
+                    library.record_play('01')
+                elapsed = time.perf_counter() - start
+                library.close()
+
+                mode = "journal" if journal else "rewrite"
+                print(f"  {size:>8} tracks  {mode:<8} {elapsed / edits * 1e6:12.1f} us/write")
+
+
+def bench_startup(sizes=(1000, 10000, 100000)):
+    """Time to open a library and look one track up: JSON vs SQLite"""
+    print("startup: open + first lookup")
+    for size in sizes:
+        tracks = make_tracks(size)
+        with tempfile.TemporaryDirectory() as tmp:
+            backends = {
+                'json': lambda: None,
+                'sqlite': lambda: SQLiteBackend(os.path.join(tmp, 'library.db')),
+            }
+            for name, make_backend in backends.items():
+                library = TrackLibrary(path=os.path.join(tmp, 'library.json'), backend=make_backend())
+                library.load_from_file()
+                library.tracks = tracks
+                library.save_to_file()
+                library.close()
+
+                start = time.perf_counter()
+                library = TrackLibrary(path=os.path.join(tmp, 'library.json'), backend=make_backend())
+                library.load_from_file()
+                library.get_track(str(size // 2).zfill(2))
+                elapsed = time.perf_counter() - start
+                library.close()
+                print(f"  {size:>8} tracks  {name:<8} {elapsed * 1e3:10.2f} ms")
+
+
+def bench_first_page(sizes=(1000, 10000, 100000), chunk_size=500):
+    """Time until the first chunk of a background load is available"""
+    print("first page: background load vs blocking load_from_file")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'library.json')
+            library = TrackLibrary(path=path)
+            library.tracks = make_tracks(size)
+            library.save_to_file()
+
+            start = time.perf_counter()
+            TrackLibrary(path=path).load_from_file()
+            blocking = time.perf_counter() - start
+
+            library = TrackLibrary(path=path)
+            start = time.perf_counter()
+            chunks = library.load_in_background(chunk_size)
+            library.merge_loaded(chunks.get())
+            first = time.perf_counter() - start
+            while chunks.get() is not None:
+                pass
+
+            print(f"  {size:>8} tracks  first page {first * 1e3:8.2f} ms   full load {blocking * 1e3:8.2f} ms")
+
+
+def bench_treeview(sizes=(1000, 10000, 100000)):
+    """Refresh latency of the main track list: full rebuild vs virtual list"""
+    import tkinter as tk
+    from tkinter import ttk
+    from virtual_list import VirtualTrackList
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"treeview: skipped, no display ({e})")
+        return
+    columns = ('Track', 'Artist', 'Rating', 'Play Count')
+    print("treeview: refresh latency")
+    for size in sizes:
+        tracks = make_tracks(size)
+
+        def row_values(track_id):
+            track = tracks[track_id]
+            return (track.name, track.artist, track.rating, track.play_count)
+
+        tree = ttk.Treeview(root, columns=columns, show='headings')
+        start = time.perf_counter()
+        for item in tree.get_children():
+            tree.delete(item)
+        for track_id in tracks:
+            tree.insert('', 'end', values=row_values(track_id), tags=(track_id,))
+        root.update()
+        rebuild = time.perf_counter() - start
+        tree.destroy()
+
+        virtual = VirtualTrackList(root, columns, row_values)
+        start = time.perf_counter()
+        virtual.set_rows(tracks)
+        root.update()
+        full = time.perf_counter() - start
+
+        start = time.perf_counter()
+        virtual.refresh_row('01')
+        root.update()
+        single = time.perf_counter() - start
+        virtual.tree.destroy()
+        virtual.scrollbar.destroy()
+
+        print(f"  {size:>8} tracks  rebuild {rebuild * 1e3:9.2f} ms   "
+              f"virtual {full * 1e3:7.2f} ms   one row {single * 1e3:6.2f} ms")
+    root.destroy()
+
+
+def bench_search(sizes=(10000, 100000), queries=("ka", "kame", "baru to", "xyz")):
+    """Indexed search vs the linear scan it replaced, and SQLite's token table"""
+    from search_index import SearchIndex
+
+    print("search: per-query latency")
+    for size in sizes:
+        tracks = make_tracks(size)
+        start = time.perf_counter()
+        index = SearchIndex()
+        for track_id, track in tracks.items():
+            index.add(track_id, track)
+        build = time.perf_counter() - start
+        print(f"  {size:>8} tracks  index build {build * 1e3:.0f} ms")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            backend = SQLiteBackend(os.path.join(tmp, 'library.db'))
+            backend.load()
+            backend.replace(tracks)
+            for query in queries:
+                start = time.perf_counter()
+                hits = index.search(query, limit=50)
+                indexed = time.perf_counter() - start
+
+                start = time.perf_counter()
+                backend.search(query)
+                sqlite = time.perf_counter() - start
+
+                start = time.perf_counter()
+                q = query.lower()
+                [i for i, t in tracks.items() if q in t.name.lower() or q in t.artist.lower()]
+                linear = time.perf_counter() - start
+                print(f"    {query!r:<12} indexed {indexed * 1e3:8.3f} ms   sqlite {sqlite * 1e3:8.2f} ms   "
+                      f"linear {linear * 1e3:8.2f} ms   ({len(hits)} shown)")
+            backend.close()
+
+
+def bench_fuzzy(sizes=(10000, 100000), typos=("kamerau", "sanatuvo kame", "bdu")):
+    """Trigram-filtered fuzzy search vs a brute-force edit-distance scan"""
+    from search_index import SearchIndex, fuzzy_scan
+
+    print("fuzzy: per-query latency")
+    for size in sizes:
+        tracks = make_tracks(size)
+        index = SearchIndex()
+        for track_id, track in tracks.items():
+            index.add(track_id, track)
+
+        for query in typos:
+            start = time.perf_counter()
+            hits = index.fuzzy_search(query, limit=10)
+            indexed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            fuzzy_scan(query, tracks.items(), limit=10)
+            brute = time.perf_counter() - start
+            print(f"  {size:>8} tracks  {query!r:<16} indexed {indexed * 1e3:6.2f} ms   "
+                  f"brute force {brute * 1e3:9.1f} ms   ({len(hits)} hits)")
+
+
+def bench_import(sizes=(10000, 100000)):
+    """Bulk CSV import vs adding the same tracks one at a time"""
+    import csv
+    from importer import import_file
+
+    print("import: CSV into a journaled library")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, 'tracks.csv')
+            with open(source, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(('name', 'artist', 'youtube_url', 'rating'))
+                for track in make_tracks(size).values():
+                    writer.writerow((track.name, track.artist, track.youtube_url, track.rating))
+
+            library = TrackLibrary(path=os.path.join(tmp, 'bulk.json'), journal=True)
+            start = time.perf_counter()
+            report = import_file(library, source)
+            bulk = time.perf_counter() - start
+            library.close()
+
+            # One add_track per row, capped so the slow path finishes
+            sample = list(make_tracks(size).values())[:2000]
+            library = TrackLibrary(path=os.path.join(tmp, 'single.json'), journal=True)
+            start = time.perf_counter()
+            for track in sample:
+                library.add_new_track(track)
+            single = (time.perf_counter() - start) / len(sample) * size
+            library.close()
+            print(f"  {size:>8} tracks  bulk {bulk:7.2f} s   one at a time ~{single:8.1f} s (extrapolated)   ({report})")
+
+
+def bench_export(sizes=(10000, 100000, 1000000)):
+    """Bytes and seconds per export format vs the indented snapshot"""
+    from exporter import WRITERS, export_tracks
+
+    print("export: size and time per format")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            if size <= 100000:
+                # The snapshot needs the whole catalog in memory
+                library = TrackLibrary(path=os.path.join(tmp, 'library.json'))
+                library.tracks = make_tracks(size)
+                start = time.perf_counter()
+                library.save_to_file()
+                elapsed = time.perf_counter() - start
+                print(f"  {size:>8} tracks  {'snapshot':<8} {os.path.getsize(library.backend.path) / 1e6:9.1f} MB "
+                      f"{elapsed:8.2f} s")
+                del library
+            # Cycle a pool of tracks under fresh IDs so 1M rows need no more
+            # memory than 10k and generating them costs next to nothing.
+            pool = list(make_tracks(10000).values())
+            for fmt in WRITERS:
+                path = os.path.join(tmp, f'export.{fmt}')
+                items = ((str(i).zfill(2), pool[i % len(pool)]) for i in range(1, size + 1))
+                start = time.perf_counter()
+                export_tracks(items, path, fmt)
+                elapsed = time.perf_counter() - start
+                print(f"  {size:>8} tracks  {fmt:<8} {os.path.getsize(path) / 1e6:9.1f} MB "
+                      f"{elapsed:8.2f} s")
+
+
+def bench_memory(sizes=(100000, 1000000)):
+    """Bytes per track loaded from JSON: plain objects vs slotted Track"""
+    import json
+    import tracemalloc
+    from search_index import fold_text
+
+    class DictTrack:
+        # Track's layout before __slots__ and artist interning
+        def __init__(self, name, artist, youtube_url, play_count=0, rating=0):
+            self.name = name
+            self.name_key = fold_text(name)
+            self.artist = artist
+            self.artist_key = fold_text(artist)
+            self.youtube_url = youtube_url
+            self.play_count = play_count
+            self.rating = rating
+
+    print("memory: traced bytes per track after parsing a snapshot")
+    for size in sizes:
+        # Parse from JSON text so every string is a fresh object, as on
+        # load; about ten tracks per artist, like a real collection.
+        records = [track.to_dict() for track in make_tracks(min(size, 100000)).values()]
+        artists = [record['artist'] for record in records[:size // 10]]
+        data = json.dumps({
+            str(i).zfill(2): dict(records[i % len(records)], artist=artists[i % len(artists)])
+            for i in range(1, size + 1)
+        })
+        del records, artists
+        for name, cls in (('plain', DictTrack), ('Track', Track)):
+            tracemalloc.start()
+            loaded = {k: cls(v['name'], v['artist'], v['youtube_url'], v['play_count'], v['rating'])
+                      for k, v in json.loads(data).items()}
+            used = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            sample = next(iter(loaded.values()))
+            overhead = sys.getsizeof(sample)
+            if hasattr(sample, '__dict__'):
+                overhead += sys.getsizeof(sample.__dict__)
+            print(f"  {size:>8} tracks  {name:<6} {used / size:7.0f} bytes/track   "
+                  f"(object itself {overhead} bytes)")
+            del loaded
+
+
+def bench_artist(sizes=(10000, 100000)):
+    """Artist lookup and sort: registry vs scanning the catalog"""
+    print("artist: lookup and sort")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            library = TrackLibrary(path=os.path.join(tmp, 'library.json'))
+            tracks = make_tracks(size)
+            # About ten tracks per artist
+            artists = [track.artist for track in list(tracks.values())[:size // 10]]
+            for i, track in enumerate(tracks.values()):
+                track.artist = artists[i % len(artists)]
+            library.tracks = tracks
+            artist = artists[len(artists) // 2]
+
+            start = time.perf_counter()
+            hits = library.tracks_by_artist(artist)
+            indexed = time.perf_counter() - start
+            start = time.perf_counter()
+            StorageBackend.tracks_by_artist(library.backend, artist)
+            scan = time.perf_counter() - start
+
+            start = time.perf_counter()
+            library.sorted_ids('artist')
+            registry_sort = time.perf_counter() - start
+            start = time.perf_counter()
+            sorted(tracks, key=lambda track_id: tracks[track_id].artist_key)
+            full_sort = time.perf_counter() - start
+            print(f"  {size:>8} tracks  by artist {indexed * 1e3:7.3f} ms (scan {scan * 1e3:7.2f} ms, {len(hits)} hits)   "
+                  f"sort {registry_sort * 1e3:7.2f} ms (full sort {full_sort * 1e3:7.2f} ms)")
+
+
+def bench_sort(sizes=(10000, 100000, 1000000), bumps=200):
+    """Keeping the list sorted by play count: sort index vs re-sorting"""
+    from sort_index import SortIndex
+
+    print("sort: re-sort after a play-count bump")
+    for size in sizes:
+        tracks = make_tracks(min(size, 100000))
+        pool = list(tracks.values())
+        tracks = {str(i).zfill(2): pool[i % len(pool)] for i in range(size)}
+        index = SortIndex('play_count')
+        start = time.perf_counter()
+        for track_id, track in tracks.items():
+            index.add(track_id, track)
+        index.merge_pending()
+        view = index.view(reverse=True)
+        view[:25]
+        build = time.perf_counter() - start
+
+        class Bumped:
+            play_count = 0
+        ids = list(tracks)
+        start = time.perf_counter()
+        for i in range(bumps):
+            Bumped.play_count = i + 1000
+            index.add(ids[i * 7919 % size], Bumped)
+            index.merge_pending()
+            view[:25]
+        indexed = (time.perf_counter() - start) / bumps
+
+        start = time.perf_counter()
+        sorted(tracks, key=lambda track_id: tracks[track_id].play_count, reverse=True)[:25]
+        full = time.perf_counter() - start
+        print(f"  {size:>8} tracks  build {build * 1e3:8.1f} ms   per bump {indexed * 1e3:7.3f} ms   "
+              f"full sort {full * 1e3:8.1f} ms")
+
+
+def bench_charts(sizes=(10000, 100000), plays=200, limit=50):
+    """Top-N chart after each play: sort index vs sorting the catalog"""
+    print(f"charts: top {limit} by play count after a play")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            library = TrackLibrary(path=os.path.join(tmp, 'library.json'))
+            library.tracks = make_tracks(size)
+            library.backend.put = lambda track_id, track: None  # time the charts, not the writes
+            ids = list(library.tracks)
+
+            start = time.perf_counter()
+            for i in range(plays):
+                library.record_play(ids[i * 7919 % size])
+                library.top_tracks('play_count', limit)
+            indexed = (time.perf_counter() - start) / plays
+
+            start = time.perf_counter()
+            for i in range(plays // 10):
+                library.record_play(ids[i * 7919 % size])
+                StorageBackend.top_ids(library.backend, 'play_count', limit)
+            heap = (time.perf_counter() - start) / (plays // 10)
+
+            start = time.perf_counter()
+            for i in range(plays // 10):
+                sorted(library.tracks, key=lambda track_id: library.tracks[track_id].play_count, reverse=True)[:limit]
+            full = (time.perf_counter() - start) / (plays // 10)
+            print(f"  {size:>8} tracks  index {indexed * 1e3:7.3f} ms   heap scan {heap * 1e3:7.1f} ms   "
+                  f"full sort {full * 1e3:7.1f} ms")
+
+
+def bench_plays(size=10000, plays=500):
+    """Cost of recording plays: a write per play vs the write-behind buffer"""
+    print(f"plays: {plays} plays over {size} tracks")
+    tracks = make_tracks(size)
+    ids = list(tracks)
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = {
+            'snapshot': lambda name: {'path': os.path.join(tmp, name + '.json')},
+            'journal': lambda name: {'path': os.path.join(tmp, name + '.json'), 'journal': True},
+            'sqlite': lambda name: {'backend': SQLiteBackend(os.path.join(tmp, name + '.db'))},
+        }
+        for label, make in backends.items():
+            for interval in (0, 5):
+                library = TrackLibrary(play_flush_interval=interval, **make(f"{label}-{interval}"))
+                library.load_from_file()
+                library.tracks = {track_id: Track.from_dict(track.to_dict()) for track_id, track in tracks.items()}
+                start = time.perf_counter()
+                for i in range(plays):
+                    # A few favourites get most of the plays
+                    library.record_play(ids[(i * 7919) % 20])
+                library.flush_plays()
+                elapsed = time.perf_counter() - start
+                library.close()
+                mode = "write per play" if interval == 0 else "buffered"
+                print(f"  {label:<9} {mode:<15} {elapsed / plays * 1e3:8.3f} ms/play")
+
+
+def bench_history(plays=1000000, tracks=10000):
+    """Play history: append rate, reopen time and window queries vs a log scan"""
+    from play_history import DAY, HOUR, PlayHistory
+
+    print(f"history: {plays} plays over 30 days")
+    rng = random.Random(plays)
+    now = int(time.time())
+    with tempfile.TemporaryDirectory() as tmp:
+        history = PlayHistory(os.path.join(tmp, 'library.history'))
+        history.open()
+        start = time.perf_counter()
+        for i in range(plays):
+            history.record(str(rng.randrange(tracks)).zfill(2), now - 30 * DAY + i * 30 * DAY // plays)
+        history.close()
+        record = time.perf_counter() - start
+
+        start = time.perf_counter()
+        history = PlayHistory(os.path.join(tmp, 'library.history'))
+        history.open()
+        reopen = time.perf_counter() - start
+
+        start = time.perf_counter()
+        history.trending(24, 50, now=now)
+        week = history.count('05', now - 7 * DAY, now)
+        rollup = time.perf_counter() - start
+
+        # The same two questions answered from the raw events
+        start = time.perf_counter()
+        totals = {}
+        scanned = 0
+        for segment in history._segments():
+            with open(history._segment_path(segment), 'rb') as f:
+                for line in f:
+                    when, _, track_id = line.rstrip(b'\n').partition(b'\t')
+                    when = int(when)
+                    if when >= now - 24 * HOUR:
+                        totals[track_id] = totals.get(track_id, 0) + 1
+                    if track_id == b'05' and when >= now - 7 * DAY:
+                        scanned += 1
+        sorted(totals.items(), key=lambda item: item[1], reverse=True)[:50]
+        scan = time.perf_counter() - start
+        assert scanned == week
+        history.close()
+        print(f"  record {record / plays * 1e6:6.2f} us/play   reopen {reopen * 1e3:7.1f} ms   "
+              f"queries: rollups {rollup * 1e3:6.2f} ms, log scan {scan * 1e3:8.1f} ms")
+
+
+def bench_playback(launches=20):
+    """Time a double-click keeps the Tk thread busy: inline launch vs dispatcher"""
+    from playback import CommandLauncher, PlaybackDispatcher, StubLauncher
+
+    print("playback: Tk-thread time per launch")
+    launchers = {
+        'stub 200 ms': lambda: StubLauncher(delay=0.2),
+        'command': lambda: CommandLauncher([sys.executable, '-c', 'pass']),
+    }
+    for label, make in launchers.items():
+        launcher = make()
+        start = time.perf_counter()
+        for i in range(launches // 4):
+            launcher.launch(f"https://youtu.be/{i:011d}")
+        inline = (time.perf_counter() - start) / (launches // 4)
+
+        dispatcher = PlaybackDispatcher(make())
+        calling = 0
+        latencies = []
+        for i in range(launches):
+            start = time.perf_counter()
+            dispatcher.play(str(i), f"https://youtu.be/{i:011d}")
+            calling += time.perf_counter() - start
+            while dispatcher.busy():
+                time.sleep(0.001)
+            latencies += [seconds for _, _, _, seconds in dispatcher.poll()]
+        dispatcher.close()
+        print(f"  {label:<12} inline {inline * 1e3:7.2f} ms   dispatched {calling / launches * 1e3:6.3f} ms "
+              f"(launch itself {sum(latencies) / len(latencies) * 1e3:6.2f} ms on the worker)")
+
+
+def bench_validation(keystrokes=200000, rows=100000):
+    """Per-keystroke and bulk validation cost, before and after precompiling"""
+    import re
+    import validation
+
+    pattern = validation.YOUTUBE_URL.pattern
+
+    def old_keystroke(value):
+        # What AddTrackWindow did on every <KeyRelease> before
+        placeholders = ["Enter track name", "Enter artist name", "Enter YouTube URL", "Enter rating (0-5)"]
+        if value in placeholders:
+            return None
+        # re.match() looks the pattern string up in re's cache each call
+        return None if re.match(pattern, value) else "Invalid YouTube URL"
+
+    placeholders = frozenset(["Enter track name", "Enter artist name", "Enter YouTube URL", "Enter rating (0-5)"])
+
+    def new_keystroke(value):
+        if value in placeholders:
+            return None
+        return validation.validate_url(value)
+
+    values = [f"https://youtu.be/{i:011d}"[:12 + i % 20] for i in range(100)]
+    print("validation: per keystroke (URL field)")
+    for label, func in (("before", old_keystroke), ("after", new_keystroke)):
+        start = time.perf_counter()
+        for i in range(keystrokes):
+            func(values[i % 100])
+        print(f"  {label:<7} {(time.perf_counter() - start) / keystrokes * 1e6:6.2f} us/keystroke")
+
+    tracks = list(make_tracks(rows).values())
+    batch = [(track.name, track.artist, track.youtube_url, str(track.rating)) for track in tracks]
+    start = time.perf_counter()
+    for name, artist, url, rating in batch:
+        [error for error in (validation.validate_name(name), validation.validate_artist(artist),
+                             validation.validate_url(url), validation.validate_rating(rating)) if error]
+    per_field = time.perf_counter() - start
+    start = time.perf_counter()
+    validation.validate_batch(batch)
+    batched = time.perf_counter() - start
+    print(f"validation: {rows} rows  per-field calls {per_field * 1e3:6.1f} ms   validate_batch {batched * 1e3:6.1f} ms")
+
+
+def bench_dupes(sizes=(10000, 100000), checks=1000):
+    """Duplicate-video check when adding a track: video index vs scanning URLs"""
+    print(f"dupes: {checks} duplicate checks")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            library = TrackLibrary(path=os.path.join(tmp, 'library.json'))
+            library.tracks = make_tracks(size)
+            # Videos already in the catalog, linked as watch?v= instead of youtu.be
+            urls = [f"https://www.youtube.com/watch?v={i * 2:011d}" for i in range(1, checks + 1)]
+
+            start = time.perf_counter()
+            found = sum(1 for url in urls if library.tracks_by_video(url))
+            indexed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for url in urls[:checks // 100]:
+                StorageBackend.tracks_by_video(library.backend, library.tracks['01'].video_id)
+            scan = (time.perf_counter() - start) / (checks // 100) * checks
+            print(f"  {size:>8} tracks  index {indexed * 1e3:7.2f} ms   scan {scan * 1e3:9.1f} ms   ({found} duplicates)")
+
+
+def bench_shared(sizes=(10000, 100000), edits=20, polls=1000):
+    """A second process's view of the catalog: polling, journal catch-up, full reload"""
+    print(f"shared: {polls} idle polls, catch-up after {edits} edits by another writer")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "library.json")
+            writer = TrackLibrary(path=path, journal=True, compact_every=edits * 10)
+            writer.tracks = make_tracks(size)
+            writer.save_to_file()
+            reader = TrackLibrary(path=path, journal=True)
+            reader.load_from_file()
+            # Sort indexes sort on first use; do that outside the timings
+            for column in StorageBackend.SORT_COLUMNS:
+                reader.sorted_ids(column)
+
+            start = time.perf_counter()
+            for _ in range(polls):
+                reader.refresh()
+            idle = (time.perf_counter() - start) / polls
+
+            for i in range(edits):
+                writer.record_play(f"{i + 1:02d}")
+            start = time.perf_counter()
+            reader.refresh()
+            tail = time.perf_counter() - start
+
+            start = time.perf_counter()
+            reader.load_from_file()
+            reload = time.perf_counter() - start
+            print(f"  {size:>8} tracks  poll {idle * 1e6:6.1f} us   catch-up {tail * 1e3:6.2f} ms"
+                  f"   full reload {reload * 1e3:8.1f} ms")
+            writer.close()
+            reader.close()
+
+
+BENCHMARKS = {
+    'journal': bench_journal,
+    'startup': bench_startup,
+    'first_page': bench_first_page,
+    'treeview': bench_treeview,
+    'search': bench_search,
+    'fuzzy': bench_fuzzy,
+    'import': bench_import,
+    'export': bench_export,
+    'memory': bench_memory,
+    'artist': bench_artist,
+    'sort': bench_sort,
+    'charts': bench_charts,
+    'plays': bench_plays,
+    'history': bench_history,
+    'playback': bench_playback,
+    'validation': bench_validation,
+    'dupes': bench_dupes,
+    'shared': bench_shared,
+}
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or list(BENCHMARKS):
+        BENCHMARKS[name]()
@@ -0,0 +1,112 @@
+import tkinter as tk
+from tkinter import ttk
+import sv_ttk
+
+
+class ChartsWindow:
+    """Most played, highest rated, trending, per-artist and recently played charts.
+
+    Every chart is read off an index the library already maintains (the
+    trending one off the play history's hourly rollups), so refreshing
+    one never walks the whole catalog.
+    """
+    LIMIT = 50
+    ARTIST_LIMIT = 10
+    TRENDING_HOURS = 24
+    REFRESH_MS = 250
+    COLUMNS = ('#', 'Track', 'Artist', 'Rating', 'Play Count')
+
+    def __init__(self, parent, library):
+        self.window = tk.Toplevel(parent)
+        self.window.title("📊 Charts")
+        self.window.geometry("700x500")
+        self.window.configure(bg='#1E1E1E')
+        self.library = library
+        sv_ttk.set_theme("dark")
+
+        self.pending_refresh = None
+        self.setup_gui()
+        self.refresh()
+        # Follow plays and edits made while the window is open
+        self.library.subscribe(self.on_library_change)
+        self.window.bind('<Destroy>', self.on_destroy, add='+')
+
+    def setup_gui(self):
+        main_container = ttk.Frame(self.window, padding="20 20 20 20")
+        main_container.pack(fill=tk.BOTH, expand=True)
+
+        ttk.Label(
+            main_container,
+            text="Charts",
+            font=("Arial", 18, "bold"),
+            foreground="#00B4D8"
+        ).pack(pady=(0,20))
+
+        notebook = ttk.Notebook(main_container)
+        notebook.pack(fill=tk.BOTH, expand=True)
+
+        self.charts = {}
+        for title, key in (("Most Played", 'played'), ("Highest Rated", 'rated'),
+                           ("Trending", 'trending'), ("Recently Played", 'recent')):
+            frame = ttk.Frame(notebook, padding="10 10 10 10")
+            notebook.add(frame, text=title)
+            self.charts[key] = self.make_chart(frame)
+
+        # Top rated per artist: pick the artist, then read their chart
+        frame = ttk.Frame(notebook, padding="10 10 10 10")
+        notebook.add(frame, text="By Artist")
+        artist_frame = ttk.Frame(frame)
+        artist_frame.pack(fill=tk.X, pady=(0,10))
+        ttk.Label(artist_frame, text="Artist:", width=10, anchor='w').pack(side=tk.LEFT, padx=(0,10))
+        self.artist_var = tk.StringVar()
+        self.artist_box = ttk.Combobox(artist_frame, textvariable=self.artist_var, width=40,
+                                       postcommand=self.list_artists)
+        self.artist_box.pack(side=tk.LEFT, expand=True, fill=tk.X)
+        self.artist_box.bind('<<ComboboxSelected>>', lambda event: self.refresh())
+        self.artist_box.bind('<Return>', lambda event: self.refresh())
+        self.charts['artist'] = self.make_chart(frame)
+
+    def make_chart(self, parent):
+        tree = ttk.Treeview(parent, columns=self.COLUMNS, show='headings', height=15)
+        for col in self.COLUMNS:
+            tree.heading(col, text=col, anchor='center')
+            tree.column(col, width=40 if col == '#' else 120, anchor='center')
+        tree.pack(fill=tk.BOTH, expand=True)
+        return tree
+
+    def chart_ids(self):
+        """Track IDs of every chart, keyed like self.charts"""
+        artist = self.artist_var.get().strip()
+        return {
+            'played': self.library.top_tracks('play_count', self.LIMIT),
+            'rated': self.library.top_tracks('rating', self.LIMIT),
+            'trending': [track_id for track_id, plays in self.library.trending(self.TRENDING_HOURS, self.LIMIT)],
+            'recent': self.library.recently_played(self.LIMIT),
+            'artist': self.library.top_rated_by_artist(artist, self.ARTIST_LIMIT) if artist else [],
+        }
+
+    def refresh(self):
+        self.pending_refresh = None
+        for key, track_ids in self.chart_ids().items():
+            tree = self.charts[key]
+            tree.delete(*tree.get_children())
+            for rank, track_id in enumerate(track_ids, 1):
+                track = self.library.get_track(track_id)
+                tree.insert('', tk.END, values=(rank, track.name, track.artist, track.rating, track.play_count))
+
+    def list_artists(self):
+        # Filled when the drop-down opens rather than on every change
+        self.artist_box['values'] = [artist for artist, count in self.library.artists()]
+
+    def on_library_change(self, event, track_id):
+        # Coalesce bursts of changes (e.g. an import) into one redraw
+        if self.pending_refresh is None:
+            self.pending_refresh = self.window.after(self.REFRESH_MS, self.refresh)
+
+    def on_destroy(self, event):
+        if event.widget is not self.window:
+            return
+        self.library.unsubscribe(self.on_library_change)
+        if self.pending_refresh is not None:
+            self.window.after_cancel(self.pending_refresh)
+            self.pending_refresh = None
@@ -0,0 +1,38 @@
+import pytest
+from track_library import Track, TrackLibrary
+
+
+def sample_tracks():
+    """The catalog most tests start from, as fresh ``(track_id, Track)`` pairs"""
+    return [
+        ('01', Track("Bạn Đời", "Karik", "https://youtu.be/h7cOOfpdEfk", 2, 5)),
+        ('02', Track("Rock Song", "Rock Band", "https://youtu.be/aaaaaaaaaaa", 9, 3)),
+        ('03', Track("Pop Track", "Pop Artist", "https://youtu.be/bbbbbbbbbbb", 4, 4)),
+    ]
+
+
+@pytest.fixture
+def make_library(tmp_path):
+    """Build a library holding the first ``count`` sample tracks.
+
+    JSON in tmp_path unless another ``backend`` is given; libraries with
+    a backend are closed at the end of the test.
+    """
+    opened = []
+
+    def make(count=3, backend=None):
+        library = TrackLibrary(path=str(tmp_path / 'library.json'), backend=backend)
+        if backend is not None:
+            library.load_from_file()
+            opened.append(library)
+        library.add_tracks(sample_tracks()[:count])
+        return library
+
+    yield make
+    for library in opened:
+        library.close()
+
+
+@pytest.fixture
+def library(make_library):
+    return make_library()
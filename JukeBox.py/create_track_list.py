@@ -3,12 +3,23 @@ from tkinter import ttk
 import tkinter.scrolledtext as tkst
 import tkinter.messagebox as messagebox
 import sv_ttk
-import re+
+import queue
+import threading
 
 
+from search_index import tokenize
 from track_library import Track
+from validation import validate_artist, validate_fields, validate_name, validate_rating, validate_url
 
 class AddTrackWindow:
+    PLACEHOLDERS = {
+        "name": "Enter track name",
+        "artist": "Enter artist name",
+        "url": "Enter YouTube URL",
+        "rating": "Enter rating (0-5)"
+    }
+    PLACEHOLDER_TEXTS = frozenset(PLACEHOLDERS.values())
+
     def __init__(self, parent, library):
         self.window = tk.Toplevel(parent)
         self.window.title("➕ Add Track")
@@ -38,15 +49,15 @@ class AddTrackWindow:
 
         # Input fields with improved layout
         fields = [
-            ("Track Name:", "name", "Enter track name", self.validate_name),
-            ("Artist:", "artist", "Enter artist name", self.validate_artist),
-            ("YouTube URL:", "url", "Enter YouTube URL", self.validate_url),
-            ("Rating (0-5):", "rating", "Enter rating (0-5)", self.validate_rating)
+            ("Track Name:", "name", self.validate_name),
+            ("Artist:", "artist", self.validate_artist),
+            ("YouTube URL:", "url", self.validate_url),
+            ("Rating (0-5):", "rating", self.validate_rating)
         ]
 
         self.entries = {}
         self.validation_labels = {}
-        for label, key, placeholder, validation_func in fields:
+        for label, key, validation_func in fields:
             # Field container
             field_container = ttk.Frame(input_frame)
             field_container.pack(fill=tk.X, pady=5)
@@ -62,7 +73,7 @@ class AddTrackWindow:
             # Entry with placeholder
             entry = ttk.Entry(field_container, width=40)
             entry.pack(side=tk.LEFT, expand=True, fill=tk.X)
-            entry.insert(0, placeholder)
+            entry.insert(0, self.PLACEHOLDERS[key])
             entry.bind('<FocusIn>', lambda e, entry=entry: self.on_entry_click(e, entry))
             entry.bind('<FocusOut>', lambda e, entry=entry: self.on_entry_leave(e, entry))
             entry.bind('<KeyRelease>', lambda e, key=key, func=validation_func: self.validate_input(e, key, func))
@@ -90,72 +101,39 @@ class AddTrackWindow:
 
     def on_entry_click(self, event, entry):
         """Remove placeholder text when entry is clicked"""
-        placeholders = [
-            "Enter track name", 
-            "Enter artist name", 
-            "Enter YouTube URL", 
-            "Enter rating (0-5)"
-        ]
-        if entry.get() in placeholders:
+        if entry.get() in self.PLACEHOLDER_TEXTS:
             entry.delete(0, tk.END)
             entry.config(foreground='white')
 
     def on_entry_leave(self, event, entry):
         """Restore placeholder if no text is entered"""
         if entry.get().strip() == "":
-            default_placeholders = {
-                "name": "Enter track name",
-                "artist": "Enter artist name",
-                "url": "Enter YouTube URL",
-                "rating": "Enter rating (0-5)"
-            }
             key = [k for k, v in self.entries.items() if v == entry][0]
-            entry.insert(0, default_placeholders[key])
+            entry.insert(0, self.PLACEHOLDERS[key])
             entry.config(foreground='gray')
 
     def validate_name(self, name):
         """Validate track name"""
-        if len(name.strip()) < 2:
-            return "Name too short"
-        return None
+        return validate_name(name)
 
     def validate_artist(self, artist):
         """Validate artist name"""
-        if len(artist.strip()) < 2:
-            return "Artist name too short"
-        return None
+        return validate_artist(artist)
 
     def validate_url(self, url):
         """Validate YouTube URL"""
-        youtube_regex = (
-            r'(https?://)?(www\.)?(youtube|youtu|youtube-nocookie)\.(com|be)/(watch\?v=|embed/|v/|.+\?v=)?([^&=%\?]{11})'
-        )
-        if not re.match(youtube_regex, url):
-            return "Invalid YouTube URL"
-        return None
+        return validate_url(url)
 
     def validate_rating(self, rating):
         """Validate rating"""
-        try:
-            rating = int(rating)
-            if rating < 0 or rating > 5:
-                return "Rating must be between 0-5"
-        except ValueError:
-            return "Rating must be a number"
-        return None
+        return validate_rating(rating)
 
     def validate_input(self, event, key, validation_func):
         """Validate input and show/hide validation messages"""
         value = self.entries[key].get()
         
         # Skip validation for placeholders
-        placeholders = [
-            "Enter track name", 
-            "Enter artist name", 
-            "Enter YouTube URL", 
-            "Enter rating (0-5)"
-        ]
-        if value in placeholders:
+        if value in self.PLACEHOLDER_TEXTS:
             self.validation_labels[key].config(text="")
             return
 
@@ -173,53 +151,43 @@ class AddTrackWindow:
             value = entry.get()
             
             # Skip placeholders
-            placeholders = [
-                "Enter track name", 
-                "Enter artist name", 
-                "Enter YouTube URL", 
-                "Enter rating (0-5)"
-            ]
-            if value in placeholders:
+            if value in self.PLACEHOLDER_TEXTS:
                 errors.append(f"{key.capitalize()} is required")
                 continue
-
-            # Validate each field
-            if key == "name":
-                error = self.validate_name(value)
-            elif key == "artist":
-                error = self.validate_artist(value)
-            elif key == "url":
-                error = self.validate_url(value)
-            elif key == "rating":
-                error = self.validate_rating(value)
-            
-            if error:
-                errors.append(error)
-            else:
-                track_data[key] = value
+            track_data[key] = value
+        errors += validate_fields(track_data)
 
         # Check for errors
         if errors:
             messagebox.showerror("Validation Error", "\n".join(errors))
             return
 
+        # The same video may be linked in another form (youtu.be, watch?v=)
+        duplicates = self.library.tracks_by_video(track_data["url"])
+        if duplicates:
+            messagebox.showerror("Duplicate Track", f"This video is already in the library as track {duplicates[0]}")
+            return
+
         # Add track
         try:
-            new_id = str(len(self.library.tracks) + 1).zfill(2)
-            self.library.tracks[new_id] = Track(
+            self.library.add_new_track(Track(
                 track_data["name"], 
                 track_data["artist"], 
                 track_data["url"], 
                 0,  # initial play count
                 int(track_data["rating"])
-            )
-            self.library.save_to_file()
+            ))
             messagebox.showinfo("Success", "Track added successfully!")
             self.window.destroy()
         except Exception as e:
             messagebox.showerror("Error", f"Failed to add track: {str(e)}")
 
 class FindTrackWindow:
+    DEBOUNCE_MS = 150
+    POLL_MS = 20
+    PAGE_SIZE = 200
+    FUZZY_LIMIT = 20
+
     def __init__(self, parent, library):
         self.window = tk.Toplevel(parent)
         self.window.title("🔍 Find Track")
@@ -227,7 +195,20 @@ class FindTrackWindow:
         self.window.configure(bg='#1E1E1E')
         self.library = library
         sv_ttk.set_theme("dark")
+
+        # Search-as-you-type state
+        self.generation = 0          # bumped per query; older results are stale
+        self.pending_search = None   # debounce timer
+        self.poll_job = None
+        self.last_query = None       # last completed query and its full result
+        self.last_ids = None
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        threading.Thread(target=self.search_worker, daemon=True).start()
+
         self.setup_gui()
+        self.search_var.trace_add('write', self.on_query_changed)
+        self.window.bind('<Destroy>', self.on_destroy, add='+')
 
     def setup_gui(self):
         # Main container
@@ -280,17 +261,97 @@ class FindTrackWindow:
         self.results_text.pack(fill=tk.BOTH, expand=True, pady=(10,0))
 
     def search_tracks(self):
-        query = self.search_var.get().strip().lower()
-        results = []
-        for track_id, track in self.library.tracks.items():
-            if query in track.name.lower() or query in track.artist.lower():
-                results.append(
-                    f"ID: {track_id} | {track.name} by {track.artist}\n"
-                )
-        
+        """Run the current query right away (Search button)"""
+        query = self.search_var.get()
+        self.generation += 1
+        ids = self.library.search(query)
+        self.last_query, self.last_ids = query, ids
+        self.show_results(self.generation, ids, self.suggest(query, ids))
+
+    def on_query_changed(self, *args):
+        # Debounce: only search once typing pauses
+        if self.pending_search is not None:
+            self.window.after_cancel(self.pending_search)
+        self.pending_search = self.window.after(self.DEBOUNCE_MS, self.start_search)
+
+    def start_search(self):
+        self.pending_search = None
+        query = self.search_var.get()
+        self.generation += 1
+        # Extending the previous query can only narrow its results, unless
+        # it had no words to match and so found nothing
+        candidates = None
+        if (self.last_ids is not None and tokenize(self.last_query or '')
+                and query.startswith(self.last_query)):
+            candidates = self.last_ids
+        self.requests.put((self.generation, query, candidates))
+        if self.poll_job is None:
+            self.poll_job = self.window.after(self.POLL_MS, self.poll_results)
+
+    def search_worker(self):
+        while True:
+            request = self.requests.get()
+            # Skip queries that were superseded while we were busy
+            while request is not None and not self.requests.empty():
+                request = self.requests.get()
+            if request is None:
+                return
+            generation, query, candidates = request
+            # Safe beside Tk-thread writes: library queries take its read lock
+            ids = self.library.search(query, candidates=candidates)
+            suggestions = self.suggest(query, ids)
+            self.results.put((generation, query, ids, suggestions))
+
+    def suggest(self, query, ids):
+        """Typo-tolerant matches to offer when nothing matches exactly"""
+        if ids or not query.strip():
+            return []
+        return self.library.fuzzy_search(query, limit=self.FUZZY_LIMIT)
+
+    def poll_results(self):
+        self.poll_job = None
+        latest = None
+        while not self.results.empty():
+            latest = self.results.get()
+        if latest is None or latest[0] != self.generation:
+            # Still waiting for the current query
+            self.poll_job = self.window.after(self.POLL_MS, self.poll_results)
+            return
+        generation, query, ids, suggestions = latest
+        self.last_query, self.last_ids = query, ids
+        self.show_results(generation, ids, suggestions)
+
+    def show_results(self, generation, ids, suggestions=()):
         self.results_text.delete(1.0, tk.END)
-        if results:
+        if ids:
             self.results_text.insert(tk.END, "Search Results:\n\n")
-            self.results_text.insert(tk.END, "".join(results))
+            self.insert_page(generation, ids, 0)
+        elif suggestions:
+            self.results_text.insert(tk.END, "No exact matches. Did you mean:\n\n")
+            self.insert_page(generation, suggestions, 0)
         else:
-            self.results_text.insert(tk.END, "No matches found.")
\ No newline at end of file
+            self.results_text.insert(tk.END, "No matches found.")
+
+    def insert_page(self, generation, ids, start):
+        # Stop paging once a newer query has replaced these results
+        if generation != self.generation:
+            return
+        lines = []
+        for track_id in ids[start:start + self.PAGE_SIZE]:
+            track = self.library.tracks.get(track_id)
+            if track is not None:
+                lines.append(f"ID: {track_id} | {track.name} by {track.artist}\n")
+        self.results_text.insert(tk.END, "".join(lines))
+        if start + self.PAGE_SIZE < len(ids):
+            self.window.after(1, self.insert_page, generation, ids, start + self.PAGE_SIZE)
+
+    def on_destroy(self, event):
+        if event.widget is not self.window:
+            return
+        # Invalidate in-flight results and stop the worker
+        self.generation += 1
+        for job in (self.pending_search, self.poll_job):
+            if job is not None:
+                self.window.after_cancel(job)
+        self.pending_search = self.poll_job = None
+        self.requests.put(None)
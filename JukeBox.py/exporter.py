@@ -0,0 +1,189 @@
+"""Streaming export of the track library.
+
+Usage: ``python exporter.py tracks.csv`` (format from the extension, or
+``--format``). Writers take ``(track_id, track)`` pairs one at a time, so
+memory use does not grow with the catalog.
+
+Formats:
+    json    compact JSON object, same shape as library.json
+    jsonl   one JSON object per line, with an "id" field
+    csv     header row, then one row per track
+    arrow   Arrow IPC stream (only when pyarrow is installed)
+    packed  struct-packed binary records, see write_packed()
+"""
+import argparse
+import csv
+import os
+import struct
+from json.encoder import encode_basestring
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+COLUMNS = ('id', 'name', 'artist', 'youtube_url', 'play_count', 'rating')
+ARROW_BATCH = 10000
+
+PACKED_MAGIC = b'JBX1'
+# play_count, rating, then byte lengths of id, name, artist and url
+PACKED_HEADER = struct.Struct('<IBHHHH')
+
+
+def _track_json(track):
+    # Same keys as Track.to_dict(). Formatting the fields directly is
+    # several times faster than a json.dumps() call per track.
+    return (f'"name":{encode_basestring(track.name)},'
+            f'"artist":{encode_basestring(track.artist)},'
+            f'"youtube_url":{encode_basestring(track.youtube_url)},'
+            f'"play_count":{int(track.play_count)},"rating":{int(track.rating)}}}')
+
+
+def write_json(items, f):
+    """Compact JSON object keyed by track ID, written entry by entry"""
+    f.write('{')
+    separator = ''
+    for track_id, track in items:
+        f.write(f'{separator}{encode_basestring(track_id)}:{{{_track_json(track)}')
+        separator = ','
+    f.write('}')
+
+
+def write_jsonl(items, f):
+    """One JSON object per track; importer.py reads these back"""
+    for track_id, track in items:
+        f.write(f'{{"id":{encode_basestring(track_id)},{_track_json(track)}\n')
+
+
+def write_csv(items, f):
+    writer = csv.writer(f)
+    writer.writerow(COLUMNS)
+    for track_id, track in items:
+        writer.writerow((track_id, track.name, track.artist, track.youtube_url,
+                         track.play_count, track.rating))
+
+
+def write_arrow(items, f):
+    """Arrow IPC stream, written in record batches of ARROW_BATCH tracks"""
+    schema = pyarrow.schema([
+        ('id', pyarrow.string()),
+        ('name', pyarrow.string()),
+        ('artist', pyarrow.string()),
+        ('youtube_url', pyarrow.string()),
+        ('play_count', pyarrow.uint32()),
+        ('rating', pyarrow.uint8()),
+    ])
+    with pyarrow.ipc.new_stream(f, schema) as writer:
+        columns = [[] for _ in COLUMNS]
+
+        def flush():
+            writer.write_batch(pyarrow.record_batch(columns, schema=schema))
+            for column in columns:
+                column.clear()
+
+        for track_id, track in items:
+            for column, value in zip(columns, (track_id, track.name, track.artist, track.youtube_url,
+                                               track.play_count, track.rating)):
+                column.append(value)
+            if len(columns[0]) == ARROW_BATCH:
+                flush()
+        if columns[0]:
+            flush()
+
+
+def write_packed(items, f):
+    """Binary records: PACKED_HEADER followed by the UTF-8 strings.
+
+    The file starts with PACKED_MAGIC; read_packed() reads it back.
+    """
+    f.write(PACKED_MAGIC)
+    pack = PACKED_HEADER.pack
+    for track_id, track in items:
+        strings = [value.encode('utf-8') for value in
+                   (track_id, track.name, track.artist, track.youtube_url)]
+        f.write(pack(track.play_count, track.rating, *map(len, strings)))
+        f.write(b''.join(strings))
+
+
+def read_packed(f):
+    """Yield ``(track_id, fields)`` from a write_packed() file"""
+    if f.read(len(PACKED_MAGIC)) != PACKED_MAGIC:
+        raise ValueError("Not a packed JukeBox export")
+    size = PACKED_HEADER.size
+    while True:
+        header = f.read(size)
+        if not header:
+            return
+        if len(header) < size:
+            raise ValueError("Truncated packed export")
+        play_count, rating, *lengths = PACKED_HEADER.unpack(header)
+        data = f.read(sum(lengths))
+        if len(data) < sum(lengths):
+            raise ValueError("Truncated packed export")
+        strings = []
+        start = 0
+        for length in lengths:
+            strings.append(data[start:start + length].decode('utf-8'))
+            start += length
+        track_id, name, artist, youtube_url = strings
+        yield track_id, {'name': name, 'artist': artist, 'youtube_url': youtube_url,
+                         'play_count': play_count, 'rating': rating}
+
+
+# format -> (writer, binary file?)
+WRITERS = {
+    'json': (write_json, False),
+    'jsonl': (write_jsonl, False),
+    'csv': (write_csv, False),
+    'packed': (write_packed, True),
+}
+if pyarrow is not None:
+    WRITERS['arrow'] = (write_arrow, True)
+
+EXTENSIONS = {'.json': 'json', '.jsonl': 'jsonl', '.csv': 'csv', '.arrow': 'arrow', '.jbx': 'packed'}
+
+
+def export_tracks(items, path, fmt=None):
+    """Write ``(track_id, track)`` pairs to ``path``; ``fmt`` defaults to the extension"""
+    fmt = fmt or EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    if fmt not in WRITERS:
+        if fmt == 'arrow':
+            raise ValueError("Arrow export needs pyarrow; use the 'packed' format instead")
+        raise ValueError(f"Unsupported export format: {fmt or path}")
+    writer, binary = WRITERS[fmt]
+    tmp_path = path + '.tmp'
+    if binary:
+        f = open(tmp_path, 'wb')
+    else:
+        f = open(tmp_path, 'w', newline='', encoding='utf-8')
+    # Written aside and renamed, so a failed export never leaves half a file
+    try:
+        with f:
+            writer(items, f)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+
+
+def main():
+    from sqlite_backend import SQLiteBackend
+    from track_library import TrackLibrary
+
+    parser = argparse.ArgumentParser(description="Export the JukeBox library")
+    parser.add_argument("file", help="output file; .json, .jsonl, .csv, .arrow or .jbx")
+    parser.add_argument("--format", choices=sorted(WRITERS), help="override the format guessed from the extension")
+    parser.add_argument("--library", default="library.json", help="JSON library to export")
+    parser.add_argument("--db", help="export a SQLite library at this path instead")
+    args = parser.parse_args()
+
+    library = TrackLibrary(args.library, backend=SQLiteBackend(args.db) if args.db else None)
+    library.load_from_file()
+    try:
+        library.export(args.file, args.format)
+    finally:
+        library.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+
+class FileLock:
+    """Advisory lock on a file, shared by every process that opens the library.
+
+    Many processes may hold it shared (readers) or one exclusively (a
+    writer). Windows only offers exclusive locks, so readers there take
+    turns. Re-entrant within a process: nested holds are counted, and a
+    shared hold may be taken inside an exclusive one but not the reverse.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = None
+        self.depth = 0
+        self.exclusive = False
+
+    def acquire(self, exclusive=True):
+        if self.depth:
+            if exclusive and not self.exclusive:
+                raise RuntimeError(f"Cannot upgrade a shared lock on {self.path}")
+            self.depth += 1
+            return
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            elif msvcrt is not None:
+                # Locks the first byte; LK_LOCK retries for about 10 seconds
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        except BaseException:
+            os.close(fd)
+            raise
+        self.fd = fd
+        self.depth = 1
+        self.exclusive = exclusive
+
+    def release(self):
+        self.depth -= 1
+        if self.depth:
+            return
+        fd, self.fd = self.fd, None
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+    @contextmanager
+    def held(self, exclusive=True):
+        self.acquire(exclusive)
+        try:
+            yield
+        finally:
+            self.release()
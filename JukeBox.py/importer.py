@@ -0,0 +1,204 @@
+"""Bulk import of tracks from CSV, JSON Lines and M3U playlists.
+
+Usage: ``python importer.py tracks.csv --rejects rejects.csv``
+
+Every row is validated with the same rules as AddTrackWindow, rows whose
+YouTube video is already in the library (or earlier in the file), however
+its URL is written, are skipped, and everything that passes is added with
+one library write.
+"""
+import argparse
+import csv
+import json
+import os
+
+from sqlite_backend import SQLiteBackend
+from track_library import Track, TrackLibrary
+from validation import validate_batch
+
+BATCH_SIZE = 5000
+REJECT_COLUMNS = ('line', 'reason', 'name', 'artist', 'youtube_url', 'rating')
+
+
+class ImportReport:
+    """Counts kept while an import runs"""
+
+    def __init__(self):
+        self.read = 0
+        self.imported = 0
+        self.rejected = 0
+        self.duplicates = 0
+
+    def __str__(self):
+        return (f"{self.read} read, {self.imported} imported, "
+                f"{self.rejected} rejected, {self.duplicates} duplicates")
+
+
+def read_csv(path):
+    """Yield ``(line, record)`` per row; the header names the fields"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield reader.line_num, row
+
+
+def read_jsonl(path):
+    """Yield ``(line, record)`` per JSON object; record is None if unparsable"""
+    with open(path, encoding='utf-8-sig') as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            yield line_no, record if isinstance(record, dict) else None
+
+
+def read_m3u(path):
+    """Yield ``(line, record)`` per playlist entry.
+
+    Names come from extended M3U ``#EXTINF:<seconds>,<artist> - <title>``
+    lines; plain entries only have a URL and will be rejected.
+    """
+    info = ''
+    with open(path, encoding='utf-8-sig') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if line.startswith('#EXTINF:'):
+                info = line.partition(',')[2]
+                continue
+            if not line or line.startswith('#'):
+                continue
+            artist, separator, name = info.partition(' - ')
+            if not separator:
+                name, artist = artist, ''
+            yield line_no, {'name': name, 'artist': artist, 'youtube_url': line}
+            info = ''
+
+
+READERS = {
+    'csv': read_csv,
+    'jsonl': read_jsonl,
+    'm3u': read_m3u,
+    'm3u8': read_m3u,
+}
+
+
+def _fields(record):
+    """Pull (name, artist, url, rating) strings out of a raw record"""
+    url = record.get('youtube_url', record.get('url'))
+    rating = record.get('rating')
+    if rating is None or rating == '':
+        rating = 0
+    return tuple(
+        str(value).strip() if value is not None else ''
+        for value in (record.get('name'), record.get('artist'), url, rating)
+    )
+
+
+def _validate_batch(batch):
+    """Split a batch of ``(line, record)`` into accepted rows and rejects"""
+    accepted = []
+    rejects = []
+    rows = []
+    for line, record in batch:
+        if record is None:
+            rejects.append((line, "Unreadable record", '', '', '', ''))
+        else:
+            rows.append((line, _fields(record)))
+    errors = validate_batch([fields for _, fields in rows])
+    for (line, fields), row_errors in zip(rows, errors):
+        if row_errors:
+            rejects.append((line, "; ".join(row_errors)) + fields)
+        else:
+            accepted.append((line, fields))
+    return accepted, rejects
+
+
+def _batches(records, size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_tracks(library, records, rejects=None, progress=None, batch_size=BATCH_SIZE):
+    """Add ``(line, record)`` pairs to ``library`` and return an ImportReport.
+
+    ``rejects`` is an optional csv writer that receives every rejected or
+    duplicate row; ``progress(report)`` is called after each batch.
+    """
+    report = ImportReport()
+    # Videos imported so far; the library's video index covers the rest
+    seen_videos = set()
+    new_tracks = []
+
+    for batch in _batches(records, batch_size):
+        report.read += len(batch)
+        accepted, rejected = _validate_batch(batch)
+        report.rejected += len(rejected)
+        for line, (name, artist, url, rating) in accepted:
+            track = Track(name, artist, url, 0, int(rating))
+            # Channel or playlist URLs name no video and are never duplicates
+            if track.video_id is not None:
+                if track.video_id in seen_videos or library.tracks_by_video(url):
+                    report.duplicates += 1
+                    rejected.append((line, "Duplicate YouTube URL", name, artist, url, rating))
+                    continue
+                seen_videos.add(track.video_id)
+            new_tracks.append(track)
+        report.imported = len(new_tracks)
+        if rejects is not None:
+            rejects.writerows(rejected)
+        if progress is not None:
+            progress(report)
+
+    # One write for the whole import instead of one per track
+    if new_tracks:
+        library.add_new_tracks(new_tracks)
+    return report
+
+
+def import_file(library, path, fmt=None, rejects_path=None, progress=None):
+    """Import a CSV, JSON Lines or M3U file; ``fmt`` defaults to the extension"""
+    fmt = fmt or os.path.splitext(path)[1].lstrip('.').lower()
+    if fmt not in READERS:
+        raise ValueError(f"Unsupported import format: {fmt or path}")
+    records = READERS[fmt](path)
+    if rejects_path is None:
+        return import_tracks(library, records, progress=progress)
+    with open(rejects_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(REJECT_COLUMNS)
+        return import_tracks(library, records, writer, progress)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import tracks into the JukeBox library")
+    parser.add_argument("file", help="CSV, JSON Lines (.jsonl) or M3U playlist to import")
+    parser.add_argument("--format", choices=sorted(READERS), help="override the format guessed from the extension")
+    parser.add_argument("--library", default="library.json", help="JSON library to import into")
+    parser.add_argument("--db", help="import into a SQLite library at this path instead")
+    parser.add_argument("--rejects", help="write rejected and duplicate rows to this CSV file")
+    args = parser.parse_args()
+
+    library = TrackLibrary(args.library, journal=True, backups=3,
+                           backend=SQLiteBackend(args.db) if args.db else None)
+    library.load_from_file()
+    try:
+        report = import_file(
+            library, args.file, args.format, args.rejects,
+            progress=lambda report: print(f"\r{report}", end='', flush=True)
+        )
+    finally:
+        library.close()
+    print(f"\r{report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
 class LibraryItem:
+    __slots__ = ('name', 'artist', 'rating', 'play_count')
+
     def __init__(self, name, artist, rating=0):
         self.name = name
         self.artist = artist
@@ -0,0 +1,195 @@
+"""Load test for the library service.
+
+``python loadtest.py`` builds a synthetic catalog, starts ``service.py``
+on it in a separate process and drives it over keep-alive connections;
+``--url http://host:port`` targets a service that is already running.
+Prints requests per second and latency percentiles for each scenario.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+from benchmarks import WORDS, make_tracks
+from track_library import TrackLibrary
+
+
+class Client:
+    """One keep-alive HTTP/1.1 connection to the service"""
+
+    def __init__(self, reader, writer, host):
+        self.reader = reader
+        self.writer = writer
+        self.host = host
+
+    @classmethod
+    async def connect(cls, host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer, host)
+
+    async def request(self, method, path, body=None):
+        """Send one request and return ``(status, decoded JSON body)``"""
+        data = json.dumps(body).encode('utf-8') if body is not None else b''
+        self.writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode('latin-1') + data
+        )
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.strip().lower() == 'content-length':
+                length = int(value)
+        return status, json.loads(await self.reader.readexactly(length))
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def run_scenario(host, port, make_request, connections, requests):
+    """Send ``requests`` requests spread over ``connections`` connections"""
+    clients = [await Client.connect(host, port) for _ in range(connections)]
+    latencies = []
+    errors = 0
+
+    async def worker(client, count, rng):
+        nonlocal errors
+        for _ in range(count):
+            method, path, body = make_request(rng)
+            start = time.perf_counter()
+            status, _ = await client.request(method, path, body)
+            latencies.append(time.perf_counter() - start)
+            errors += status >= 400
+
+    per_client = requests // connections
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        worker(client, per_client, random.Random(i)) for i, client in enumerate(clients)
+    ))
+    elapsed = time.perf_counter() - start
+    for client in clients:
+        await client.close()
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / elapsed,
+        'p50': percentile(latencies, 0.50) * 1000,
+        'p99': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def scenarios(size, batch):
+    """Request generators by name; each returns ``(method, path, body)``"""
+    def list_page(rng):
+        return 'GET', f"/tracks?offset={rng.randrange(size)}&limit=50", None
+
+    def sorted_page(rng):
+        return 'GET', f"/tracks?sort=play_count&reverse=1&offset={rng.randrange(size)}&limit=50", None
+
+    def search(rng):
+        return 'GET', f"/search?q={rng.choice(WORDS)[:3]}&limit=20", None
+
+    def get(rng):
+        return 'GET', f"/tracks/{rng.randint(1, size):02d}", None
+
+    def play(rng):
+        return 'POST', f"/tracks/{rng.randint(1, size):02d}/play", None
+
+    def batched_plays(rng):
+        return 'POST', "/batch", [
+            {'method': 'POST', 'path': f"/tracks/{rng.randint(1, size):02d}/play"} for _ in range(batch)
+        ]
+
+    return {
+        'list': list_page,
+        'sorted': sorted_page,
+        'search': search,
+        'get': get,
+        'play': play,
+        f'batch{batch}': batched_plays,
+    }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_service(tmp, size):
+    """Write a catalog of ``size`` tracks and serve it from a child process"""
+    path = os.path.join(tmp, 'library.json')
+    library = TrackLibrary(path)
+    library.tracks = make_tracks(size)
+    library.save_to_file()
+    port = free_port()
+    here = os.path.dirname(os.path.abspath(__file__))
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(here, 'service.py'), '--library', path, '--port', str(port)],
+        stdout=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 60
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process, port
+        except OSError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                raise RuntimeError("service did not start")
+            time.sleep(0.05)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the throughput and latency of the library service")
+    parser.add_argument("--url", help="service to test (default: start one on a synthetic catalog)")
+    parser.add_argument("--tracks", type=int, default=10000, help="size of the synthetic catalog")
+    parser.add_argument("--connections", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=5000, help="requests per scenario")
+    parser.add_argument("--batch", type=int, default=20, help="plays per /batch request")
+    parser.add_argument("scenario", nargs="*", help="scenarios to run (default: all)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        process = None
+        if args.url:
+            url = urlsplit(args.url)
+            host, port = url.hostname, url.port or 80
+        else:
+            process, port = start_service(tmp, args.tracks)
+            host = '127.0.0.1'
+        try:
+            available = scenarios(args.tracks, args.batch)
+            print(f"{args.connections} connections, {args.requests} requests per scenario")
+            for name in args.scenario or list(available):
+                result = asyncio.run(run_scenario(
+                    host, port, available[name], args.connections, args.requests
+                ))
+                print(f"  {name:>8}: {result['rps']:8.0f} req/s   p50 {result['p50']:6.2f} ms"
+                      f"   p99 {result['p99']:6.2f} ms   errors {result['errors']}")
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+
+if __name__ == "__main__":
+    main()
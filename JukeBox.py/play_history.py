@@ -0,0 +1,204 @@
+"""Append-only log of play events with hourly and daily rollups.
+
+Each play is appended to the current segment file as a
+``<unix time>\\t<track id>`` line. Segments are rotated at SEGMENT_BYTES
+and never rewritten. The rollups count plays per track per hour and per
+day and are updated as events are recorded. They are checkpointed to
+rollups.json on every rotation, so opening the history only replays the
+events written after the checkpoint. Time-window queries read the
+rollups, never the raw events.
+"""
+import json
+import os
+import time
+
+from track_library import _write_atomic
+
+SEGMENT_BYTES = 1 << 20
+# Hourly buckets are kept this long; older windows resolve to whole days
+HOURLY_RETENTION_DAYS = 14
+HOUR = 3600
+DAY = 86400
+
+
+def history_dir(library_path):
+    """Directory holding the play history of the library at ``library_path``"""
+    return os.path.splitext(library_path)[0] + '.history'
+
+
+def _add(bucket, track_id, count=1):
+    bucket[track_id] = bucket.get(track_id, 0) + count
+
+
+class PlayHistory:
+    def __init__(self, directory, segment_bytes=SEGMENT_BYTES, hourly_days=HOURLY_RETENTION_DAYS):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.hourly_days = hourly_days
+        # hour number -> {track_id: plays}; day number -> {track_id: plays}
+        self.hourly = {}
+        self.daily = {}
+        # Hours before this one have been folded into the daily rollup only
+        self.hourly_floor = 0
+        self.segment = 1
+        self.segment_size = 0
+        self.file = None
+
+    @property
+    def checkpoint_path(self):
+        return os.path.join(self.directory, 'rollups.json')
+
+    def _segment_path(self, segment):
+        return os.path.join(self.directory, f'segment-{segment:08d}.log')
+
+    def _segments(self):
+        return sorted(
+            int(name[8:-4]) for name in os.listdir(self.directory)
+            if name.startswith('segment-') and name.endswith('.log') and name[8:-4].isdigit()
+        )
+
+    def open(self):
+        """Load the checkpoint and replay the events written after it"""
+        if self.file is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        segments = self._segments()
+        start, offset = self._read_checkpoint()
+        if start is None:
+            # No usable checkpoint: rebuild the rollups from every segment
+            self.hourly, self.daily, self.hourly_floor = {}, {}, 0
+            start, offset = (segments[0] if segments else 1), 0
+        for segment in segments:
+            if segment >= start:
+                self._replay(segment, offset if segment == start else 0, segment == segments[-1])
+        self.segment = max(segments[-1] if segments else start, start)
+        path = self._segment_path(self.segment)
+        # Binary, so segment_size and the checkpoint offsets are the bytes
+        # _replay() seeks to on every platform
+        self.file = open(path, 'ab')
+        self.segment_size = os.path.getsize(path)
+
+    def _read_checkpoint(self):
+        try:
+            with open(self.checkpoint_path, encoding='utf-8') as f:
+                data = json.load(f)
+            self.hourly = {int(hour): counts for hour, counts in data['hourly'].items()}
+            self.daily = {int(day): counts for day, counts in data['daily'].items()}
+            self.hourly_floor = data['hourly_floor']
+            return data['segment'], data['offset']
+        except FileNotFoundError:
+            return None, 0
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            print(f"Warning: ignoring corrupt play history checkpoint: {e}")
+            return None, 0
+
+    def _replay(self, segment, offset, last):
+        path = self._segment_path(segment)
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        complete = data.rfind(b'\n') + 1
+        if last and complete < len(data):
+            # A torn final line from a crash; drop it before appending
+            with open(path, 'r+b') as f:
+                f.truncate(offset + complete)
+        for line in data[:complete].splitlines():
+            when, _, track_id = line.partition(b'\t')
+            if when.isdigit() and track_id:
+                self._count(int(when), track_id.decode('utf-8'))
+
+    def _count(self, when, track_id):
+        hour = when // HOUR
+        if hour >= self.hourly_floor:
+            _add(self.hourly.setdefault(hour, {}), track_id)
+        _add(self.daily.setdefault(when // DAY, {}), track_id)
+
+    def record(self, track_id, when=None):
+        """Append a play of ``track_id`` at ``when`` (default now)"""
+        if self.file is None:
+            self.open()
+        when = int(time.time() if when is None else when)
+        line = f'{when}\t{track_id}\n'.encode('utf-8')
+        self.file.write(line)
+        self.segment_size += len(line)
+        self._count(when, track_id)
+        if self.segment_size >= self.segment_bytes:
+            self.rotate()
+
+    def flush(self):
+        if self.file is not None:
+            self.file.flush()
+
+    def rotate(self):
+        """Start a new segment and checkpoint the rollups up to it"""
+        self.file.close()
+        self.segment += 1
+        self.file = open(self._segment_path(self.segment), 'ab')
+        self.segment_size = 0
+        self.checkpoint()
+
+    def checkpoint(self):
+        """Write the rollups so the next open() skips the events so far"""
+        self.flush()
+        # Fold hourly buckets past the retention into the daily ones,
+        # which already hold them, by dropping them
+        floor = (int(time.time()) // DAY - self.hourly_days) * 24
+        if floor > self.hourly_floor:
+            self.hourly_floor = floor
+            self.hourly = {hour: counts for hour, counts in self.hourly.items() if hour >= floor}
+        data = {
+            'segment': self.segment,
+            'offset': self.segment_size,
+            'hourly_floor': self.hourly_floor,
+            'hourly': self.hourly,
+            'daily': self.daily,
+        }
+        _write_atomic(self.checkpoint_path, json.dumps(data, separators=(',', ':')).encode('utf-8'))
+
+    def close(self):
+        if self.file is not None:
+            self.checkpoint()
+            self.file.close()
+            self.file = None
+
+    def _buckets(self, start, end):
+        # Whole days from the daily rollup, the partial days at either
+        # end from the hourly one. Windows are rounded to whole hours.
+        first_hour = int(start // HOUR)
+        end_hour = int(-(-end // HOUR))
+        # Hours that are no longer kept widen to their whole day
+        if first_hour < self.hourly_floor:
+            first_hour -= first_hour % 24
+        if end_hour < self.hourly_floor:
+            end_hour += -end_hour % 24
+        first_day = -(-first_hour // 24)
+        end_day = end_hour // 24
+        if first_day >= end_day:
+            hours = range(first_hour, end_hour)
+            days = range(0)
+        else:
+            hours = [*range(first_hour, first_day * 24), *range(end_day * 24, end_hour)]
+            days = range(first_day, end_day)
+        empty = {}
+        for hour in hours:
+            yield self.hourly.get(hour, empty)
+        for day in days:
+            yield self.daily.get(day, empty)
+
+    def count(self, track_id, start, end):
+        """Plays of ``track_id`` between the unix times ``start`` and ``end``"""
+        return sum(bucket.get(track_id, 0) for bucket in self._buckets(start, end))
+
+    def top(self, start, end, limit=None):
+        """``(track_id, plays)`` pairs for the window, most played first"""
+        totals = {}
+        for bucket in self._buckets(start, end):
+            for track_id, count in bucket.items():
+                _add(totals, track_id, count)
+        ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+        return ranked if limit is None else ranked[:limit]
+
+    def trending(self, hours=24, limit=None, now=None):
+        """Most played tracks of the last ``hours`` hours"""
+        now = int(time.time() if now is None else now)
+        return self.top(now - hours * HOUR, now, limit)
@@ -0,0 +1,129 @@
+"""Launching tracks without blocking the Tk event loop.
+
+A launcher opens one URL: in the web browser, with a local player
+command such as ``mpv --no-video``, or, for tests and benchmarks, not at
+all. PlaybackDispatcher runs the launcher on a worker thread and queues
+the outcome for the Tk thread to pick up with poll().
+"""
+import queue
+import shlex
+import subprocess
+import threading
+import time
+import webbrowser
+
+
+class BrowserLauncher:
+    """Opens the URL with the webbrowser module"""
+
+    def launch(self, url):
+        if not webbrowser.open(url):
+            raise RuntimeError("No web browser available")
+
+
+class CommandLauncher:
+    """Runs ``command + [url]``, e.g. ``['mpv', '--no-video']``"""
+
+    def __init__(self, command):
+        self.command = list(command)
+        self.processes = []
+
+    def launch(self, url):
+        # Reap players that have exited so they don't linger as zombies
+        self.processes = [process for process in self.processes if process.poll() is None]
+        self.processes.append(subprocess.Popen(
+            self.command + [url],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True
+        ))
+
+
+class StubLauncher:
+    """Records URLs instead of opening them, optionally taking ``delay`` seconds"""
+
+    def __init__(self, delay=0, error=None):
+        self.delay = delay
+        self.error = error
+        self.launched = []
+
+    def launch(self, url):
+        if self.delay:
+            time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        self.launched.append(url)
+
+
+def make_launcher(spec):
+    """Launcher for a --player value: 'browser', 'stub' or a command line"""
+    if spec in (None, '', 'browser'):
+        return BrowserLauncher()
+    if spec == 'stub':
+        return StubLauncher()
+    return CommandLauncher(shlex.split(spec))
+
+
+class PlaybackDispatcher:
+    """Launches tracks on a worker thread.
+
+    play() returns at once. Each launch produces a
+    ``(track_id, url, error, seconds)`` tuple, collected with poll() on
+    the Tk thread; ``error`` is None when the launch worked. Requests
+    that pile up while a launch is running are superseded by the newest.
+    """
+
+    def __init__(self, launcher):
+        self.launcher = launcher
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        # Requests not yet launched or superseded
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.worker = threading.Thread(target=self.run, daemon=True)
+        self.worker.start()
+
+    def play(self, track_id, url):
+        with self.lock:
+            self.pending += 1
+        self.requests.put((track_id, url))
+
+    def busy(self):
+        """True while a launch is queued or running"""
+        with self.lock:
+            return self.pending > 0
+
+    def run(self):
+        while True:
+            request = self.requests.get()
+            taken = 1
+            # Only the newest of several queued launches is worth starting
+            while request is not None and not self.requests.empty():
+                request = self.requests.get()
+                taken += 1
+            if request is None:
+                return
+            track_id, url = request
+            start = time.perf_counter()
+            try:
+                self.launcher.launch(url)
+                error = None
+            except Exception as e:
+                error = e
+            self.results.put((track_id, url, error, time.perf_counter() - start))
+            with self.lock:
+                self.pending -= taken
+
+    def poll(self):
+        """Return the launches that finished since the last call"""
+        finished = []
+        while True:
+            try:
+                finished.append(self.results.get_nowait())
+            except queue.Empty:
+                return finished
+
+    def close(self, timeout=1):
+        self.requests.put(None)
+        self.worker.join(timeout)
@@ -0,0 +1,106 @@
+import threading
+from contextlib import contextmanager
+
+
+class ReadWriteLock:
+    """Many reading threads or one writing thread at a time.
+
+    Waiting writers go first, so a steady stream of readers cannot
+    starve them. When a writer finishes, the readers already waiting get
+    their turn before the next writer, so a thread writing in a loop
+    cannot starve readers either. Both sides are re-entrant and the
+    writing thread may also read, but a thread that is only reading
+    cannot start writing.
+    """
+
+    def __init__(self):
+        self.cond = threading.Condition(threading.Lock())
+        self.readers = 0
+        self.writer = None
+        self.write_depth = 0
+        self.writers_waiting = 0
+        self.readers_waiting = 0
+        # Bumped by every finished write; readers waiting since an older
+        # one are let in ahead of waiting writers
+        self.writes_done = 0
+        # Those readers that have yet to get in; writers wait for them
+        self.read_turn = 0
+        # Per thread: read nesting depth, and whether it counts in readers
+        self.local = threading.local()
+
+    def acquire_read(self):
+        local = self.local
+        if getattr(local, 'reads', 0):
+            local.reads += 1
+            return
+        if self.writer == threading.get_ident():
+            local.reads, local.counted = 1, False
+            return
+        with self.cond:
+            if self.writer is not None or self.writers_waiting:
+                since = self.writes_done
+                self.readers_waiting += 1
+                try:
+                    while self.writer is not None or (self.writers_waiting and self.writes_done == since):
+                        self.cond.wait()
+                finally:
+                    self.readers_waiting -= 1
+                    if self.writes_done != since:
+                        self.read_turn -= 1
+                        if not self.read_turn:
+                            self.cond.notify_all()
+            self.readers += 1
+        local.reads, local.counted = 1, True
+
+    def release_read(self):
+        local = self.local
+        local.reads -= 1
+        if local.reads or not local.counted:
+            return
+        with self.cond:
+            self.readers -= 1
+            if not self.readers:
+                self.cond.notify_all()
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        if self.writer == me:
+            self.write_depth += 1
+            return
+        if getattr(self.local, 'reads', 0):
+            raise RuntimeError("Cannot start writing while reading")
+        with self.cond:
+            self.writers_waiting += 1
+            try:
+                while self.writer is not None or self.readers or self.read_turn:
+                    self.cond.wait()
+            finally:
+                self.writers_waiting -= 1
+            self.writer = me
+            self.write_depth = 1
+
+    def release_write(self):
+        self.write_depth -= 1
+        if self.write_depth:
+            return
+        with self.cond:
+            self.writer = None
+            self.writes_done += 1
+            self.read_turn = self.readers_waiting
+            self.cond.notify_all()
+
+    @contextmanager
+    def reading(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def writing(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
@@ -0,0 +1,285 @@
+import bisect
+import heapq
+import re
+import unicodedata
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Letters NFKD does not decompose into a base letter plus marks
+FOLD_TABLE = str.maketrans({'đ': 'd', 'Đ': 'd', 'ł': 'l', 'Ł': 'l', 'ø': 'o', 'Ø': 'o'})
+
+# Which field a token came from; a token can be in both
+NAME = 1
+ARTIST = 2
+
+
+def fold_text(text):
+    """Case- and accent-fold text for matching, e.g. 'Bạn Đời' -> 'ban doi'"""
+    if text.isascii():
+        # Nothing to decompose
+        return text.casefold()
+    decomposed = unicodedata.normalize('NFKD', text.translate(FOLD_TABLE))
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def tokenize(text):
+    """Split text into folded word tokens"""
+    return TOKEN_RE.findall(fold_text(text))
+
+
+def token_fields(name_key, artist_key):
+    """Map each token of a track's folded name and artist to NAME | ARTIST"""
+    fields = {}
+    for token in TOKEN_RE.findall(name_key):
+        fields[token] = fields.get(token, 0) | NAME
+    for token in TOKEN_RE.findall(artist_key):
+        fields[token] = fields.get(token, 0) | ARTIST
+    return fields
+
+
+def trigrams(token):
+    """The padded 3-grams of a token; one edit changes at most three"""
+    padded = f'$${token}$'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def bounded_levenshtein(a, b, limit):
+    """Edit distance between a and b, or limit + 1 once it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb)
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(previous[-1], limit + 1)
+
+
+def typo_budget(term, max_distance):
+    """How many edits a query term may be off by; short terms must match"""
+    return min(max_distance, len(term) // 3)
+
+
+def fuzzy_scan(query, items, limit=10, max_distance=2):
+    """Brute-force fuzzy search over ``(track_id, track)`` pairs.
+
+    Same results as SearchIndex.fuzzy_search() but compares every term
+    against every token, so it is for backends without an index.
+    """
+    terms = set(tokenize(query))
+    if not terms:
+        return []
+    budgets = {term: typo_budget(term, max_distance) for term in terms}
+    ranked = []
+    for order, (track_id, track) in enumerate(items):
+        tokens = set(TOKEN_RE.findall(track.name_key)) | set(TOKEN_RE.findall(track.artist_key))
+        total = 0
+        for term, budget in budgets.items():
+            best = min((bounded_levenshtein(term, token, budget) for token in tokens),
+                       default=budget + 1)
+            if best > budget:
+                break
+            total += best
+        else:
+            ranked.append((total, order, track_id))
+    return [track_id for _, _, track_id in heapq.nsmallest(limit, ranked)]
+
+
+class SearchIndex:
+    """Inverted index over track names and artists.
+
+    Every token maps to the IDs of the tracks containing it. The sorted
+    vocabulary answers prefix queries with two bisects, so a query only
+    touches the postings of tokens that actually match.
+    """
+
+    def __init__(self):
+        # token -> {track_id: NAME | ARTIST}
+        self.postings = {}
+        # sorted list of every token in postings
+        self.vocabulary = []
+        # track_id -> {token: fields}, to undo an entry on update/remove
+        self.doc_tokens = {}
+        # track_id -> insertion sequence, used to break ranking ties
+        self.doc_order = {}
+        # trigram -> tokens containing it, for fuzzy candidate filtering
+        self.grams = {}
+        self._next_order = 0
+
+    def __len__(self):
+        return len(self.doc_tokens)
+
+    def add(self, track_id, track):
+        """Index a track, replacing any previous entry for its ID"""
+        # Tracks carry pre-folded keys, so indexing never folds again
+        fields = token_fields(track.name_key, track.artist_key)
+        old = self.doc_tokens.get(track_id)
+        if old == fields:
+            return
+        if old is not None:
+            self._unlink(track_id, old)
+        else:
+            self.doc_order[track_id] = self._next_order
+            self._next_order += 1
+        self.doc_tokens[track_id] = fields
+        for token, flags in fields.items():
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = self.postings[token] = {}
+                bisect.insort(self.vocabulary, token)
+                for gram in trigrams(token):
+                    self.grams.setdefault(gram, set()).add(token)
+            posting[track_id] = flags
+
+    def discard(self, track_id):
+        """Drop a track from the index if it is there"""
+        old = self.doc_tokens.pop(track_id, None)
+        if old is not None:
+            self._unlink(track_id, old)
+            del self.doc_order[track_id]
+
+    def _unlink(self, track_id, fields):
+        for token in fields:
+            posting = self.postings[token]
+            del posting[track_id]
+            if not posting:
+                del self.postings[token]
+                del self.vocabulary[bisect.bisect_left(self.vocabulary, token)]
+                for gram in trigrams(token):
+                    tokens = self.grams[gram]
+                    tokens.discard(token)
+                    if not tokens:
+                        del self.grams[gram]
+
+    def clear(self):
+        self.postings.clear()
+        self.vocabulary.clear()
+        self.doc_tokens.clear()
+        self.doc_order.clear()
+        self.grams.clear()
+
+    def _prefix_range(self, term):
+        lo = bisect.bisect_left(self.vocabulary, term)
+        hi = bisect.bisect_left(self.vocabulary, term + '\uffff', lo)
+        return lo, hi
+
+    @staticmethod
+    def _score(token, term, flags):
+        # Whole-word hits beat prefix hits, names beat artists
+        weight = 2 if token == term else 1
+        return weight * (3 if flags & NAME else 2)
+
+    def _term_scores(self, term, lo, hi):
+        """Score every track with a token starting with ``term``"""
+        scores = {}
+        for token in self.vocabulary[lo:hi]:
+            for track_id, flags in self.postings[token].items():
+                score = self._score(token, term, flags)
+                if score > scores.get(track_id, 0):
+                    scores[track_id] = score
+        return scores
+
+    def search(self, query, limit=None, candidates=None):
+        """Return IDs of tracks matching every term of ``query``, best first.
+
+        Each term matches as a word prefix of the name or artist. Passing
+        ``candidates`` (e.g. the result of a shorter query) restricts the
+        search to those IDs.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        if candidates is not None:
+            scores = {track_id: 0 for track_id in candidates if track_id in self.doc_tokens}
+            remaining = terms
+        else:
+            # Expand only the rarest term through the postings; the other
+            # terms just filter its candidates by their own few tokens.
+            ranges = {}
+            for term in terms:
+                lo, hi = self._prefix_range(term)
+                if lo == hi:
+                    return []
+                ranges[term] = sum(len(self.postings[t]) for t in self.vocabulary[lo:hi]), lo, hi
+            rarest = min(terms, key=lambda term: ranges[term][0])
+            scores = self._term_scores(rarest, *ranges[rarest][1:])
+            remaining = terms - {rarest}
+
+        for term in remaining:
+            filtered = {}
+            for track_id, score in scores.items():
+                best = 0
+                for token, flags in self.doc_tokens[track_id].items():
+                    if token.startswith(term):
+                        best = max(best, self._score(token, term, flags))
+                if best:
+                    filtered[track_id] = score + best
+            scores = filtered
+            if not scores:
+                return []
+
+        order = self.doc_order
+        rank = lambda track_id: (-scores[track_id], order[track_id])
+        if limit is None:
+            return sorted(scores, key=rank)
+        return heapq.nsmallest(limit, scores, key=rank)
+
+    def similar_tokens(self, term, budget):
+        """Map vocabulary tokens within ``budget`` edits of ``term`` to their distance"""
+        if budget == 0:
+            return {term: 0} if term in self.postings else {}
+        term_grams = trigrams(term)
+        # Each edit destroys at most three of the term's trigrams
+        needed = len(term_grams) - 3 * budget
+        if needed > 0:
+            shared = {}
+            for gram in term_grams:
+                for token in self.grams.get(gram, ()):
+                    shared[token] = shared.get(token, 0) + 1
+            candidates = [token for token, count in shared.items() if count >= needed]
+        else:
+            # Too short for trigrams to rule anything out
+            candidates = self.vocabulary
+        matches = {}
+        for token in candidates:
+            distance = bounded_levenshtein(term, token, budget)
+            if distance <= budget:
+                matches[token] = distance
+        return matches
+
+    def fuzzy_search(self, query, limit=10, max_distance=2):
+        """Return IDs of the ``limit`` tracks closest to ``query``.
+
+        Every term must be within a few edits (see typo_budget) of a whole
+        word in the name or artist; tracks are ranked by total distance.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        distances = None
+        for term in sorted(terms, key=len, reverse=True):
+            best = {}
+            for token, distance in self.similar_tokens(term, typo_budget(term, max_distance)).items():
+                for track_id in self.postings[token]:
+                    if distance < best.get(track_id, distance + 1):
+                        best[track_id] = distance
+            if distances is None:
+                distances = best
+            else:
+                distances = {
+                    track_id: total + best[track_id]
+                    for track_id, total in distances.items() if track_id in best
+                }
+            if not distances:
+                return []
+
+        order = self.doc_order
+        return heapq.nsmallest(limit, distances, key=lambda track_id: (distances[track_id], order[track_id]))
@@ -0,0 +1,333 @@
+"""Headless HTTP/JSON API over a TrackLibrary.
+
+Usage: ``python service.py --port 8765`` (``--db`` for a SQLite library).
+
+Endpoints (bodies and responses are JSON):
+    GET    /tracks?offset=&limit=&sort=&reverse=   one page of the catalog
+    GET    /tracks/<id>
+    GET    /search?q=&offset=&limit=&fuzzy=
+    POST   /tracks          {"name", "artist", "youtube_url", "rating"}
+    PATCH  /tracks/<id>     any of those fields
+    DELETE /tracks/<id>
+    POST   /tracks/<id>/play
+    POST   /batch           [{"method", "path", "body"}, ...] -> [{"status", "body"}, ...]
+
+Connections are kept alive (HTTP/1.1) and every request is served on
+the event loop thread, which owns the library like the Tk thread does in
+the GUI.
+"""
+import argparse
+import asyncio
+import json
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from play_history import PlayHistory, history_dir
+from playback import PlaybackDispatcher, make_launcher
+from sqlite_backend import SQLiteBackend
+from track_library import StorageBackend, Track, TrackLibrary
+from validation import validate_fields
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+MAX_BODY = 16 << 20
+MAX_BATCH = 1000
+# Seconds between checks for buffered plays that are due and for
+# changes saved by other processes
+FLUSH_CHECK = 1
+
+
+class ServiceError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _track_json(track_id, track):
+    return {'id': track_id, **track.to_dict()}
+
+
+def _int_param(params, name, default, maximum=None):
+    try:
+        value = int(params.get(name, [default])[0])
+    except ValueError:
+        raise ServiceError(400, f"{name} must be a number")
+    if value < 0:
+        raise ServiceError(400, f"{name} must not be negative")
+    return value if maximum is None else min(value, maximum)
+
+
+def _flag(params, name):
+    return params.get(name, ['0'])[0] not in ('0', 'false', '')
+
+
+class LibraryService:
+    def __init__(self, library, playback=None):
+        self.library = library
+        self.playback = playback
+        self.server = None
+        self.flusher = None
+
+    async def start(self, host='127.0.0.1', port=8765):
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        self.flusher = asyncio.ensure_future(self.flush_plays())
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.flusher.cancel()
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def flush_plays(self):
+        while True:
+            await asyncio.sleep(FLUSH_CHECK)
+            if self.library.play_flush_due():
+                self.library.flush_plays()
+            self.library.refresh()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                keep_alive = await self.handle_request(request_line, reader, writer)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle_request(self, request_line, reader, writer):
+        """Serve one request; returns whether the connection stays open"""
+        try:
+            method, target, version = request_line.decode('latin-1').split()
+        except ValueError:
+            self.respond(writer, 400, {'error': "Malformed request line"}, False)
+            return False
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection == 'keep-alive' if version == 'HTTP/1.0' else connection != 'close'
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            length = -1
+        if not 0 <= length <= MAX_BODY:
+            self.respond(writer, 413 if length > 0 else 400, {'error': "Bad Content-Length"}, False)
+            return False
+        body = await reader.readexactly(length) if length else b''
+
+        try:
+            data = json.loads(body) if body else None
+        except ValueError:
+            status, payload = 400, {'error': "Body is not valid JSON"}
+        else:
+            status, payload = self.dispatch(method, target, data)
+        self.respond(writer, status, payload, keep_alive)
+        return keep_alive
+
+    def respond(self, writer, status, payload, keep_alive):
+        data = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        writer.write(
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data
+        )
+
+    def dispatch(self, method, target, data):
+        """Run one API call and return ``(status, payload)``"""
+        try:
+            return self.route(method, target, data)
+        except ServiceError as e:
+            return e.status, {'error': str(e)}
+        except KeyError as e:
+            return 404, {'error': f"No track with ID {e.args[0]}"}
+        except ValueError as e:
+            return 400, {'error': str(e)}
+
+    def route(self, method, target, data):
+        url = urlsplit(target)
+        params = parse_qs(url.query)
+        parts = [part for part in url.path.split('/') if part]
+
+        if parts == ['tracks']:
+            if method == 'GET':
+                return 200, self.list_tracks(params)
+            if method == 'POST':
+                return 201, self.add_track(data)
+        elif len(parts) == 2 and parts[0] == 'tracks':
+            track_id = parts[1]
+            if method == 'GET':
+                return 200, _track_json(track_id, self.library.get_track(track_id))
+            if method == 'PATCH':
+                return 200, self.update_track(track_id, data)
+            if method == 'DELETE':
+                self.library.remove_track(track_id)
+                return 200, {'id': track_id}
+        elif len(parts) == 3 and parts[0] == 'tracks' and parts[2] == 'play':
+            if method == 'POST':
+                return 200, self.play(parts[1])
+        elif parts == ['search']:
+            if method == 'GET':
+                return 200, self.search(params)
+        elif parts == ['batch']:
+            if method == 'POST':
+                return 200, self.batch(data)
+        else:
+            raise ServiceError(404, f"No such endpoint: {url.path}")
+        raise ServiceError(405, f"{method} not allowed on {url.path}")
+
+    def window(self, params):
+        return (_int_param(params, 'offset', 0),
+                _int_param(params, 'limit', PAGE_SIZE, MAX_PAGE_SIZE))
+
+    def page(self, track_ids, total, offset, limit):
+        return {
+            'total': total,
+            'offset': offset,
+            'limit': limit,
+            'tracks': [_track_json(track_id, self.library.get_track(track_id)) for track_id in track_ids],
+        }
+
+    def list_tracks(self, params):
+        offset, limit = self.window(params)
+        sort = params.get('sort', [None])[0]
+        reverse = _flag(params, 'reverse')
+        if sort is None:
+            track_ids, total = self.library.catalog_page(offset, limit)
+            return self.page(track_ids, total, offset, limit)
+        if sort not in StorageBackend.SORT_COLUMNS:
+            raise ServiceError(400, f"Cannot sort by {sort}")
+        view = self.library.sorted_view(sort, reverse)
+        if view is None:
+            view = self.library.sorted_ids(sort, reverse)
+        # Slicing a sorted view only touches the requested rows
+        return self.page(view[offset:offset + limit], len(view), offset, limit)
+
+    def search(self, params):
+        offset, limit = self.window(params)
+        query = params.get('q', [''])[0]
+        if _flag(params, 'fuzzy'):
+            results = self.library.fuzzy_search(query, offset + limit)
+        else:
+            results = self.library.search(query)
+        return self.page(results[offset:offset + limit], len(results), offset, limit)
+
+    def _fields(self, data, required):
+        if not isinstance(data, dict):
+            raise ServiceError(400, "Body must be a JSON object")
+        unknown = set(data) - {'name', 'artist', 'youtube_url', 'rating', 'play_count'}
+        if unknown:
+            raise ServiceError(400, f"Unknown fields: {', '.join(sorted(unknown))}")
+        missing = [field for field in required if field not in data]
+        if missing:
+            raise ServiceError(400, f"Missing fields: {', '.join(missing)}")
+        fields = {}
+        for key in ('name', 'artist', 'youtube_url', 'rating'):
+            if key not in data:
+                continue
+            value = data[key]
+            if key == 'rating' and isinstance(value, int) and not isinstance(value, bool):
+                value = str(value)
+            if not isinstance(value, str):
+                raise ServiceError(422, f"{key} must be a string")
+            fields[key] = value.strip()
+        errors = validate_fields(fields)
+        if errors:
+            raise ServiceError(422, "; ".join(errors))
+        if 'rating' in fields:
+            fields['rating'] = int(fields['rating'])
+        if 'play_count' in data:
+            if type(data['play_count']) is not int or data['play_count'] < 0:
+                raise ServiceError(422, "play_count must be a non-negative integer")
+            fields['play_count'] = data['play_count']
+        return fields
+
+    def add_track(self, data):
+        fields = self._fields(data, ('name', 'artist', 'youtube_url'))
+        duplicates = self.library.tracks_by_video(fields['youtube_url'])
+        if duplicates:
+            raise ServiceError(409, f"This video is already in the library as track {duplicates[0]}")
+        track = Track(fields['name'], fields['artist'], fields['youtube_url'],
+                      fields.get('play_count', 0), fields.get('rating', 0))
+        track_id = self.library.add_new_track(track)
+        return _track_json(track_id, track)
+
+    def update_track(self, track_id, data):
+        fields = self._fields(data, ())
+        self.library.get_track(track_id)
+        if 'youtube_url' in fields:
+            others = [other for other in self.library.tracks_by_video(fields['youtube_url']) if other != track_id]
+            if others:
+                raise ServiceError(409, f"This video is already in the library as track {others[0]}")
+        return _track_json(track_id, self.library.update_track(track_id, **fields))
+
+    def play(self, track_id):
+        track = self.library.record_play(track_id)
+        if self.playback is not None:
+            self.playback.play(track_id, track.youtube_url)
+        return _track_json(track_id, track)
+
+    def batch(self, requests):
+        """Run several calls in one round trip, in order"""
+        if not isinstance(requests, list) or len(requests) > MAX_BATCH:
+            raise ServiceError(400, f"Body must be a list of at most {MAX_BATCH} requests")
+        responses = []
+        for request in requests:
+            if not isinstance(request, dict) or 'method' not in request or 'path' not in request:
+                responses.append({'status': 400, 'body': {'error': "Each request needs a method and a path"}})
+                continue
+            if urlsplit(str(request['path'])).path.rstrip('/') == '/batch':
+                responses.append({'status': 400, 'body': {'error': "Batches cannot be nested"}})
+                continue
+            status, payload = self.dispatch(
+                str(request['method']).upper(), str(request['path']), request.get('body')
+            )
+            responses.append({'status': status, 'body': payload})
+        return responses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the JukeBox library over HTTP/JSON")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: local only)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--library", default="library.json", help="JSON library to serve")
+    parser.add_argument("--db", help="serve a SQLite library at this path instead")
+    parser.add_argument("--player", help="also launch played tracks: 'browser' or a player command")
+    args = parser.parse_args()
+
+    path = args.db or args.library
+    library = TrackLibrary(args.library, journal=True, backups=3,
+                           backend=SQLiteBackend(args.db) if args.db else None,
+                           play_flush_interval=5, history=PlayHistory(history_dir(path)))
+    library.load_from_file()
+    playback = PlaybackDispatcher(make_launcher(args.player)) if args.player else None
+    service = LibraryService(library, playback)
+
+    async def serve():
+        port = await service.start(args.host, args.port)
+        print(f"Serving {path} on http://{args.host}:{port}", flush=True)
+        await service.server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if playback is not None:
+            playback.close()
+        library.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import bisect
+from collections.abc import Sequence
+
+# Columns compared through their folded keys, like search
+KEY_ATTRS = {'name': 'name_key', 'artist': 'artist_key'}
+
+# Up to this many pending keys are inserted one by one; more are merged
+# with a single sort (e.g. while a load fills the index).
+INSORT_LIMIT = 32
+
+
+class SortIndex:
+    """Track IDs kept sorted by one column.
+
+    Entries are ``(value, seq, track_id)`` tuples in a bisect-maintained
+    list; ``seq`` is the insertion sequence, so ties keep catalog order.
+    Changing one track costs two binary searches instead of a full sort.
+
+    add() only queues the new entry; call merge_pending() after a batch
+    of changes. Reads never change the index, so many threads may read
+    while no one writes.
+    """
+
+    def __init__(self, column):
+        self.column = column
+        self.attr = KEY_ATTRS.get(column, column)
+        self.keys = []
+        # Added since the last merge_pending()
+        self.pending = []
+        # track_id -> its current entry
+        self.doc_key = {}
+        self._next_seq = 0
+
+    def __len__(self):
+        return len(self.doc_key)
+
+    def add(self, track_id, track):
+        """Index a track, moving it if its value changed"""
+        value = getattr(track, self.attr)
+        old = self.doc_key.get(track_id)
+        if old is not None:
+            if old[0] == value:
+                return
+            self._remove(old)
+            seq = old[1]
+        else:
+            seq = self._next_seq
+            self._next_seq += 1
+        key = self.doc_key[track_id] = (value, seq, track_id)
+        self.pending.append(key)
+
+    def discard(self, track_id):
+        old = self.doc_key.pop(track_id, None)
+        if old is not None:
+            self._remove(old)
+
+    def _remove(self, key):
+        self.merge_pending()
+        del self.keys[bisect.bisect_left(self.keys, key)]
+
+    def clear(self):
+        self.keys.clear()
+        self.pending.clear()
+        self.doc_key.clear()
+
+    def merge_pending(self):
+        """Sort entries queued by add() into place"""
+        if self.pending:
+            if len(self.pending) <= INSORT_LIMIT:
+                for key in self.pending:
+                    bisect.insort(self.keys, key)
+            else:
+                self.keys.extend(self.pending)
+                self.keys.sort()
+            self.pending.clear()
+
+    def sorted_keys(self):
+        """The sorted entry list, as of the last merge_pending()"""
+        return self.keys
+
+    def position(self, track_id):
+        """Index of ``track_id`` in sorted order, raising ValueError if absent"""
+        key = self.doc_key.get(track_id)
+        if key is None:
+            raise ValueError(track_id)
+        keys = self.sorted_keys()
+        position = bisect.bisect_left(keys, key)
+        if position == len(keys) or keys[position] != key:
+            # Added but not merged yet
+            raise ValueError(track_id)
+        return position
+
+    def view(self, reverse=False):
+        return SortedView(self, reverse)
+
+
+class SortedView(Sequence):
+    """Live, read-only sequence of track IDs in a SortIndex's order.
+
+    It follows every change to the index, so a list showing it only has
+    to redraw. Reversed views list ties in reverse catalog order.
+    """
+
+    def __init__(self, sort_index, reverse=False):
+        self.sort_index = sort_index
+        self.reverse = reverse
+
+    def __len__(self):
+        return len(self.sort_index.sorted_keys())
+
+    def __getitem__(self, item):
+        keys = self.sort_index.sorted_keys()
+        if isinstance(item, slice):
+            positions = range(len(keys))[item]
+            if self.reverse:
+                return [keys[-1 - i][2] for i in positions]
+            return [keys[i][2] for i in positions]
+        if item < 0:
+            item += len(keys)
+        if not 0 <= item < len(keys):
+            raise IndexError(item)
+        return keys[-1 - item if self.reverse else item][2]
+
+    def __iter__(self):
+        keys = self.sort_index.sorted_keys()
+        for key in (reversed(keys) if self.reverse else keys):
+            yield key[2]
+
+    def __contains__(self, track_id):
+        return track_id in self.sort_index.doc_key
+
+    def index(self, track_id):
+        """Position of ``track_id`` in O(log n), raising ValueError if absent"""
+        position = self.sort_index.position(track_id)
+        return len(self) - 1 - position if self.reverse else position
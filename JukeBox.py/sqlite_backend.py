@@ -0,0 +1,435 @@
+import sqlite3
+from collections.abc import ItemsView, MutableMapping, ValuesView
+
+from search_index import NAME, fold_text, token_fields, tokenize
+from track_library import StorageBackend, Track, format_track_id
+from validation import video_id
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL COLLATE NOCASE,
+    artist TEXT NOT NULL COLLATE NOCASE,
+    youtube_url TEXT NOT NULL,
+    play_count INTEGER NOT NULL DEFAULT 0,
+    rating INTEGER NOT NULL DEFAULT 0,
+    name_key TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+    artist_key TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+    video_id TEXT
+);
+CREATE INDEX IF NOT EXISTS tracks_name ON tracks (name);
+CREATE INDEX IF NOT EXISTS tracks_artist ON tracks (artist);
+CREATE INDEX IF NOT EXISTS tracks_rating ON tracks (rating);
+CREATE INDEX IF NOT EXISTS tracks_play_count ON tracks (play_count);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# Indexes on the folded search keys and video IDs; created after _migrate() so older
+# databases have the columns first.
+KEY_INDEXES = """
+CREATE INDEX IF NOT EXISTS tracks_name_key ON tracks (name_key);
+CREATE INDEX IF NOT EXISTS tracks_artist_key ON tracks (artist_key);
+CREATE INDEX IF NOT EXISTS tracks_video_id ON tracks (video_id);
+"""
+
+# Word tokens of the folded keys, for per-word prefix search like SearchIndex's.
+# Created by _migrate() so older databases get it backfilled.
+SEARCH_TOKENS = """
+CREATE TABLE search_tokens (
+    token TEXT NOT NULL,
+    id TEXT NOT NULL,
+    flags INTEGER NOT NULL,
+    PRIMARY KEY (token, id)
+) WITHOUT ROWID;
+CREATE INDEX search_tokens_id ON search_tokens (id);
+"""
+
+# Best score of each track for one query term: the same weights as
+# SearchIndex._score (whole word over prefix, name over artist)
+TERM_SCORES = (
+    "SELECT id, MAX((CASE WHEN token = ? THEN 2 ELSE 1 END) * "
+    f"(CASE WHEN flags & {NAME} THEN 3 ELSE 2 END)) AS score "
+    "FROM search_tokens WHERE token >= ? AND token < ? GROUP BY id"
+)
+
+# Bumped whenever video_id() changes, so stored IDs are extracted again
+VIDEO_ID_FORMAT = 2
+
+COLUMNS = "id, name, artist, youtube_url, play_count, rating"
+WRITE_COLUMNS = COLUMNS + ", name_key, artist_key, video_id"
+# Updates in place so a track keeps its rowid (and list position)
+UPSERT = (
+    f"INSERT INTO tracks ({WRITE_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (id) DO UPDATE SET name = excluded.name, "
+    "artist = excluded.artist, youtube_url = excluded.youtube_url, "
+    "play_count = excluded.play_count, rating = excluded.rating, "
+    "name_key = excluded.name_key, artist_key = excluded.artist_key, "
+    "video_id = excluded.video_id"
+)
+
+
+def _row_values(track_id, track):
+    return (track_id, track.name, track.artist, track.youtube_url,
+            track.play_count, track.rating, track.name_key, track.artist_key,
+            track.video_id)
+
+
+class SQLiteTracks(MutableMapping):
+    """Dict-like view over the tracks table; rows are read on demand"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def __getitem__(self, track_id):
+        track = self.backend.get(track_id)
+        if track is None:
+            raise KeyError(track_id)
+        return track
+
+    def __setitem__(self, track_id, track):
+        self.backend.put(track_id, track)
+
+    def __delitem__(self, track_id):
+        self.backend.delete(track_id)
+
+    def __contains__(self, track_id):
+        row = self.backend.conn.execute(
+            "SELECT 1 FROM tracks WHERE id = ?", (track_id,)
+        ).fetchone()
+        return row is not None
+
+    def __iter__(self):
+        for (track_id,) in self.backend.conn.execute("SELECT id FROM tracks ORDER BY rowid"):
+            yield track_id
+
+    def __len__(self):
+        return self.backend.conn.execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
+
+    def items(self):
+        return _SQLiteItems(self)
+
+    def values(self):
+        return _SQLiteValues(self)
+
+
+class _SQLiteItems(ItemsView):
+    def __iter__(self):
+        return self._mapping.backend.iterate()
+
+
+class _SQLiteValues(ValuesView):
+    def __iter__(self):
+        for _, track in self._mapping.backend.iterate():
+            yield track
+
+
+class SQLiteBackend(StorageBackend):
+    """Stores tracks in an indexed SQLite table instead of memory.
+
+    Nothing is loaded up front: lookups, search and sorting are answered
+    by queries on the indexes, so startup time and memory use do not grow
+    with the catalog.
+    """
+
+    def __init__(self, path='library.db'):
+        self.path = path
+        self.conn = None
+        self.data_version = None
+        self.tracks = SQLiteTracks(self)
+
+    def load(self):
+        if self.conn is None:
+            # Autocommit: every put/delete is its own durable transaction.
+            # Shared with reader threads; TrackLibrary's lock keeps them
+            # off it while a write runs.
+            self.conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.data_version = self._data_version()
+            self.conn.executescript(SCHEMA)
+            self._migrate()
+            self.conn.executescript(KEY_INDEXES)
+            # Seeds the ID high-water mark once, for databases created
+            # before it was stored.
+            self.conn.execute(
+                "INSERT OR IGNORE INTO meta (key, value) "
+                "SELECT 'last_id', COALESCE(MAX(CAST(id AS INTEGER)), 0) FROM tracks"
+            )
+        return self.tracks
+
+    def _migrate(self):
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(tracks)")}
+        if 'name_key' not in columns:
+            self._add_search_keys()
+        video_format = self.conn.execute(
+            "SELECT value FROM meta WHERE key = 'video_id_format'"
+        ).fetchone()
+        if 'video_id' not in columns or video_format is None or video_format[0] < VIDEO_ID_FORMAT:
+            self._add_video_ids('video_id' not in columns)
+        tables = {row[0] for row in self.conn.execute("SELECT name FROM sqlite_master")}
+        if 'search_tokens' not in tables:
+            self._add_search_tokens()
+
+    def _add_search_keys(self):
+        # Databases from before folded search keys: add and backfill them
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.execute(
+                "ALTER TABLE tracks ADD COLUMN name_key TEXT NOT NULL DEFAULT '' COLLATE NOCASE"
+            )
+            self.conn.execute(
+                "ALTER TABLE tracks ADD COLUMN artist_key TEXT NOT NULL DEFAULT '' COLLATE NOCASE"
+            )
+            rows = self.conn.execute("SELECT id, name, artist FROM tracks").fetchall()
+            self.conn.executemany(
+                "UPDATE tracks SET name_key = ?, artist_key = ? WHERE id = ?",
+                [(fold_text(name), fold_text(artist), track_id) for track_id, name, artist in rows]
+            )
+
+    def _add_video_ids(self, add_column):
+        # Databases from before duplicate detection, or whose IDs an older
+        # video_id() extracted
+        with self.conn:
+            self.conn.execute("BEGIN")
+            if add_column:
+                self.conn.execute("ALTER TABLE tracks ADD COLUMN video_id TEXT")
+            rows = self.conn.execute("SELECT id, youtube_url FROM tracks").fetchall()
+            self.conn.executemany(
+                "UPDATE tracks SET video_id = ? WHERE id = ?",
+                [(video_id(url), track_id) for track_id, url in rows]
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('video_id_format', ?)",
+                (VIDEO_ID_FORMAT,)
+            )
+
+    def _add_search_tokens(self):
+        # New databases and those from before per-word search
+        with self.conn:
+            self.conn.execute("BEGIN")
+            for statement in SEARCH_TOKENS.split(';'):
+                self.conn.execute(statement)
+            rows = self.conn.execute("SELECT id, name_key, artist_key FROM tracks").fetchall()
+            self._write_tokens(rows)
+
+    def _write_tokens(self, rows):
+        """Re-tokenize ``(track_id, name_key, artist_key)`` rows"""
+        self.conn.executemany("DELETE FROM search_tokens WHERE id = ?", [(row[0],) for row in rows])
+        self.conn.executemany(
+            "INSERT INTO search_tokens (token, id, flags) VALUES (?, ?, ?)",
+            [(token, track_id, flags) for track_id, name_key, artist_key in rows
+             for token, flags in token_fields(name_key, artist_key).items()]
+        )
+
+    def _retitled(self, rows):
+        """Of rows about to be written, those whose name or artist changed.
+
+        Plays and ratings leave the tokens alone, so most writes skip them.
+        """
+        changed = []
+        for row in rows:
+            keys = (row[0], row[6], row[7])
+            old = self.conn.execute(
+                "SELECT id, name_key, artist_key FROM tracks WHERE id = ?", (row[0],)
+            ).fetchone()
+            if old != keys:
+                changed.append(keys)
+        return changed
+
+    @property
+    def last_id(self):
+        return self.conn.execute("SELECT value FROM meta WHERE key = 'last_id'").fetchone()[0]
+
+    def allocate_ids(self, count):
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            first = self.last_id + 1
+            self.conn.execute(
+                "UPDATE meta SET value = ? WHERE key = 'last_id'", (first + count - 1,)
+            )
+        return [format_track_id(number) for number in range(first, first + count)]
+
+    def _raise_last_id(self, number):
+        self.conn.execute(
+            "UPDATE meta SET value = ? WHERE key = 'last_id' AND value < ?", (number, number)
+        )
+
+    @staticmethod
+    def _row_to_track(row):
+        return Track(row[1], row[2], row[3], row[4], row[5])
+
+    def get(self, track_id):
+        row = self.conn.execute(
+            f"SELECT {COLUMNS} FROM tracks WHERE id = ?", (track_id,)
+        ).fetchone()
+        return self._row_to_track(row) if row else None
+
+    def put(self, track_id, track):
+        self.put_many([(track_id, track)])
+
+    def put_many(self, items):
+        rows = [_row_values(track_id, track) for track_id, track in items]
+        numbers = [int(row[0]) for row in rows if row[0].isdigit()]
+        with self.conn:
+            self.conn.execute("BEGIN")
+            if numbers:
+                self._raise_last_id(max(numbers))
+            retitled = self._retitled(rows)
+            self.conn.executemany(UPSERT, rows)
+            self._write_tokens(retitled)
+
+    def delete(self, track_id):
+        with self.conn:
+            self.conn.execute("BEGIN")
+            cursor = self.conn.execute("DELETE FROM tracks WHERE id = ?", (track_id,))
+            if cursor.rowcount == 0:
+                raise KeyError(track_id)
+            self.conn.execute("DELETE FROM search_tokens WHERE id = ?", (track_id,))
+
+    def iterate(self):
+        for row in self.conn.execute(f"SELECT {COLUMNS} FROM tracks ORDER BY rowid"):
+            yield row[0], self._row_to_track(row)
+
+    def page_ids(self, offset, limit):
+        cursor = self.conn.execute(
+            "SELECT id FROM tracks ORDER BY rowid LIMIT ? OFFSET ?", (limit, offset)
+        )
+        return [track_id for (track_id,) in cursor]
+
+    def iterate_snapshot(self):
+        # A connection of its own reads in one transaction, so WAL keeps
+        # showing it the catalog as of the first row while others write.
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("BEGIN")
+        cursor = conn.execute(f"SELECT {COLUMNS} FROM tracks ORDER BY rowid")
+        return self._rows(conn, cursor)
+
+    def _rows(self, conn, cursor):
+        try:
+            for row in cursor:
+                yield row[0], self._row_to_track(row)
+        finally:
+            conn.close()
+
+    def load_chunks(self, chunk_size):
+        # Runs on the loader thread, which cannot share self.conn.
+        conn = sqlite3.connect(self.path)
+        try:
+            cursor = conn.execute(f"SELECT {COLUMNS} FROM tracks ORDER BY rowid")
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield [(row[0], self._row_to_track(row)) for row in rows]
+        finally:
+            conn.close()
+
+    def replace(self, tracks):
+        rows = [_row_values(track_id, track) for track_id, track in tracks.items()]
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.execute("DELETE FROM tracks")
+            self.conn.execute("DELETE FROM search_tokens")
+            self.conn.executemany(
+                f"INSERT INTO tracks ({WRITE_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._write_tokens([(row[0], row[6], row[7]) for row in rows])
+            numbers = [int(track_id) for track_id in tracks if track_id.isdigit()]
+            if numbers:
+                self._raise_last_id(max(numbers))
+
+    def compact(self):
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def search(self, query):
+        # Every term must prefix a word of the name or artist, as with
+        # SearchIndex; each term is one range scan of the token table.
+        terms = sorted(set(tokenize(query)))
+        if not terms:
+            return []
+        params = [value for term in terms for value in (term, term, term + '\uffff')]
+        cursor = self.conn.execute(
+            f"SELECT id FROM ({' UNION ALL '.join([TERM_SCORES] * len(terms))}) "
+            "JOIN tracks USING (id) GROUP BY id HAVING COUNT(*) = ? "
+            "ORDER BY SUM(score) DESC, tracks.rowid",
+            params + [len(terms)]
+        )
+        return [track_id for (track_id,) in cursor]
+
+    def tracks_by_artist(self, artist):
+        cursor = self.conn.execute(
+            "SELECT id FROM tracks WHERE artist_key = ? ORDER BY rowid", (fold_text(artist),)
+        )
+        return [track_id for (track_id,) in cursor]
+
+    def tracks_by_video(self, video):
+        cursor = self.conn.execute(
+            "SELECT id FROM tracks WHERE video_id = ? ORDER BY rowid", (video,)
+        )
+        return [track_id for (track_id,) in cursor]
+
+    def duplicate_videos(self):
+        cursor = self.conn.execute(
+            "SELECT video_id, id FROM tracks WHERE video_id IN ("
+            "SELECT video_id FROM tracks WHERE video_id IS NOT NULL "
+            "GROUP BY video_id HAVING COUNT(*) > 1) ORDER BY video_id, rowid"
+        )
+        groups = {}
+        for video, track_id in cursor:
+            groups.setdefault(video, []).append(track_id)
+        return list(groups.values())
+
+    def artists(self):
+        # Any spelling of the artist will do as its display name
+        cursor = self.conn.execute(
+            "SELECT MIN(artist), COUNT(*) FROM tracks GROUP BY artist_key ORDER BY artist_key"
+        )
+        return cursor.fetchall()
+
+    def sorted_ids(self, column, reverse=False):
+        # column is checked against SORT_COLUMNS by TrackLibrary.
+        if column in ('name', 'artist'):
+            column += '_key'
+        direction = "DESC" if reverse else "ASC"
+        cursor = self.conn.execute(
+            f"SELECT id FROM tracks ORDER BY {column} {direction}, rowid"
+        )
+        return [track_id for (track_id,) in cursor]
+
+    def top_ids(self, column, limit):
+        # column is checked against RANK_COLUMNS by TrackLibrary. Walking
+        # its index backwards stops after ``limit`` rows.
+        cursor = self.conn.execute(
+            f"SELECT id FROM tracks ORDER BY {column} DESC, rowid DESC LIMIT ?", (limit,)
+        )
+        return [track_id for (track_id,) in cursor]
+
+    def top_rated_by_artist(self, artist, limit):
+        cursor = self.conn.execute(
+            "SELECT id FROM tracks WHERE artist_key = ? "
+            "ORDER BY rating DESC, play_count DESC, rowid LIMIT ?", (fold_text(artist), limit)
+        )
+        return [track_id for (track_id,) in cursor]
+
+    def _data_version(self):
+        # Changes only when another connection commits
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def changed_on_disk(self):
+        return self.conn is not None and self._data_version() != self.data_version
+
+    def refresh(self):
+        # SQLite already serialises writers and every read queries the
+        # table, so nothing needs merging; listeners only need telling.
+        if not self.changed_on_disk():
+            return []
+        self.data_version = self._data_version()
+        return None
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
@@ -13,6 +13,16 @@ class MockLibrary:
     def save_to_file(self):
         pass
 
+    def add_track(self, track_id, track):
+        self.tracks[track_id] = track
+
+    def update_track(self, track_id, **fields):
+        for key, value in fields.items():
+            setattr(self.tracks[track_id], key, value)
+
+    def remove_track(self, track_id):
+        del self.tracks[track_id]
+
 class MockTrack:
     def __init__(self, name, artist, url, rating):
         self.name = name
@@ -62,6 +72,21 @@ def test_update_track_invalid_rating():
         update_window.update_track()
         mock_error.assert_called_once_with("Error", "Rating must be between 0 and 5!")
 
+def test_update_track_invalid_url():
+    root = tk.Tk()
+    library = MockLibrary()
+    update_window = UpdateTrackWindow(root, library)
+    
+    update_window.entries["track_id"].delete(0, tk.END)
+    update_window.entries["track_id"].insert(0, "1")
+    update_window.entries["url"].delete(0, tk.END)
+    update_window.entries["url"].insert(0, "https://www.google.com")
+    
+    with patch('tkinter.messagebox.showerror') as mock_error:
+        update_window.update_track()
+        mock_error.assert_called_once_with("Error", "Invalid YouTube URL")
+    assert library.tracks["1"].youtube_url == "url1"
+
 def test_update_track_non_numeric_rating():
     root = tk.Tk()
     library = MockLibrary()
@@ -0,0 +1,69 @@
+import sys
+import threading
+import time
+from playback import CommandLauncher, PlaybackDispatcher, StubLauncher, make_launcher
+
+
+def wait_for_results(dispatcher, count, timeout=5):
+    results = []
+    deadline = time.monotonic() + timeout
+    while len(results) < count and time.monotonic() < deadline:
+        results += dispatcher.poll()
+        time.sleep(0.01)
+    return results
+
+
+def test_play_returns_before_the_launch_finishes():
+    launcher = StubLauncher(delay=0.2)
+    dispatcher = PlaybackDispatcher(launcher)
+    start = time.perf_counter()
+    dispatcher.play('01', 'https://youtu.be/1')
+    assert time.perf_counter() - start < 0.05
+    assert dispatcher.busy()
+
+    [(track_id, url, error, seconds)] = wait_for_results(dispatcher, 1)
+    assert (track_id, url, error) == ('01', 'https://youtu.be/1', None)
+    assert seconds >= 0.2 and not dispatcher.busy()
+    dispatcher.close()
+
+
+def test_queued_launches_are_superseded():
+    release = threading.Event()
+
+    class Blocking(StubLauncher):
+        def launch(self, url):
+            release.wait()
+            super().launch(url)
+
+    launcher = Blocking()
+    dispatcher = PlaybackDispatcher(launcher)
+    for i in range(4):
+        dispatcher.play(str(i), f"url{i}")
+        time.sleep(0.02)
+    release.set()
+    wait_for_results(dispatcher, 2)
+    assert launcher.launched == ['url0', 'url3']
+    assert not dispatcher.busy()
+    dispatcher.close()
+
+
+def test_errors_are_reported():
+    dispatcher = PlaybackDispatcher(StubLauncher(error=RuntimeError("no player")))
+    dispatcher.play('01', 'url')
+    [(_, _, error, _)] = wait_for_results(dispatcher, 1)
+    assert str(error) == "no player"
+    dispatcher.close()
+
+
+def test_make_launcher():
+    assert isinstance(make_launcher('stub'), StubLauncher)
+    launcher = make_launcher("mpv --no-video")
+    assert isinstance(launcher, CommandLauncher) and launcher.command == ['mpv', '--no-video']
+
+
+def test_command_launcher_runs_the_player(tmp_path):
+    out = tmp_path / 'played'
+    launcher = CommandLauncher([sys.executable, '-c', f"import sys; open({str(out)!r}, 'w').write(sys.argv[1])"])
+    launcher.launch('https://youtu.be/1')
+    launcher.processes[0].wait(5)
+    assert out.read_text() == 'https://youtu.be/1'
@@ -0,0 +1,53 @@
+from validation import validate_batch, validate_fields, validate_rating, validate_url, video_id
+
+
+def test_batch_matches_single_field_validators():
+    rows = [
+        ("Bạn Đời", "Karik", "https://youtu.be/h7cOOfpdEfk", "5"),
+        ("A", "Karik", "https://youtu.be/h7cOOfpdEfk", "3"),
+        ("Song", "B", "https://www.google.com", "9"),
+        ("Song", "Artist", "https://youtu.be/h7cOOfpdEfk", " 4"),
+        ("Song", "Artist", "https://youtu.be/h7cOOfpdEfk", "four"),
+    ]
+    assert validate_batch(rows) == [
+        (),
+        ("Name too short",),
+        ("Artist name too short", "Invalid YouTube URL", "Rating must be between 0-5"),
+        (),
+        ("Rating must be a number",),
+    ]
+
+
+def test_validate_fields_checks_only_given_fields():
+    assert validate_fields({}) == []
+    assert validate_fields({'url': "https://youtu.be/h7cOOfpdEfk", 'name': "Song"}) == []
+    assert validate_fields({'youtube_url': "nope", 'rating': "7"}) == [
+        "Invalid YouTube URL", "Rating must be between 0-5"
+    ]
+
+
+def test_rating_fast_path_keeps_int_rules():
+    assert validate_rating("0") is None and validate_rating(5) is None
+    assert validate_rating("05") is None
+    assert validate_rating("") == "Rating must be a number"
+    assert validate_url("youtu.be/h7cOOfpdEfk") is None
+
+
+def test_video_id():
+    for url in ("https://youtu.be/h7cOOfpdEfk?si=abc", "https://www.youtube.com/watch?v=h7cOOfpdEfk",
+                "http://youtube.com/embed/h7cOOfpdEfk", "youtu.be/h7cOOfpdEfk",
+                "https://www.youtube.com/shorts/h7cOOfpdEfk?feature=share",
+                "https://m.youtube.com/watch?feature=share&v=h7cOOfpdEfk"):
+        assert video_id(url) == "h7cOOfpdEfk"
+    assert video_id("https://www.youtube.com/shorts/AAAAAAAAAAA") != video_id("https://www.youtube.com/shorts/BBBBBBBBBBB")
+    assert video_id("https://www.google.com") is None
+
+
+def test_video_id_ignores_urls_without_a_video():
+    for url in ("https://www.youtube.com/channel/UCxxxxxxxxxxxxxxxxxxxxxx",
+                "https://www.youtube.com/@someartist", "https://www.youtube.com/@someartistxyz/videos",
+                "https://www.youtube.com/playlist?list=PLxxxxxxxxxxx",
+                "https://youtu.be/h7cOOfpdEfkTooLong"):
+        assert video_id(url) is None
+    # Still accepted as track URLs; they just never count as duplicates
+    assert validate_url("https://www.youtube.com/@someartist") is None
@@ -0,0 +1,114 @@
+import asyncio
+import pytest
+from loadtest import Client
+from service import LibraryService
+from track_library import Track
+
+
+def serve(library, session):
+    """Run ``session(client)`` against a service on a free port"""
+    async def run():
+        service = LibraryService(library)
+        port = await service.start(port=0)
+        client = await Client.connect('127.0.0.1', port)
+        try:
+            return await session(client)
+        finally:
+            await client.close()
+            await service.stop()
+    return asyncio.run(run())
+
+
+def test_requests_share_one_connection(library):
+    async def session(client):
+        return [await client.request('GET', f"/tracks/{track_id}") for track_id in ('01', '02', '99')]
+
+    first, second, missing = serve(library, session)
+    assert first == (200, {'id': '01', 'name': "Bạn Đời", 'artist': "Karik",
+                           'youtube_url': "https://youtu.be/h7cOOfpdEfk", 'play_count': 2, 'rating': 5})
+    assert second[1]['name'] == "Rock Song"
+    assert missing == (404, {'error': "No track with ID 99"})
+
+
+def test_pagination(library):
+    async def session(client):
+        return (await client.request('GET', "/tracks?offset=1&limit=1"),
+                await client.request('GET', "/tracks?sort=play_count&reverse=1&limit=2"),
+                await client.request('GET', "/tracks?sort=colour"),
+                await client.request('GET', "/tracks?limit=-1"))
+
+    page, top, bad_sort, bad_limit = serve(library, session)
+    assert page[1]['total'] == 3 and [t['id'] for t in page[1]['tracks']] == ['02']
+    assert [t['id'] for t in top[1]['tracks']] == ['02', '03']
+    assert bad_sort[0] == bad_limit[0] == 400
+
+
+def test_catalog_pages_follow_writes(library):
+    assert library.catalog_page(1, 5) == (['02', '03'], 3)
+    library.remove_track('02')
+    library.add_track('04', Track("New Song", "New Band", "https://youtu.be/ccccccccccc"))
+    assert library.catalog_page(1, 5) == (['03', '04'], 3)
+    assert library.catalog_page(5, 5) == ([], 3)
+
+
+def test_search(library):
+    async def session(client):
+        return (await client.request('GET', "/search?q=ban+doi"),
+                await client.request('GET', "/search?q=rok&fuzzy=1"))
+
+    exact, fuzzy = serve(library, session)
+    assert [t['id'] for t in exact[1]['tracks']] == ['01']
+    assert fuzzy[1]['tracks'][0]['id'] == '02'
+
+
+def test_add_update_remove(library):
+    async def session(client):
+        return (await client.request('POST', "/tracks", {'name': "New Song", 'artist': "New Band",
+                                                          'youtube_url': "https://youtu.be/ccccccccccc", 'rating': 2}),
+                await client.request('POST', "/tracks", {'name': "X", 'artist': "New Band",
+                                                          'youtube_url': "https://youtu.be/ddddddddddd"}),
+                await client.request('POST', "/tracks", {'name': "Again", 'artist': "Karik",
+                                                          'youtube_url': "https://www.youtube.com/watch?v=h7cOOfpdEfk"}),
+                await client.request('PATCH', "/tracks/02", {'rating': 5, 'name': "Rock Anthem"}),
+                await client.request('PATCH', "/tracks/02", {'colour': "red"}),
+                await client.request('DELETE', "/tracks/03"))
+
+    added, too_short, duplicate, updated, unknown, removed = serve(library, session)
+    assert added[0] == 201
+    assert library.get_track(added[1]['id']).name == "New Song"
+    assert too_short == (422, {'error': "Name too short"})
+    assert duplicate[0] == 409
+    assert updated[1]['name'] == "Rock Anthem" and library.get_track('02').rating == 5
+    assert unknown[0] == 400
+    assert removed == (200, {'id': '03'}) and '03' not in library.tracks
+
+
+def test_play_and_batch(library):
+    async def session(client):
+        return (await client.request('POST', "/tracks/01/play"),
+                await client.request('POST', "/batch", [
+                    {'method': 'POST', 'path': "/tracks/02/play"},
+                    {'method': 'POST', 'path': "/tracks/02/play"},
+                    {'method': 'GET', 'path': "/tracks/99"},
+                    {'method': 'POST', 'path': "/batch", 'body': []},
+                ]))
+
+    played, batch = serve(library, session)
+    assert played[1]['play_count'] == 3
+    assert [response['status'] for response in batch[1]] == [200, 200, 404, 400]
+    assert library.get_track('02').play_count == 11
+
+
+def test_bad_requests(library):
+    async def session(client):
+        client.writer.write(b"POST /tracks HTTP/1.1\r\nContent-Length: 5\r\n\r\n{nope")
+        await client.writer.drain()
+        bad_json = (await client.reader.readline()).split()[1]
+        # The connection survives a bad body
+        await client.reader.readuntil(b"\r\n\r\n")
+        await client.reader.readuntil(b"}")
+        return bad_json, await client.request('PUT', "/tracks"), await client.request('GET', "/nowhere")
+
+    bad_json, wrong_method, unknown = serve(library, session)
+    assert bad_json == b'400'
+    assert wrong_method[0] == 405 and unknown[0] == 404
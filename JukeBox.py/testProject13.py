@@ -0,0 +1,242 @@
+import sys
+import threading
+import time
+import pytest
+from rwlock import ReadWriteLock
+from search_index import fold_text
+from sqlite_backend import SQLiteBackend
+from track_library import Track, TrackLibrary
+
+
+def fill(library):
+    library.add_tracks(
+        (f"{i:02d}", Track(f"Song {i}", f"Artist {i % 7}", f"https://youtu.be/{i:011d}"))
+        for i in range(1, 201)
+    )
+    return library
+
+
+@pytest.fixture
+def library(tmp_path):
+    return fill(TrackLibrary(path=str(tmp_path / 'library.json'), journal=True))
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def any_library(request, tmp_path):
+    """The library fixture's catalog in each kind of storage"""
+    if request.param == 'json':
+        library = TrackLibrary(path=str(tmp_path / 'library.json'), journal=True)
+    else:
+        library = TrackLibrary(backend=SQLiteBackend(str(tmp_path / 'library.db')))
+    library.load_from_file()
+    yield fill(library)
+    library.close()
+
+
+def run_threads(targets, seconds):
+    """Run each target(stop) on its own thread; return what they raised"""
+    stop = threading.Event()
+    errors = []
+
+    def guarded(target):
+        try:
+            target(stop)
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+
+    threads = [threading.Thread(target=guarded, args=(target,)) for target in targets]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=10)
+    assert not any(thread.is_alive() for thread in threads)
+    return errors
+
+
+def test_writer_excludes_readers_and_waits_its_turn():
+    lock = ReadWriteLock()
+    log = []
+    lock.acquire_read()
+    lock.acquire_read()  # re-entrant
+
+    def writer():
+        with lock.writing():
+            log.append('write')
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    time.sleep(0.05)
+    log.append('read done')
+    lock.release_read()
+    lock.release_read()
+    thread.join(timeout=5)
+    assert log == ['read done', 'write']
+
+    with lock.writing():
+        with lock.reading(), lock.writing():
+            pass
+    with lock.reading():
+        with pytest.raises(RuntimeError):
+            lock.acquire_write()
+
+
+def test_waiting_writer_goes_before_new_readers():
+    lock = ReadWriteLock()
+    log = []
+    lock.acquire_read()
+
+    def write():
+        with lock.writing():
+            log.append('write')
+
+    def read():
+        with lock.reading():
+            log.append('read')
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    time.sleep(0.05)
+    reader = threading.Thread(target=read)
+    reader.start()
+    time.sleep(0.05)
+    assert log == []
+    lock.release_read()
+    writer.join(timeout=5)
+    reader.join(timeout=5)
+    assert log == ['write', 'read']
+
+
+def test_readers_get_a_turn_between_writes():
+    lock = ReadWriteLock()
+    reads = []
+
+    def write(stop):
+        while not stop.is_set():
+            with lock.writing():
+                time.sleep(0.001)
+
+    def read(stop):
+        while not stop.is_set():
+            with lock.reading():
+                reads.append(None)
+
+    assert run_threads([write, read], 0.5) == []
+    assert len(reads) > 10
+
+
+def test_tracks_is_read_only(library):
+    with pytest.raises(TypeError):
+        library.tracks['01'] = Track("X", "Y", "https://youtu.be/aaaaaaaaaaa")
+    with pytest.raises(TypeError):
+        del library.tracks['01']
+    assert library.tracks.get('missing') is None and len(library.tracks) == 200
+
+
+def test_snapshot_is_copy_on_write(library):
+    snapshot = library.snapshot()
+    old = snapshot['01']
+    library.update_track('01', name="Renamed")
+    library.record_play('02')
+    library.remove_track('03')
+    assert old.name == "Song 1" and snapshot['02'].play_count == 0 and '03' in snapshot
+    assert library.get_track('01').name == "Renamed" and '03' not in library.tracks
+
+    # Without a snapshot outstanding, writes don't copy the dict
+    tracks = library.backend.tracks
+    library.update_track('01', rating=2)
+    assert library.backend.tracks is tracks
+
+
+def test_readers_stress(any_library):
+    """Many readers beside one writer: no errors, torn tracks or moving snapshots"""
+    library = any_library
+    plays = 0
+
+    def writer(stop):
+        nonlocal plays
+        i = 1000
+        library.add_track('1000', Track("Song 1000", "Writer", f"https://youtu.be/{i:011d}"))
+        while not stop.is_set():
+            i += 1
+            library.add_track(f"{i:02d}", Track(f"Song {i}", "Writer", f"https://youtu.be/{i:011d}"))
+            library.update_track(f"{i - 1:02d}", name=f"Renamed {i}", artist=f"Artist {i % 5}")
+            library.record_play('01')
+            plays += 1
+            library.remove_track(f"{i - 1:02d}")
+
+    def reader(stop):
+        while not stop.is_set():
+            snapshot = library.snapshot()
+            first = list(snapshot.items())
+            assert library.search("song")
+            library.fuzzy_search("sogn", limit=5)
+            # The count and the sorted IDs must come from the same state
+            with library.lock.reading():
+                count = len(library.tracks)
+                pairs = library.iterate()
+                catalog = list(library.tracks)
+                for column in ('name', 'play_count'):
+                    ids = library.sorted_ids(column)
+                    assert len(set(ids)) == len(ids) == count
+            # Consumed after the lock is gone, still as of the call
+            assert [track_id for track_id, _ in pairs] == catalog
+            top = library.top_tracks()
+            assert len(set(top)) == len(top)
+            for track_id, track in first:
+                assert track.name_key == fold_text(track.name)
+                assert track.artist_key == fold_text(track.artist)
+            assert list(snapshot.items()) == first
+
+    errors = run_threads([writer] + [reader] * 8, seconds=1)
+    assert errors == []
+    assert plays and library.get_track('01').play_count == plays
+    assert library.search("writer") == [track_id for track_id in library.tracks
+                                        if library.get_track(track_id).artist == "Writer"]
+
+
+def test_sorted_reads_leave_the_index_alone(library):
+    """Readers of the sort indexes hold only the read lock, so must not change them"""
+    def writer(stop):
+        n = 10000
+        while not stop.is_set():
+            # More than a handful of changes at once, merged by one sort
+            library.add_tracks(
+                (str(i), Track(f"Song {i}", "Writer", f"https://youtu.be/{i:011d}"))
+                for i in range(n, n + 40)
+            )
+            n += 40
+
+    def reader(stop):
+        while not stop.is_set():
+            with library.lock.reading():
+                for column in library.sort_indexes:
+                    ids = library.sorted_ids(column)
+                    assert len(set(ids)) == len(ids) == len(library.tracks)
+
+    # Switch threads often, so readers overlap inside the index
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        errors = run_threads([writer] + [reader] * 8, seconds=1)
+    finally:
+        sys.setswitchinterval(interval)
+    assert errors == []
+    for index in library.sort_indexes.values():
+        assert len(index.sorted_keys()) == len(library.tracks)
+
+
+def test_worker_thread_writes(library):
+    """Writes from several threads serialise; none is lost"""
+    def player(stop):
+        for _ in range(200):
+            library.record_play('05')
+
+    errors = run_threads([player] * 4, seconds=0)
+    assert errors == []
+    assert library.get_track('05').play_count == 800
+    reopened = TrackLibrary(path=library.backend.path, journal=True)
+    reopened.load_from_file()
+    assert reopened.get_track('05').play_count == 800
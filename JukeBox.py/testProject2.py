@@ -2,14 +2,57 @@ import pytest
 import tkinter as tk
 from unittest.mock import patch, MagicMock
 from create_track_list import AddTrackWindow, FindTrackWindow
+from search_index import bounded_levenshtein
+from track_library import Track, TrackLibrary
+from validation import video_id
 
 class MockLibrary:
     def __init__(self):
         self.tracks = {}
+        self.last_id = 0
     
     def save_to_file(self):
         pass
 
+    def allocate_id(self):
+        self.last_id += 1
+        return str(self.last_id).zfill(2)
+
+    def add_track(self, track_id, track):
+        self.tracks[track_id] = track
+
+    def add_new_track(self, track):
+        track_id = self.allocate_id()
+        self.add_track(track_id, track)
+        return track_id
+
+    def tracks_by_video(self, url):
+        video = video_id(url)
+        return [track_id for track_id, track in self.tracks.items() if video and track.video_id == video]
+
+    def update_track(self, track_id, **fields):
+        for key, value in fields.items():
+            setattr(self.tracks[track_id], key, value)
+
+    def remove_track(self, track_id):
+        del self.tracks[track_id]
+
+    def search(self, query, limit=None, candidates=None):
+        query = query.strip().lower()
+        return [
+            track_id for track_id, track in self.tracks.items()
+            if query in track.name.lower() or query in track.artist.lower()
+            if candidates is None or track_id in candidates
+        ]
+
+    def fuzzy_search(self, query, limit=10, max_distance=2):
+        query = query.strip().lower()
+        return [
+            track_id for track_id, track in self.tracks.items()
+            if any(bounded_levenshtein(query, word, 1) <= 1
+                   for word in f"{track.name} {track.artist}".lower().split())
+        ][:limit]
+
 class MockTrack:
     def __init__(self, name, artist, url, play_count, rating):
         self.name = name
@@ -81,12 +124,27 @@ def test_add_track_successful():
     with patch('tkinter.messagebox.showinfo'):
         add_window.add_track()
     
-    assert len(library.tracks) == 1
-    track = list(library.tracks.values())[0]
+    assert list(library.tracks) == ["01"]
+    track = library.tracks["01"]
     assert track.name == "Test Track"
     assert track.artist == "Test Artist"
     assert track.rating == 4
 
+def test_add_track_rejects_duplicate_video():
+    library = MockLibrary()
+    library.tracks["01"] = Track("Never", "Rick", "https://youtu.be/dQw4w9WgXcQ?si=abc")
+    add_window = AddTrackWindow(tk.Tk(), library)
+    for key, value in (("name", "Again"), ("artist", "Rick"),
+                       ("url", "https://www.youtube.com/watch?v=dQw4w9WgXcQ"), ("rating", "3")):
+        add_window.entries[key].delete(0, tk.END)
+        add_window.entries[key].insert(0, value)
+
+    with patch('tkinter.messagebox.showerror') as mock_error:
+        add_window.add_track()
+        mock_error.assert_called_once()
+        assert "track 01" in mock_error.call_args[0][1]
+    assert list(library.tracks) == ["01"]
+
 def test_add_track_validation_errors():
     root = tk.Tk()
     library = MockLibrary()
@@ -149,4 +207,79 @@ def test_search_tracks_no_matches():
     
     # Check results
     results = find_window.results_text.get(1.0, tk.END)
-    assert "No matches found" in results
\ No newline at end of file
+    assert "No matches found" in results
+
+def test_search_tracks_suggests_close_matches():
+    root = tk.Tk()
+    library = MockLibrary()
+    library.tracks = {
+        "01": MockTrack("Rock Song", "Rock Band", "url1", 10, 4),
+        "02": MockTrack("Pop Track", "Pop Artist", "url2", 5, 3)
+    }
+    find_window = FindTrackWindow(root, library)
+
+    find_window.search_var.set("trak")
+    find_window.search_tracks()
+
+    results = find_window.results_text.get(1.0, tk.END)
+    assert "Did you mean" in results
+    assert "Pop Track" in results
+    assert "Rock Song" not in results
+
+def test_search_as_you_type_runs_in_background():
+    root = tk.Tk()
+    library = MockLibrary()
+    library.tracks = {
+        "01": MockTrack("Rock Song", "Rock Band", "url1", 10, 4),
+        "02": MockTrack("Pop Track", "Pop Artist", "url2", 5, 3)
+    }
+    find_window = FindTrackWindow(root, library)
+
+    find_window.search_var.set("ro")
+    find_window.start_search()
+    find_window.search_var.set("rock")
+    find_window.start_search()
+    # Wait for the worker; only the latest query is shown
+    for _ in range(200):
+        root.update()
+        if find_window.last_query == "rock":
+            break
+        root.after(10)
+    results = find_window.results_text.get(1.0, tk.END)
+    assert find_window.last_ids == ["01"]
+    assert "Rock Song" in results
+
+def test_query_after_one_without_words_is_not_narrowed(tmp_path):
+    root = tk.Tk()
+    library = TrackLibrary(path=str(tmp_path / 'library.json'))
+    library.add_track('01', Track("Rock Song", "Rock Band", "https://youtu.be/aaaaaaaaaaa"))
+    find_window = FindTrackWindow(root, library)
+    find_window.search_var.set(" ")
+    find_window.search_tracks()
+    assert find_window.last_ids == []
+
+    find_window.search_var.set(" rock")
+    find_window.start_search()
+    for _ in range(200):
+        root.update()
+        if find_window.last_query == " rock":
+            break
+        root.after(10)
+    assert find_window.last_ids == ['01']
+
+def test_results_are_paged():
+    root = tk.Tk()
+    library = MockLibrary()
+    library.tracks = {
+        str(i): MockTrack(f"Song {i}", "Artist", "url", 0, 3) for i in range(FindTrackWindow.PAGE_SIZE + 5)
+    }
+    find_window = FindTrackWindow(root, library)
+    find_window.search_var.set("song")
+    find_window.search_tracks()
+
+    first_page = find_window.results_text.get(1.0, tk.END)
+    assert first_page.count("ID: ") == FindTrackWindow.PAGE_SIZE
+    root.update()
+    root.after(20)
+    root.update()
+    assert find_window.results_text.get(1.0, tk.END).count("ID: ") == FindTrackWindow.PAGE_SIZE + 5
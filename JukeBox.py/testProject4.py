@@ -0,0 +1,226 @@
+import sqlite3
+import pytest
+from sqlite_backend import SQLiteBackend
+from track_library import Track, TrackLibrary
+
+
+@pytest.fixture
+def library(make_library, tmp_path):
+    return make_library(backend=SQLiteBackend(str(tmp_path / 'library.db')))
+
+
+def test_get_and_mapping_access(library):
+    assert library.get_track('02').name == "Rock Song"
+    assert '03' in library.tracks
+    assert '99' not in library.tracks
+    assert len(library.tracks) == 3
+    assert list(library.tracks) == ['01', '02', '03']
+    with pytest.raises(KeyError):
+        library.get_track('99')
+
+
+def test_update_and_remove_persist(library, tmp_path):
+    library.update_track('01', rating=3)
+    library.record_play('01')
+    library.remove_track('02')
+    library.close()
+
+    reopened = TrackLibrary(backend=SQLiteBackend(str(tmp_path / 'library.db')))
+    reopened.load_from_file()
+    assert [track_id for track_id, _ in reopened.iterate()] == ['01', '03']
+    assert reopened.tracks['01'].rating == 3
+    assert reopened.tracks['01'].play_count == 3
+    reopened.close()
+
+
+def test_search_is_case_insensitive_prefix(library):
+    assert library.search("rock") == ['02']
+    assert library.search("POP") == ['03']
+    assert library.search("100%") == []
+
+
+def test_search_ignores_accents(library):
+    assert library.search("ban doi") == ['01']
+    # A whole word in the name outranks a word prefix in the artist
+    assert library.search("BẠN") == ['01', '02']
+
+
+def test_old_database_gets_search_keys(tmp_path):
+    path = str(tmp_path / 'old.db')
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE tracks (id TEXT PRIMARY KEY, name TEXT NOT NULL COLLATE NOCASE, "
+        "artist TEXT NOT NULL COLLATE NOCASE, youtube_url TEXT NOT NULL, "
+        "play_count INTEGER NOT NULL DEFAULT 0, rating INTEGER NOT NULL DEFAULT 0)"
+    )
+    conn.execute("INSERT INTO tracks VALUES ('01', 'Bạn Đời', 'Karik', 'https://youtu.be/h7cOOfpdEfk', 0, 0)")
+    conn.commit()
+    conn.close()
+
+    library = TrackLibrary(backend=SQLiteBackend(path))
+    library.load_from_file()
+    assert library.search("doi karik") == ['01']
+    assert library.tracks_by_video("https://www.youtube.com/watch?v=h7cOOfpdEfk") == ['01']
+    library.close()
+
+
+def test_search_matches_in_memory_backend(library, tmp_path):
+    memory = TrackLibrary(path=str(tmp_path / 'library.json'))
+    for track_id, track in library.iterate():
+        memory.add_track(track_id, track)
+    for each in (library, memory):
+        each.add_track('04', Track("Rock Night", "Karik", "https://youtu.be/ccccccccccc"))
+        each.add_track('05', Track("Rockabilly", "Doi Band", "https://youtu.be/ddddddddddd"))
+    queries = ["doi", "doi karik", "KARIK bạn", "rock", "ro", "rock night", "rock ban",
+               "pop karik", "art", "100%", "", "  ", "đời"]
+
+    def same_results():
+        for query in queries:
+            assert library.search(query) == memory.search(query), query
+
+    same_results()
+    assert library.search("doi") == ['01', '05']
+    for each in (library, memory):
+        each.update_track('02', name="Doi Moi")
+        each.remove_track('03')
+        each.record_play('05')
+    same_results()
+    assert library.search("pop") == []
+
+
+def test_sorted_ids(library):
+    assert library.sorted_ids('play_count', reverse=True) == ['02', '03', '01']
+    assert library.sorted_ids('name') == ['01', '03', '02']
+    with pytest.raises(ValueError):
+        library.sorted_ids('youtube_url')
+
+
+def test_catalog_page(library):
+    assert library.catalog_page(1, 1) == (['02'], 3)
+    assert library.catalog_page(2, 10) == (['03'], 3)
+
+
+def test_replace_catalog(library):
+    library.tracks = {'10': Track("Only", "One", "https://youtu.be/ccccccccccc")}
+    assert list(library.tracks) == ['10']
+
+
+def test_load_in_background_pages_rows(library):
+    chunks = library.load_in_background(chunk_size=2)
+    pages = []
+    while True:
+        chunk = chunks.get(timeout=5)
+        if chunk is None:
+            break
+        pages.append([track_id for track_id, _ in chunk])
+    library.finish_loading()
+    assert pages == [['01', '02'], ['03']]
+
+
+def test_fuzzy_search(library):
+    assert library.fuzzy_search("karick") == ['01']
+    assert library.fuzzy_search("rok sonq") == ['02']
+
+
+def test_allocate_ids_persist(library, tmp_path):
+    assert library.allocate_id() == '04'
+    library.add_track('04', Track("New", "Artist", "https://youtube.com/4"))
+    library.remove_track('04')
+    library.close()
+
+    reopened = TrackLibrary(backend=SQLiteBackend(str(tmp_path / 'library.db')))
+    reopened.load_from_file()
+    assert reopened.allocate_ids(2) == ['05', '06']
+    reopened.close()
+
+
+def test_add_tracks_in_one_transaction(library):
+    # A taken ID rejects the whole batch rather than overwriting a track
+    with pytest.raises(ValueError):
+        library.add_tracks([
+            ('10', Track("Bulk One", "Artist", "https://youtu.be/ddddddddddd")),
+            ('02', Track("Rock Song", "Rock Band", "https://youtu.be/aaaaaaaaaaa", 10, 3)),
+        ])
+    assert list(library.tracks) == ['01', '02', '03']
+    library.add_tracks([
+        ('10', Track("Bulk One", "Artist", "https://youtu.be/ddddddddddd")),
+        ('11', Track("Bulk Two", "Artist", "https://youtu.be/eeeeeeeeeee")),
+    ])
+    assert list(library.tracks) == ['01', '02', '03', '10', '11']
+    assert library.add_new_tracks([Track("Bulk Three", "Artist", "https://youtu.be/fffffffffff")]) == ['12']
+
+
+def test_tracks_by_artist(library):
+    library.add_track('04', Track("Another", "KARIK", "https://youtu.be/eeeeeeeeeee"))
+    assert library.tracks_by_artist("karik") == ['01', '04']
+    # Either spelling may name the artist
+    assert [(name.lower(), count) for name, count in library.artists()] == [
+        ("karik", 2), ("pop artist", 1), ("rock band", 1)
+    ]
+    assert library.sorted_ids('artist') == ['01', '04', '03', '02']
+
+
+def test_charts(library):
+    library.add_track('04', Track("Another", "KARIK", "https://youtu.be/eeeeeeeeeee", 9, 5))
+    assert library.top_tracks('play_count', 2) == ['04', '02']
+    assert library.top_tracks('rating', 3) == ['04', '01', '03']
+    assert library.top_rated_by_artist("karik") == ['04', '01']
+    library.record_play('03')
+    assert library.recently_played() == ['03']
+
+
+def test_buffered_plays(tmp_path):
+    library = TrackLibrary(backend=SQLiteBackend(str(tmp_path / 'library.db')), play_flush_interval=60)
+    library.load_from_file()
+    library.add_track('01', Track("Bạn Đời", "Karik", "https://youtu.be/h7cOOfpdEfk", 2, 5))
+    library.record_play('01')
+    library.record_play('01')
+    # Buffered, but readers through the library already see it
+    assert library.backend.get('01').play_count == 2
+    assert library.get_track('01').play_count == 4
+    library.close()
+
+    reopened = TrackLibrary(backend=SQLiteBackend(str(tmp_path / 'library.db')))
+    reopened.load_from_file()
+    assert reopened.get_track('01').play_count == 4
+    reopened.close()
+
+
+def test_duplicate_videos(library):
+    library.add_track('04', Track("Again", "Karik", "https://www.youtube.com/watch?v=h7cOOfpdEfk"))
+    assert library.tracks_by_video("https://youtu.be/h7cOOfpdEfk?si=x") == ['01', '04']
+    assert library.tracks_by_video("not a url") == []
+    assert library.duplicate_videos() == [['01', '04']]
+    library.update_track('04', youtube_url="https://youtu.be/ccccccccccc")
+    assert library.duplicate_videos() == []
+
+
+def test_stale_video_ids_are_extracted_again(library, tmp_path):
+    # As stored by the old extractor, which took any 11 characters
+    library.backend.conn.execute("UPDATE tracks SET video_id = 'shorts/AAAA'")
+    library.backend.conn.execute("DELETE FROM meta WHERE key = 'video_id_format'")
+    library.close()
+
+    reopened = TrackLibrary(backend=SQLiteBackend(str(tmp_path / 'library.db')))
+    reopened.load_from_file()
+    assert reopened.duplicate_videos() == []
+    assert reopened.tracks_by_video("https://youtu.be/h7cOOfpdEfk") == ['01']
+    reopened.close()
+
+
+def test_refresh_sees_other_connections(library, tmp_path):
+    other = TrackLibrary(backend=SQLiteBackend(str(tmp_path / 'library.db')), play_flush_interval=60)
+    other.load_from_file()
+    other.record_play('02')
+    events = []
+    library.subscribe(lambda event, track_id: events.append(event))
+    assert not library.refresh()
+
+    library.update_track('02', rating=5)
+    # The buffered play lands on top of the new rating
+    other.flush_plays()
+    assert library.refresh() and not library.refresh()
+    assert events == ['update', 'reload']
+    track = library.get_track('02')
+    assert (track.play_count, track.rating) == (10, 5)
+    other.close()
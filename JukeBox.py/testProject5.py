@@ -0,0 +1,88 @@
+import pytest
+import time
+import tkinter as tk
+from track_library import JsonFileBackend, Track, TrackLibrary
+from track_player import MainApplication
+from virtual_list import VirtualTrackList
+
+def make_list(count):
+    rows = {str(i): (f"Track {i}", f"Artist {i}", i % 6, 0) for i in range(count)}
+    root = tk.Tk()
+    track_list = VirtualTrackList(root, ('Track', 'Artist', 'Rating', 'Play Count'), rows.__getitem__)
+    track_list.set_rows(rows)
+    return track_list, rows
+
+def test_only_visible_rows_are_materialized():
+    track_list, rows = make_list(10000)
+    assert len(track_list.tree.get_children()) == track_list.visible + track_list.overscan
+    assert track_list.item_for.keys() == set(track_list.rows[:track_list.window_size()])
+
+def test_refresh_row_updates_in_place():
+    track_list, rows = make_list(100)
+    item = track_list.item_for['3']
+    rows['3'] = ("Track 3", "Artist 3", 5, 1)
+    track_list.refresh_row('3')
+    assert track_list.item_for['3'] == item
+    assert track_list.tree.item(item, 'values')[3] == '1'
+
+def test_scroll_moves_window():
+    track_list, rows = make_list(1000)
+    track_list.scroll(50)
+    assert track_list.first == 50
+    assert '50' in track_list.item_for
+    assert '0' not in track_list.item_for
+
+def test_selection_follows_track_across_scrolling():
+    track_list, rows = make_list(1000)
+    track_list.move_selection(1)
+    track_list.move_selection(1)
+    assert track_list.selected_track_id() == '1'
+    track_list.scroll(100)
+    track_list.scroll(-100)
+    assert track_list.tree.selection() == (track_list.item_for['1'],)
+
+def test_remove_row():
+    track_list, rows = make_list(10)
+    track_list.remove_row('0')
+    assert track_list.rows[0] == '1'
+    assert '0' not in track_list.item_for
+
+def test_live_rows_follow_a_sorted_view(tmp_path):
+    library = TrackLibrary(path=str(tmp_path / 'library.json'))
+    for i in range(50):
+        library.add_track(str(i), Track(f"Track {i}", "Artist", "url", i, 0))
+    track_list = VirtualTrackList(
+        tk.Tk(), ('Track', 'Play Count'),
+        lambda track_id: (library.tracks[track_id].name, library.tracks[track_id].play_count)
+    )
+    track_list.set_rows(library.sorted_view('play_count', reverse=True), live=True)
+    assert track_list.rows[0] == '49'
+
+    library.update_track('3', play_count=100)
+    track_list.render()
+    assert track_list.track_for[track_list.slots[0]] == '3'
+    track_list.move_selection(1)
+    track_list.move_selection(1)
+    assert track_list.selected_track_id() == '49'
+
+def test_loading_replays_journaled_changes(tmp_path):
+    path = str(tmp_path / 'library.json')
+    library = TrackLibrary(path=path, journal=True)
+    for i in range(1, 4):
+        library.add_track(f'0{i}', Track(f"Track {i}", "Artist", f"https://youtu.be/{i}", 0, 1))
+    library.save_to_file()
+    library.remove_track('02')
+    library.update_track('03', rating=5)
+    library.close()
+
+    app = MainApplication(JsonFileBackend(path, journal=True))
+    try:
+        deadline = time.time() + 5
+        while app.loading and time.time() < deadline:
+            app.poll_loading()
+            time.sleep(0.01)
+        assert not app.loading and not app.library.backend.loading
+        assert app.track_list.rows == ['01', '03']
+        assert app.track_list.tree.item(app.track_list.item_for['03'], 'values')[2] == '5'
+    finally:
+        app.shutdown()
@@ -0,0 +1,103 @@
+import pytest
+from search_index import SearchIndex, bounded_levenshtein, fold_text, fuzzy_scan, tokenize
+from track_library import Track, TrackLibrary
+
+@pytest.fixture
+def index():
+    index = SearchIndex()
+    index.add('01', Track("Rock Song", "Rock Band", "url1"))
+    index.add('02', Track("Pop Track", "Pop Artist", "url2"))
+    index.add('03', Track("Rockabilly Nights", "Pop Artist", "url3"))
+    index.add('04', Track("Night Rocks", "Karik", "url4"))
+    return index
+
+def test_tokenize():
+    assert tokenize("Rock & Roll, Vol. 2") == ['rock', 'roll', 'vol', '2']
+
+def test_prefix_match(index):
+    assert set(index.search("rock")) == {'01', '03', '04'}
+    assert index.search("kar") == ['04']
+    assert index.search("jazz") == []
+    assert index.search("   ") == []
+
+def test_exact_and_name_matches_rank_first(index):
+    # '01' has 'rock' as a whole word in name and artist
+    assert index.search("rock")[0] == '01'
+
+def test_multi_term_and(index):
+    # '04' has 'night' as a whole word, '03' only as a prefix
+    assert index.search("rock night") == ['04', '03']
+    assert index.search("pop rock") == ['03']
+    assert index.search("pop karik") == []
+
+def test_limit(index):
+    assert len(index.search("rock", limit=2)) == 2
+
+def test_update_and_discard(index):
+    index.add('02', Track("Jazz Track", "Pop Artist", "url2"))
+    assert index.search("jazz") == ['02']
+    assert '02' in index.search("pop")
+    index.discard('02')
+    assert index.search("jazz") == []
+    assert 'jazz' not in index.postings
+    assert index.vocabulary == sorted(index.postings)
+
+def test_library_keeps_index_current(tmp_path):
+    library = TrackLibrary(path=str(tmp_path / 'library.json'))
+    library.add_track('01', Track("Rock Song", "Rock Band", "url1"))
+    library.add_track('02', Track("Pop Track", "Pop Artist", "url2"))
+    assert library.search("rock") == ['01']
+
+    library.update_track('02', name="Rock Ballad")
+    assert library.search("rock") == ['01', '02']
+    library.remove_track('01')
+    assert library.search("rock") == ['02']
+
+    reloaded = TrackLibrary(path=str(tmp_path / 'library.json'))
+    reloaded.load_from_file()
+    assert reloaded.search("ballad") == ['02']
+
+def test_search_within_candidates(index):
+    assert set(index.search("ro", candidates=['01', '02', '04'])) == {'01', '04'}
+    assert index.search("rock", candidates=['02']) == []
+    assert index.search("rock", candidates=['99']) == []
+
+def test_accent_insensitive_matching(tmp_path):
+    assert fold_text("Bạn Đời") == "ban doi"
+    track = Track("Bạn Đời", "Karik", "url1")
+    assert (track.name_key, track.artist_key) == ("ban doi", "karik")
+
+    library = TrackLibrary(path=str(tmp_path / 'library.json'))
+    library.add_track('01', track)
+    assert library.search("ban doi") == ['01']
+    assert library.search("BẠN") == ['01']
+
+    library.update_track('01', name="Sau Cơn Mưa")
+    assert library.tracks['01'].name_key == "sau con mua"
+    assert library.search("con mua") == ['01']
+    assert library.search("ban") == []
+
+def test_bounded_levenshtein():
+    assert bounded_levenshtein("karik", "karik", 2) == 0
+    assert bounded_levenshtein("kraik", "karik", 2) == 2
+    assert bounded_levenshtein("karik", "kar", 2) == 2
+    assert bounded_levenshtein("karik", "pop", 2) == 3
+
+def test_fuzzy_search(index):
+    assert index.fuzzy_search("karick") == ['04']
+    assert index.fuzzy_search("rok sng") == ['01']
+    # Short terms get no typo budget
+    assert index.fuzzy_search("ro") == []
+    assert index.fuzzy_search("jazzz") == []
+    index.discard('04')
+    assert index.fuzzy_search("karick") == []
+    assert not any('karik' in tokens for tokens in index.grams.values())
+
+def test_fuzzy_search_matches_brute_force(tmp_path):
+    library = TrackLibrary(path=str(tmp_path / 'library.json'))
+    library.add_track('01', Track("Bạn Đời", "Karik", "url1"))
+    library.add_track('02', Track("Rock Song", "Rock Band", "url2"))
+    library.add_track('03', Track("Rockabilly Nights", "Kariq", "url3"))
+    for query in ("karik", "ban doii", "rokc", "nights karic", "xyzzy"):
+        assert library.fuzzy_search(query) == fuzzy_scan(query, library.iterate())
+    assert library.fuzzy_search("karik") == ['01', '03']
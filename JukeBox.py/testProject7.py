@@ -0,0 +1,99 @@
+import csv
+import json
+import pytest
+from importer import import_file, read_m3u
+
+
+@pytest.fixture
+def library(make_library):
+    return make_library(1)
+
+
+def test_csv_import_validates_and_dedupes(library, tmp_path):
+    path = tmp_path / 'tracks.csv'
+    path.write_text(
+        "name,artist,youtube_url,rating\n"
+        "Rock Song,Rock Band,https://youtu.be/aaaaaaaaaaa,3\n"
+        "X,Rock Band,https://youtu.be/bbbbbbbbbbb,3\n"
+        "Again,Karik,https://www.youtube.com/watch?v=h7cOOfpdEfk,4\n"
+        "Pop Track,Pop Artist,https://youtu.be/ccccccccccc,\n"
+        "Rock Song,Rock Band,https://youtu.be/aaaaaaaaaaa?si=share,3\n",
+        encoding='utf-8'
+    )
+    rejects = tmp_path / 'rejects.csv'
+    report = import_file(library, str(path), rejects_path=str(rejects))
+
+    assert (report.read, report.imported, report.rejected, report.duplicates) == (5, 2, 1, 2)
+    assert [track.name for _, track in library.iterate()] == ["Bạn Đời", "Rock Song", "Pop Track"]
+    assert library.get_track('03').rating == 0
+    with open(rejects, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert [(row['line'], row['reason']) for row in rows] == [
+        ('3', "Name too short"), ('4', "Duplicate YouTube URL"), ('6', "Duplicate YouTube URL")
+    ]
+
+
+def test_urls_without_a_video_are_not_duplicates(library, tmp_path):
+    path = tmp_path / 'tracks.csv'
+    path.write_text(
+        "name,artist,youtube_url,rating\n"
+        "Channel,Karik,https://www.youtube.com/channel/UCabcdefghij,3\n"
+        "Handle,Karik,https://www.youtube.com/@karikmusic,3\n",
+        encoding='utf-8'
+    )
+    report = import_file(library, str(path))
+    assert (report.read, report.imported, report.duplicates) == (2, 2, 0)
+
+
+def test_jsonl_import_rejects_bad_lines(library, tmp_path):
+    path = tmp_path / 'tracks.jsonl'
+    path.write_text(
+        json.dumps({'name': "Rock Song", 'artist': "Rock Band", 'url': "https://youtu.be/aaaaaaaaaaa", 'rating': 4}) + "\n"
+        "{not json\n"
+        "\n"
+        + json.dumps({'name': "Pop Track", 'artist': "Pop Artist", 'youtube_url': "invalid"}) + "\n",
+        encoding='utf-8'
+    )
+    report = import_file(library, str(path))
+    assert (report.read, report.imported, report.rejected) == (3, 1, 2)
+    assert library.get_track('02').rating == 4
+
+
+def test_m3u_reader(tmp_path):
+    path = tmp_path / 'playlist.m3u'
+    path.write_text(
+        "#EXTM3U\n"
+        "#EXTINF:215,Karik - Bạn Đời\n"
+        "https://youtu.be/h7cOOfpdEfk\n"
+        "https://youtu.be/aaaaaaaaaaa\n",
+        encoding='utf-8'
+    )
+    assert list(read_m3u(str(path))) == [
+        (3, {'name': "Bạn Đời", 'artist': "Karik", 'youtube_url': "https://youtu.be/h7cOOfpdEfk"}),
+        (4, {'name': "", 'artist': "", 'youtube_url': "https://youtu.be/aaaaaaaaaaa"}),
+    ]
+
+
+def test_import_is_one_write(library, tmp_path, monkeypatch):
+    path = tmp_path / 'tracks.csv'
+    path.write_text(
+        "name,artist,url,rating\n" + "".join(
+            f"Song {i},Artist,https://youtu.be/{i:011d},1\n" for i in range(50)
+        ),
+        encoding='utf-8'
+    )
+    saves = []
+    monkeypatch.setattr(library.backend, 'save_to_file', lambda: saves.append(1))
+    events = []
+    library.subscribe(lambda event, track_id: events.append(event))
+
+    report = import_file(library, str(path))
+    assert report.imported == 50
+    assert len(saves) == 1
+    assert events == ['reload']
+    assert library.search("song 49") == ['51']
+
+
+def test_unknown_format(library, tmp_path):
+    with pytest.raises(ValueError):
+        import_file(library, str(tmp_path / 'tracks.xml'))
@@ -0,0 +1,79 @@
+import csv
+import json
+import pytest
+from exporter import read_packed
+from importer import import_file
+from sqlite_backend import SQLiteBackend
+from track_library import TrackLibrary
+
+
+@pytest.fixture
+def library(make_library):
+    library = make_library(2)
+    # A name the CSV writer has to quote
+    library.update_track('02', name="Rock, \"Song\"")
+    return library
+
+
+def test_json_export_is_compact_and_loadable(library, tmp_path):
+    path = str(tmp_path / 'export.json')
+    library.export(path)
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    assert '\n' not in text and "Bạn Đời" in text
+    assert json.loads(text)['02'] == library.get_track('02').to_dict()
+
+    copy = TrackLibrary(path=path)
+    copy.load_from_file()
+    assert copy.get_track('01').name == "Bạn Đời"
+
+
+def test_jsonl_and_csv_round_trip_through_importer(library, tmp_path):
+    for name in ('export.jsonl', 'export.csv'):
+        path = str(tmp_path / name)
+        library.export(path)
+        target = TrackLibrary(path=str(tmp_path / f'{name}.library.json'))
+        report = import_file(target, path)
+        assert report.imported == 2
+        assert [t.name for _, t in target.iterate()] == ["Bạn Đời", "Rock, \"Song\""]
+
+    with open(tmp_path / 'export.csv', newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert rows[1]['id'] == '02' and rows[1]['play_count'] == '9'
+
+
+def test_packed_round_trip(library, tmp_path):
+    path = str(tmp_path / 'export.jbx')
+    library.export(path)
+    with open(path, 'rb') as f:
+        records = list(read_packed(f))
+    assert records == [(track_id, track.to_dict()) for track_id, track in library.iterate()]
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    with open(path, 'wb') as f:
+        f.write(data[:-3])
+    with open(path, 'rb') as f, pytest.raises(ValueError):
+        list(read_packed(f))
+
+
+def test_arrow_export(library, tmp_path):
+    pyarrow = pytest.importorskip('pyarrow')
+    path = str(tmp_path / 'export.arrow')
+    library.export(path)
+    with pyarrow.ipc.open_stream(path) as reader:
+        table = reader.read_all()
+    assert table.column('name').to_pylist() == ["Bạn Đời", "Rock, \"Song\""]
+
+
+def test_sqlite_export(make_library, tmp_path):
+    library = make_library(1, backend=SQLiteBackend(str(tmp_path / 'library.db')))
+    library.export(str(tmp_path / 'export.jsonl'))
+    with open(tmp_path / 'export.jsonl', encoding='utf-8') as f:
+        assert json.loads(f.readline())['id'] == '01'
+
+
+def test_unknown_format_leaves_no_file(library, tmp_path):
+    with pytest.raises(ValueError):
+        library.export(str(tmp_path / 'export.xml'))
+    assert list(tmp_path.glob('export*')) == []
@@ -0,0 +1,74 @@
+import os
+import time
+from play_history import DAY, HOUR, PlayHistory, history_dir
+from track_library import Track, TrackLibrary
+
+# A recent midnight (UTC), so hourly buckets are within the retention
+MIDNIGHT = int(time.time()) // DAY * DAY - DAY
+
+
+def make_history(tmp_path, **kwargs):
+    history = PlayHistory(str(tmp_path / 'library.history'), **kwargs)
+    history.open()
+    return history
+
+
+def test_window_counts_use_hours_and_days(tmp_path):
+    history = make_history(tmp_path)
+    for when in (MIDNIGHT - 2 * DAY, MIDNIGHT - 10, MIDNIGHT + 5, MIDNIGHT + 3 * HOUR):
+        history.record('01', when)
+    history.record('02', MIDNIGHT + 3 * HOUR)
+    assert history.count('01', MIDNIGHT, MIDNIGHT + DAY) == 2
+    assert history.count('01', MIDNIGHT, MIDNIGHT + HOUR) == 1
+    assert history.count('01', MIDNIGHT - 3 * DAY, MIDNIGHT + 4 * HOUR) == 4
+    assert history.top(MIDNIGHT + HOUR, MIDNIGHT + DAY) == [('01', 1), ('02', 1)]
+    assert history.trending(hours=2, now=MIDNIGHT + 4 * HOUR) == [('01', 1), ('02', 1)]
+
+
+def test_reopen_replays_only_after_checkpoint(tmp_path):
+    history = make_history(tmp_path, segment_bytes=64)
+    for i in range(20):
+        history.record('01', MIDNIGHT + i)
+    history.flush()
+    segments = history._segments()
+    assert len(segments) > 1
+    # Checkpoint offsets are byte positions in the segment file
+    assert history.segment_size == os.path.getsize(history._segment_path(history.segment))
+
+    # Crash without close(): the tail after the last rotation is replayed
+    reopened = make_history(tmp_path, segment_bytes=64)
+    assert reopened.count('01', MIDNIGHT, MIDNIGHT + DAY) == 20
+    reopened.close()
+
+    # Without the checkpoint every segment is read again
+    os.remove(reopened.checkpoint_path)
+    rebuilt = make_history(tmp_path)
+    assert rebuilt.count('01', MIDNIGHT, MIDNIGHT + DAY) == 20
+
+
+def test_torn_tail_is_dropped(tmp_path):
+    history = make_history(tmp_path)
+    history.record('01', MIDNIGHT)
+    history.close()
+    with open(history._segment_path(1), 'a') as f:
+        f.write(f'{MIDNIGHT}\t0')
+    reopened = make_history(tmp_path)
+    reopened.record('02', MIDNIGHT)
+    assert reopened.top(MIDNIGHT, MIDNIGHT + HOUR) == [('01', 1), ('02', 1)]
+
+
+def test_library_logs_plays(tmp_path):
+    path = str(tmp_path / 'library.json')
+    library = TrackLibrary(path=path, history=PlayHistory(history_dir(path)))
+    library.load_from_file()
+    library.add_track('01', Track("Song1", "Artist1", "https://youtube.com/1"))
+    library.add_track('02', Track("Song2", "Artist2", "https://youtube.com/2"))
+    for track_id in ('01', '02', '02'):
+        library.record_play(track_id)
+    assert library.trending() == [('02', 2), ('01', 1)]
+    library.remove_track('02')
+    assert library.trending() == [('01', 1)]
+    now = time.time()
+    assert library.plays_between('01', now - HOUR, now) == 1
+    library.close()
+    assert os.path.exists(tmp_path / 'library.history' / 'rollups.json')
@@ -1,7 +1,169 @@
+import codecs
+import functools
+import heapq
 import json  # Thư viện này dùng để đọc và ghi dữ liệu dưới dạng tệp JSON.
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from collections.abc import Mapping
+from contextlib import contextmanager, nullcontext
+from itertools import islice
+from types import MappingProxyType
+
+from exporter import export_tracks
+from file_lock import FileLock
+from rwlock import ReadWriteLock
+from search_index import SearchIndex, fold_text, fuzzy_scan
+from sort_index import SortIndex
+from validation import video_id
+
+
+def _fsync_dir(path):
+    """Make a rename inside ``path`` durable (no-op where unsupported)"""
+    try:
+        fd = os.open(path or '.', os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _write_atomic(path, data):
+    """Write bytes to ``path`` so readers see either the old or the new file"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_dir(os.path.dirname(path))
+
+
+def _file_stamp(path):
+    """Identity of the file at ``path``, or None; a rename or rewrite changes it"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
+
+
+def iter_json_object(f, block_size=65536):
+    """Yield ``(key, value)`` pairs of a top-level JSON object in binary
+    file ``f`` without parsing the whole document first.
+
+    Returns the CRC32 of the bytes read, for the snapshot integrity check.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    crc = 0
+    buf = ''
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buf, pos, crc, eof
+        block = f.read(block_size)
+        crc = zlib.crc32(block, crc)
+        eof = not block
+        buf = buf[pos:] + utf8.decode(block, final=eof)
+        pos = 0
+
+    def next_char():
+        # Skip whitespace, reading more input as needed; '' means EOF.
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n':
+                pos += 1
+            if pos < len(buf) or eof:
+                return buf[pos:pos + 1]
+            fill()
+
+    def next_value():
+        nonlocal pos
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                # Either truly invalid or cut off at the end of the buffer.
+                if eof:
+                    raise
+                fill()
+                next_char()
+                continue
+            if end == len(buf) and not eof and not isinstance(value, (dict, list, str)):
+                # A number at the buffer edge may continue in the next block.
+                fill()
+                next_char()
+                continue
+            pos = end
+            return value
+
+    def expect(chars):
+        nonlocal pos
+        char = next_char()
+        if not char or char not in chars:
+            raise ValueError(f"Expected one of {chars!r} in library snapshot, got {char!r}")
+        pos += 1
+        return char
+
+    expect('{')
+    if next_char() == '}':
+        pos += 1
+    else:
+        while True:
+            if next_char() != '"':
+                raise ValueError("Expected a string key in library snapshot")
+            key = next_value()
+            expect(':')
+            next_char()
+            yield key, next_value()
+            if expect(',}') == '}':
+                break
+    if next_char():
+        raise ValueError("Unexpected data after library snapshot")
+    return crc
+
+
+def _chunked(items, chunk_size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def format_track_id(number):
+    """Turn an allocated number into a track ID ('01', '02', ..., '100')"""
+    return str(number).zfill(2)
+
 
 # Lớp Track: Dùng để lưu thông tin về một bài hát.
 class Track:
+    FIELDS = ('name', 'artist', 'youtube_url', 'play_count', 'rating')
+    # No per-instance __dict__: a large catalog holds millions of these.
+    __slots__ = ('_name', 'name_key', '_artist', 'artist_key',
+                 '_youtube_url', 'video_id', 'play_count', 'rating')
+
     def __init__(self, name, artist, youtube_url, play_count=0, rating=0):
         self.name = name
         self.artist = artist
@@ -9,6 +171,45 @@ class Track:
         self.play_count = play_count
         self.rating = rating
 
+    # name_key / artist_key hold the case- and accent-folded text used for
+    # searching; they are refreshed whenever name or artist is assigned.
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, value):
+        self._name = value
+        self.name_key = fold_text(value)
+
+    @property
+    def artist(self):
+        return self._artist
+
+    @artist.setter
+    def artist(self, value):
+        # Artists repeat across many tracks; share one copy of each string
+        self._artist = sys.intern(value)
+        self.artist_key = sys.intern(fold_text(value))
+
+    # video_id is the URL's YouTube video ID (None if it has none), so
+    # differently written links to one video can be recognised.
+    @property
+    def youtube_url(self):
+        return self._youtube_url
+
+    @youtube_url.setter
+    def youtube_url(self, value):
+        self._youtube_url = value
+        self.video_id = video_id(value)
+
+    def copy(self):
+        """A separate Track with the same fields, without re-folding the keys"""
+        track = Track.__new__(Track)
+        for slot in Track.__slots__:
+            setattr(track, slot, getattr(self, slot))
+        return track
+
     def to_dict(self):
         return {
             'name': self.name,
@@ -28,22 +229,1346 @@ class Track:
             data['rating']
         )
 
-class TrackLibrary:
-    def __init__(self):
+def _top_rated(track_ids, get_track, limit):
+    # nlargest is stable, so equal tracks keep catalog order
+    def rank(track_id):
+        track = get_track(track_id)
+        return track.rating, track.play_count
+    return heapq.nlargest(limit, track_ids, key=rank)
+
+
+class StorageBackend:
+    """Interface between TrackLibrary and the place tracks are stored.
+
+    ``tracks`` is the mapping of track ID to Track that TrackLibrary
+    exposes; ``put`` and ``delete`` must persist the change themselves.
+    """
+    # Sortable columns; backends may keep indexes on these.
+    SORT_COLUMNS = ('name', 'artist', 'rating', 'play_count')
+    # Numeric columns charts rank tracks by
+    RANK_COLUMNS = ('rating', 'play_count')
+
+    tracks = None
+    # Set when load() had to fall back to an older copy of the catalog.
+    recovered_from = None
+    # True when ``tracks`` is a plain in-memory dict; TrackLibrary then
+    # keeps its own indexes instead of asking the backend to query.
+    in_memory = False
+    # Highest numeric track ID ever stored or handed out (high-water mark).
+    last_id = 0
+
+    def load(self):
+        """Open the store and return the ``tracks`` mapping"""
+        raise NotImplementedError
+
+    def get(self, track_id):
+        """Return the Track stored under ``track_id`` or None"""
+        raise NotImplementedError
+
+    def put(self, track_id, track):
+        """Insert or replace a track"""
+        raise NotImplementedError
+
+    def put_many(self, items):
+        """Insert or replace many ``(track_id, track)`` pairs in one write"""
+        for track_id, track in items:
+            self.put(track_id, track)
+
+    def delete(self, track_id):
+        """Remove a track, raising KeyError if it does not exist"""
+        raise NotImplementedError
+
+    def iterate(self):
+        """Yield ``(track_id, track)`` pairs in insertion order"""
+        raise NotImplementedError
+
+    def iterate_snapshot(self):
+        """Like iterate(), but as of the call: later writes don't show up"""
+        return iter(self.snapshot().items())
+
+    def allocate_ids(self, count):
+        """Reserve ``count`` new track IDs above every ID used so far"""
+        first = self.last_id + 1
+        self.last_id += count
+        return [format_track_id(number) for number in range(first, first + count)]
+
+    def _note_id(self, track_id):
+        # Keep the high-water mark above explicitly chosen numeric IDs
+        if track_id.isdigit() and int(track_id) > self.last_id:
+            self.last_id = int(track_id)
+
+    def begin_load(self):
+        """Prepare for load_chunks(); called on the thread that owns ``tracks``"""
+        self.load()
+
+    def load_chunks(self, chunk_size):
+        """Yield lists of ``(track_id, track)`` pairs read from storage.
+
+        May run on a worker thread, so it must not touch ``tracks``; a None
+        track marks a removal. Each chunk is handed to merge() afterwards.
+        """
+        return _chunked(self.iterate(), chunk_size)
+
+    def merge(self, chunk):
+        """Apply one chunk from load_chunks() to ``tracks``"""
+
+    def end_load(self):
+        """Called once load_chunks() is exhausted or has failed"""
+
+    def replace(self, tracks):
+        """Replace the whole catalog with the given mapping"""
+        raise NotImplementedError
+
+    def save(self):
+        """Write out anything not yet persisted"""
+
+    def compact(self):
+        """Reclaim space used by incremental writes"""
+
+    def search(self, query):
+        """Return IDs of tracks whose name or artist matches ``query``.
+
+        Only used when the backend is not in_memory; TrackLibrary indexes
+        in-memory catalogs itself.
+        """
+        raise NotImplementedError
+
+    def fuzzy_search(self, query, limit=10, max_distance=2):
+        """Return IDs of the tracks closest to ``query``, allowing typos"""
+        return fuzzy_scan(query, self.iterate(), limit, max_distance)
+
+    def tracks_by_artist(self, artist):
+        """Return IDs of the tracks whose folded artist equals ``artist``'s"""
+        key = fold_text(artist)
+        return [track_id for track_id, track in self.iterate() if track.artist_key == key]
+
+    def artists(self):
+        """Return ``(artist, track count)`` pairs ordered by folded name"""
+        counts = {}
+        names = {}
+        for _, track in self.iterate():
+            counts[track.artist_key] = counts.get(track.artist_key, 0) + 1
+            names.setdefault(track.artist_key, track.artist)
+        return [(names[key], counts[key]) for key in sorted(counts)]
+
+    def sorted_ids(self, column, reverse=False):
+        """Return all track IDs ordered by one of SORT_COLUMNS (not in_memory only)"""
+        raise NotImplementedError
+
+    def tracks_by_video(self, video):
+        """Return IDs of the tracks linking to the YouTube video ID ``video``"""
+        return [track_id for track_id, track in self.iterate() if track.video_id == video]
+
+    def duplicate_videos(self):
+        """Return lists of track IDs that link to the same video"""
+        groups = {}
+        for track_id, track in self.iterate():
+            if track.video_id is not None:
+                groups.setdefault(track.video_id, []).append(track_id)
+        return [ids for ids in groups.values() if len(ids) > 1]
+
+    def top_ids(self, column, limit):
+        """Return IDs of the ``limit`` tracks with the highest ``column``"""
+        best = heapq.nlargest(limit, self.iterate(), key=lambda item: getattr(item[1], column))
+        return [track_id for track_id, _ in best]
+
+    def top_rated_by_artist(self, artist, limit):
+        """Return IDs of ``artist``'s best-rated tracks, most played first on ties"""
+        return _top_rated(self.tracks_by_artist(artist), self.get, limit)
+
+    def snapshot(self):
+        """Return a ``track_id -> Track`` mapping that later writes leave alone"""
+        return dict(self.iterate())
+
+    def page_ids(self, offset, limit):
+        """Return up to ``limit`` track IDs from ``offset`` in insertion order"""
+        return [track_id for track_id, _ in islice(self.iterate(), offset, offset + limit)]
+
+    def stage(self, track_id, track):
+        """Show ``track`` to readers before it is written, e.g. a buffered play"""
+
+    def write_lock(self):
+        """Context manager held by TrackLibrary around every write"""
+        return nullcontext()
+
+    def changed_on_disk(self):
+        """True if another process may have changed the stored catalog"""
+        return False
+
+    def refresh(self):
+        """Catch up with writes made by other processes.
+
+        Returns ``(event, track_id)`` pairs for what changed, with the
+        events listeners receive, or None if the whole catalog was re-read.
+        """
+        return []
+
+    def close(self):
+        """Release files or connections held by the backend"""
+
+class JsonFileBackend(StorageBackend):
+    """Keeps the whole catalog in a dict backed by a JSON snapshot file"""
+    in_memory = True
+
+    def __init__(self, path='library.json', journal=False, compact_every=1000,
+                 backups=0):
         self.tracks = {}
+        self.path = path
+        # Snapshots are written atomically; <path>.meta records their size
+        # and checksum, and up to `backups` older generations are kept as
+        # <path>.1 (newest) ... <path>.N.
+        self.meta_path = path + '.meta'
+        self.backups = backups
+        self.recovered_from = None
+        # In journal mode every mutation appends one compact record to
+        # <path>.journal instead of rewriting the whole snapshot.
+        self.journal = journal
+        self.journal_path = path + '.journal'
+        self.compact_every = compact_every
+        self.journal_entries = 0
+        self._journal_file = None
+        # While a background load is filling `tracks` a snapshot would miss
+        # the unread part, so mutations are journaled until it finishes.
+        self.loading = False
+        self._loaded_journal_entries = 0
+        # Other processes may share the files. Writers hold <path>.lock
+        # exclusively and first merge what was written since this process
+        # last looked: a new snapshot (by its stat stamp) means re-reading
+        # everything, a longer journal only its tail.
+        self.lock = FileLock(path + '.lock')
+        self.snapshot_stamp = None
+        self.journal_offset = 0
+        self._read_offset = 0
+        self._load_stamp = None
+        self.replaced = False
+        # True while a snapshot() shares `tracks`; the next write copies it
+        self._shared = False
+        # (tracks, list of its IDs) for page_ids(); stale once `tracks`
+        # is copied or replaced
+        self._order = None
 
-    def save_to_file(self):
-        with open('library.json', 'w') as f:
-            json_data = {k: v.to_dict() for k, v in self.tracks.items()}
-            json.dump(json_data, f, indent=4)
+    def load(self):
+        self.load_from_file()
+        return self.tracks
 
-    def load_from_file(self):
+    def get(self, track_id):
+        return self.tracks.get(track_id)
+
+    def snapshot(self):
+        # Copy on write: readers keep this dict, writers switch to a copy
+        self._shared = True
+        return self.tracks
+
+    def page_ids(self, offset, limit):
+        # Every page until the next write slices one ID list. Readers
+        # racing to build it build equal ones.
+        order = self._order
+        if order is None or order[0] is not self.tracks:
+            tracks = self.snapshot()
+            order = self._order = (tracks, list(tracks))
+        return order[1][offset:offset + limit]
+
+    def _own(self):
+        if self._shared:
+            self.tracks = dict(self.tracks)
+            self._shared = False
+
+    def stage(self, track_id, track):
+        self._own()
+        self.tracks[track_id] = track
+
+    def put(self, track_id, track):
+        self._own()
+        self.tracks[track_id] = track
+        self._note_id(track_id)
+        self._commit('put', track_id, track)
+
+    def put_many(self, items):
+        items = list(items)
+        self._own()
+        for track_id, track in items:
+            self.tracks[track_id] = track
+            self._note_id(track_id)
+        if self._snapshot_due(len(items)):
+            self.save_to_file()
+        elif items:
+            self._append_journal([
+                {'op': 'put', 'id': track_id, 'track': track.to_dict()}
+                for track_id, track in items
+            ])
+
+    def delete(self, track_id):
+        self._own()
+        del self.tracks[track_id]
+        self._commit('del', track_id)
+
+    def iterate(self):
+        return iter(list(self.tracks.items()))
+
+    def replace(self, tracks):
+        self.tracks = tracks
+        self._shared = False
+        for track_id in tracks:
+            self._note_id(track_id)
+        # The replacement is meant to overwrite whatever is on disk, so
+        # other processes' changes are not merged into it before saving
+        self.replaced = True
+
+    def begin_load(self):
+        self.tracks = {}
+        self._shared = False
+        # Taken before reading; if the snapshot is replaced meanwhile the
+        # stamps differ and the next refresh() reloads
+        self._load_stamp = _file_stamp(self.path)
+        self.replaced = False
+        self.last_id = self._stored_last_id()
+        # Journaled IDs are only merged at the end of the load; note them
+        # now so allocate_ids() cannot hand one out meanwhile. Compaction
+        # keeps the journal short, so this is a quick read.
+        for track_id, _ in self._read_journal():
+            self._note_id(track_id)
+        self.journal_entries = 0
+        self._loaded_journal_entries = 0
+        self.recovered_from = None
+        self.loading = True
+
+    def load_chunks(self, chunk_size):
+        streamed = []
+        try:
+            for chunk in _chunked(self._stream_snapshot(), chunk_size):
+                streamed.extend(track_id for track_id, _ in chunk)
+                yield chunk
+        except FileNotFoundError:
+            if os.path.exists(self._backup_path(1)):
+                yield from _chunked(self._recover_from_backups().items(), chunk_size)
+        except ValueError:
+            # Take back the tracks the corrupt snapshot already handed out
+            # that the backup lacks, so the load ends with exactly the
+            # backup's tracks, as load_from_file() would.
+            backup = self._recover_from_backups()
+            removed = [(track_id, None) for track_id in streamed if track_id not in backup]
+            yield from _chunked(removed, chunk_size)
+            yield from _chunked(backup.items(), chunk_size)
+        yield from _chunked(self._read_journal(), chunk_size)
+
+    def merge(self, chunk):
+        self._own()
+        for track_id, track in chunk:
+            # Removed IDs count too, so they are never handed out again
+            self._note_id(track_id)
+            if track is None:
+                self.tracks.pop(track_id, None)
+            else:
+                self.tracks[track_id] = track
+
+    def end_load(self):
+        self.journal_entries += self._loaded_journal_entries
+        self.snapshot_stamp = self._load_stamp
+        self.journal_offset = self._read_offset
+        self.loading = False
+
+    def write_lock(self):
+        return self.lock.held()
+
+    def changed_on_disk(self):
+        """Two stat() calls; no lock and no parsing"""
+        if self.loading or self.replaced:
+            return False
+        return (_file_stamp(self.path) != self.snapshot_stamp
+                or _file_size(self.journal_path) != self.journal_offset)
+
+    def refresh(self):
+        if self.loading or self.replaced:
+            return []
+        with self.lock.held(exclusive=False):
+            journal_size = _file_size(self.journal_path)
+            if _file_stamp(self.path) != self.snapshot_stamp or journal_size < self.journal_offset:
+                # A new snapshot folded in (and removed) the journal we had
+                # open, so our handle may point at a deleted file.
+                self.close()
+                self.load_from_file()
+                return None
+            if journal_size == self.journal_offset:
+                return []
+            changes = []
+            self._own()
+            for track_id, track in self._read_journal(self.journal_offset):
+                self._note_id(track_id)
+                if track is None:
+                    if self.tracks.pop(track_id, None) is not None:
+                        changes.append(('remove', track_id))
+                else:
+                    changes.append(('update' if track_id in self.tracks else 'add', track_id))
+                    self.tracks[track_id] = track
+            self.journal_entries += self._loaded_journal_entries
+            self.journal_offset = self._read_offset
+            return changes
+
+    def _read_meta(self, path):
         try:
-            with open('library.json', 'r') as f:
-                data = json.load(f)
-                self.tracks = {k: Track.from_dict(v) for k, v in data.items()}
+            with open(path + '.meta', 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _stored_last_id(self):
+        # Remembers IDs of tracks removed before the last snapshot. The
+        # backups count too, in case loading falls back to one of them.
+        paths = [self.path] + [self._backup_path(g) for g in range(1, self.backups + 1)]
+        metas = [self._read_meta(path) for path in paths]
+        return max((meta.get('last_id', 0) for meta in metas if meta is not None), default=0)
+
+    def _stream_snapshot(self):
+        meta = self._read_meta(self.path)
+        with open(self.path, 'rb') as f:
+            items = iter_json_object(f)
+            while True:
+                try:
+                    track_id, data = next(items)
+                except StopIteration as done:
+                    crc = done.value
+                    size = f.tell()
+                    break
+                try:
+                    yield track_id, Track.from_dict(data)
+                except (KeyError, TypeError) as e:
+                    raise ValueError(f"Corrupt library snapshot {self.path}: {e}") from e
+        if meta is not None and (meta.get('crc32') != crc or meta.get('size') != size):
+            # Same policy as _read_snapshot(): a complete parse wins.
+            print(f"Warning: checksum mismatch for {self.path}, snapshot parsed anyway")
+
+    def save(self):
+        self.save_to_file()
+
+    def _snapshot_due(self, count):
+        # Without a journal every write is a snapshot; with one, a snapshot
+        # replaces the append once compaction would follow it anyway.
+        return not self.loading and (
+            not self.journal or self.journal_entries + count >= self.compact_every
+        )
+
+    def _commit(self, op, track_id, track=None):
+        if self._snapshot_due(1):
+            self.save_to_file()
+            return
+        record = {'op': op, 'id': track_id}
+        if track is not None:
+            record['track'] = track.to_dict()
+        self._append_journal([record])
+
+    def _append_journal(self, records):
+        with self.lock.held():
+            if self._journal_file is None:
+                # Binary, so offsets are bytes on every platform
+                self._journal_file = open(self.journal_path, 'ab')
+            self._journal_file.write(''.join(
+                json.dumps(record, separators=(',', ':')) + '\n' for record in records
+            ).encode('utf-8'))
+            self._journal_file.flush()
+            if not self.loading:
+                self.journal_offset = self._journal_file.tell()
+
+        self.journal_entries += len(records)
+
+    def compact(self):
+        """Fold the journal into a fresh snapshot"""
+        self.save_to_file()
+
+    def _truncate_journal(self):
+        if self._journal_file is not None:
+            self._journal_file.close()
+            self._journal_file = None
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self.journal_entries = 0
+
+    def _read_journal(self, offset=0):
+        """Yield ``(track_id, track)`` per journal record from byte ``offset``, None for removals"""
+        self._loaded_journal_entries = 0
+        self._read_offset = offset
+        try:
+            f = open(self.journal_path, 'rb')
         except FileNotFoundError:
-            self.tracks = {}
+            self._read_offset = 0
+            return
+        with f:
+            f.seek(offset)
+            for line in f:
+                # A torn last line means we crashed mid-append; everything
+                # before it is still valid.
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if record['op'] == 'put':
+                    yield record['id'], Track.from_dict(record['track'])
+                elif record['op'] == 'del':
+                    yield record['id'], None
+                self._loaded_journal_entries += 1
+                self._read_offset += len(line)
+
+    def _replay_journal(self):
+        self.merge(self._read_journal())
+        self.journal_entries += self._loaded_journal_entries
+        self.journal_offset = self._read_offset
+
+    def close(self):
+        """Release the journal file handle"""
+        if self._journal_file is not None:
+            self._journal_file.close()
+            self._journal_file = None
+
+    def _backup_path(self, generation):
+        return f"{self.path}.{generation}"
+
+    def _rotate_backups(self):
+        if not self.backups or not os.path.exists(self.path):
+            return
+        for generation in range(self.backups, 1, -1):
+            source = self._backup_path(generation - 1)
+            target = self._backup_path(generation)
+            for suffix in ('', '.meta'):
+                if os.path.exists(source + suffix):
+                    os.replace(source + suffix, target + suffix)
+        # The newest backup is a hard link (or copy) so the live snapshot
+        # never disappears, even if we crash before the new one lands.
+        for suffix in ('', '.meta'):
+            source = self.path + suffix
+            target = self._backup_path(1) + suffix
+            if not os.path.exists(source):
+                continue
+            if os.path.exists(target):
+                os.remove(target)
+            try:
+                os.link(source, target)
+            except OSError:
+                shutil.copy2(source, target)
+
+    def save_to_file(self):
+        json_data = {k: v.to_dict() for k, v in self.tracks.items()}
+        data = json.dumps(json_data, indent=4).encode('utf-8')
+        meta = {'size': len(data), 'crc32': zlib.crc32(data), 'last_id': self.last_id}
+
+        with self.lock.held():
+            self._rotate_backups()
+            _write_atomic(self.path, data)
+            _write_atomic(self.meta_path, json.dumps(meta).encode('utf-8'))
+            # The snapshot now holds every journaled change.
+            self._truncate_journal()
+            self.snapshot_stamp = _file_stamp(self.path)
+            self.journal_offset = 0
+            self.replaced = False
+
+    def _read_snapshot(self, path):
+        """Read and check one snapshot generation, raising ValueError if damaged"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        meta = self._read_meta(path)
+
+        intact = (meta is not None
+                  and meta.get('size') == len(data)
+                  and meta.get('crc32') == zlib.crc32(data))
+        try:
+            snapshot = json.loads(data)
+            tracks = {k: Track.from_dict(v) for k, v in snapshot.items()}
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"Corrupt library snapshot {path}: {e}") from e
+        if not intact and meta is not None:
+            # A crash between the snapshot and meta renames leaves a complete
+            # file with stale meta; it parsed, so it is still usable.
+            print(f"Warning: checksum mismatch for {path}, snapshot parsed anyway")
+        return tracks
+
+    def load_from_file(self):
+        # Shared, so no writer swaps the snapshot or empties the journal
+        # between reading one and the other
+        with self.lock.held(exclusive=False):
+            self.replaced = False
+            self._shared = False
+            self.journal_entries = 0
+            self.recovered_from = None
+            self.last_id = self._stored_last_id()
+            self.snapshot_stamp = _file_stamp(self.path)
+            try:
+                self.tracks = self._read_snapshot(self.path)
+            except FileNotFoundError:
+                if os.path.exists(self._backup_path(1)):
+                    self.tracks = self._recover_from_backups()
+                else:
+                    self.tracks = {}
+            except ValueError:
+                self.tracks = self._recover_from_backups()
+            for track_id in self.tracks:
+                self._note_id(track_id)
+            self._replay_journal()
+
+    def _recover_from_backups(self):
+        generation = 0
+        while os.path.exists(self._backup_path(generation + 1)):
+            generation += 1
+            backup = self._backup_path(generation)
+            try:
+                tracks = self._read_snapshot(backup)
+            except (FileNotFoundError, ValueError):
+                continue
+            self.recovered_from = backup
+            return tracks
+        raise ValueError(f"Library snapshot {self.path} is corrupt and no backup is usable")
+
+
+class ArtistRegistry:
+    """Artist dimension table kept next to the tracks.
+
+    Each distinct artist (compared by folded name, so 'KARIK' is 'Karik')
+    gets a small integer ID and a posting list of its track IDs, which
+    makes "all tracks by X" O(result).
+    """
+
+    def __init__(self):
+        # artist_key -> artist ID; IDs are never reused
+        self.ids = {}
+        # artist ID -> display name, folded key and {track_id: None}
+        self.names = []
+        self.keys = []
+        self.postings = []
+        # track_id -> artist ID
+        self.track_artist = {}
+
+    def __len__(self):
+        return sum(1 for posting in self.postings if posting)
+
+    def artist_id(self, artist):
+        """Return the ID registered for ``artist`` or None"""
+        return self.ids.get(fold_text(artist))
+
+    def _register(self, track):
+        artist_id = self.ids.get(track.artist_key)
+        if artist_id is None:
+            artist_id = self.ids[track.artist_key] = len(self.names)
+            self.names.append(track.artist)
+            self.keys.append(track.artist_key)
+            self.postings.append({})
+        elif not self.postings[artist_id]:
+            # Back after all their tracks were removed; take the new spelling
+            self.names[artist_id] = track.artist
+        return artist_id
+
+    def add(self, track_id, track):
+        artist_id = self._register(track)
+        old = self.track_artist.get(track_id)
+        if old == artist_id:
+            return
+        if old is not None:
+            del self.postings[old][track_id]
+        self.track_artist[track_id] = artist_id
+        self.postings[artist_id][track_id] = None
+
+    def discard(self, track_id):
+        old = self.track_artist.pop(track_id, None)
+        if old is not None:
+            del self.postings[old][track_id]
+
+    def clear(self):
+        self.ids.clear()
+        self.names.clear()
+        self.keys.clear()
+        self.postings.clear()
+        self.track_artist.clear()
+
+    def tracks_by(self, artist):
+        artist_id = self.artist_id(artist)
+        return [] if artist_id is None else list(self.postings[artist_id])
+
+    def artists(self):
+        order = sorted((i for i, posting in enumerate(self.postings) if posting), key=self.keys.__getitem__)
+        return [(self.names[i], len(self.postings[i])) for i in order]
+
+
+class VideoIndex:
+    """Hash index from YouTube video ID to the tracks linking to it.
+
+    Makes the duplicate check when adding or importing a track O(1). A
+    video usually has one track, stored as a plain track ID; only
+    duplicated videos get a {track_id: None} dict.
+    """
+
+    def __init__(self):
+        self.videos = {}
+        # track_id -> video ID, to unlink a track after its URL changed
+        self.track_video = {}
+
+    def add(self, track_id, track):
+        video = track.video_id
+        old = self.track_video.get(track_id)
+        if old == video:
+            return
+        if old is not None:
+            self._unlink(old, track_id)
+        if video is None:
+            del self.track_video[track_id]
+            return
+        self.track_video[track_id] = video
+        current = self.videos.get(video)
+        if current is None:
+            self.videos[video] = track_id
+        elif isinstance(current, dict):
+            current[track_id] = None
+        else:
+            self.videos[video] = {current: None, track_id: None}
+
+    def _unlink(self, video, track_id):
+        current = self.videos[video]
+        if isinstance(current, dict):
+            del current[track_id]
+            if len(current) == 1:
+                self.videos[video] = next(iter(current))
+        else:
+            del self.videos[video]
+
+    def discard(self, track_id):
+        video = self.track_video.pop(track_id, None)
+        if video is not None:
+            self._unlink(video, track_id)
+
+    def clear(self):
+        self.videos.clear()
+        self.track_video.clear()
+
+    def tracks_for(self, video):
+        current = self.videos.get(video)
+        if current is None:
+            return []
+        return list(current) if isinstance(current, dict) else [current]
+
+    def duplicates(self):
+        return [list(ids) for ids in self.videos.values() if isinstance(ids, dict)]
+
+
+def _reads(method):
+    """Run a TrackLibrary query under the read lock"""
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with self.lock.reading():
+            return method(self, *args, **kwargs)
+    return locked
+
+
+class TracksView(Mapping):
+    """Read-only ``track_id -> Track`` view of a library.
+
+    Change tracks through TrackLibrary; items() and values() iterate a
+    snapshot, so other threads may write meanwhile.
+    """
+
+    def __init__(self, library):
+        self.library = library
+
+    def __getitem__(self, track_id):
+        return self.library.get_track(track_id)
+
+    def __contains__(self, track_id):
+        with self.library.lock.reading():
+            return track_id in self.library.backend.tracks
+
+    def __iter__(self):
+        with self.library.lock.reading():
+            track_ids = list(self.library.backend.tracks)
+        return iter(track_ids)
+
+    def __len__(self):
+        with self.library.lock.reading():
+            return len(self.library.backend.tracks)
+
+    def items(self):
+        return self.library.snapshot().items()
+
+    def values(self):
+        return self.library.snapshot().values()
+
+
+class TrackLibrary:
+    # How many distinct tracks recently_played() remembers
+    RECENT_PLAYS = 200
+    # Another process's changes beyond this many are announced as one 'reload'
+    EXTERNAL_EVENTS_MAX = 100
+
+    def __init__(self, path='library.json', journal=False, compact_every=1000,
+                 backups=0, backend=None, play_flush_interval=0, play_flush_size=100,
+                 history=None):
+        # Without an explicit backend the catalog lives in library.json.
+        if backend is None:
+            backend = JsonFileBackend(path, journal, compact_every, backups)
+        self.backend = backend
+        # Optional play_history.PlayHistory; record_play() logs to it
+        self.history = history
+        # Write-behind buffer for record_play(): track_id -> Track whose
+        # play count is ahead of storage. With a zero interval every play
+        # is written at once; otherwise a play may stay unsaved for up to
+        # play_flush_interval seconds (the durability window).
+        self.play_flush_interval = play_flush_interval
+        self.play_flush_size = play_flush_size
+        self.pending_plays = {}
+        # track_id -> plays in pending_plays not yet stored, so they can be
+        # carried over if another process changes the track meanwhile
+        self.pending_counts = {}
+        self.plays_since = None
+        self.listeners = []
+        # In-memory indexes kept up to date on every mutation; backends
+        # that can query their own storage (SQLite) don't need them.
+        self.search_index = SearchIndex() if backend.in_memory else None
+        self.artist_registry = ArtistRegistry() if backend.in_memory else None
+        self.video_index = VideoIndex() if backend.in_memory else None
+        # column -> SortIndex, for sorting the track list without a full sort
+        self.sort_indexes = {}
+        self.indexes = []
+        if backend.in_memory:
+            self.sort_indexes = {column: SortIndex(column) for column in StorageBackend.SORT_COLUMNS}
+            self.indexes = [self.search_index, self.artist_registry, self.video_index,
+                            *self.sort_indexes.values()]
+        # Sort indexes behind a sorted_view(); a background load keeps
+        # these merged per chunk and the rest once it finishes
+        self.viewed_sort_indexes = set()
+        # track_id -> None, least recently played first
+        self.recent_plays = OrderedDict()
+        # Worker threads may query while the Tk thread writes: queries
+        # share the lock, writes (and the indexes they update) take it
+        # alone. Tracks are replaced rather than modified, so one already
+        # handed out never changes.
+        self.lock = ReadWriteLock()
+
+    @property
+    def tracks(self):
+        """Read-only mapping of the catalog; see TracksView"""
+        return TracksView(self)
+
+    @tracks.setter
+    def tracks(self, tracks):
+        with self.lock.writing():
+            self.pending_plays.clear()
+            self.pending_counts.clear()
+            self.backend.replace(tracks)
+            self._rebuild_indexes()
+        self._notify('reload', None)
+
+    def snapshot(self):
+        """Return the catalog as a read-only mapping that never changes.
+
+        Iterate it from any thread without blocking writers. With the JSON
+        backend it costs nothing up front; the next write copies the dict
+        (not the tracks) instead.
+        """
+        with self.lock.reading():
+            tracks = self.backend.snapshot()
+            if self.pending_plays and not self.backend.in_memory:
+                tracks = {**tracks, **self.pending_plays}
+        return MappingProxyType(tracks)
+
+    @_reads
+    def catalog_page(self, offset, limit):
+        """Return ``(track_ids, total)`` for one page in catalog order.
+
+        With the JSON backend every page until the next write slices the
+        same ID list, instead of walking the catalog up to ``offset``.
+        """
+        return self.backend.page_ids(offset, limit), len(self.backend.tracks)
+
+    def subscribe(self, listener):
+        """Call ``listener(event, track_id)`` after every change.
+
+        ``event`` is 'add', 'update' or 'remove'; 'reload' (with a None
+        track_id) means the whole catalog was replaced.
+        """
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
+
+    def _rebuild_indexes(self):
+        for index in self.indexes:
+            index.clear()
+        if self.indexes:
+            self._reindex(self.backend.iterate())
+
+    def _reindex(self, changes, sort_indexes=None):
+        """Apply ``(track_id, track)`` pairs to the indexes; None removes.
+
+        Sort indexes merge a whole batch at once, here under the write
+        lock, so queries under the read lock never change them. Only
+        ``sort_indexes`` are merged if given.
+        """
+        for track_id, track in changes:
+            if track is None:
+                for index in self.indexes:
+                    index.discard(track_id)
+            else:
+                for index in self.indexes:
+                    index.add(track_id, track)
+        for index in self.sort_indexes.values() if sort_indexes is None else sort_indexes:
+            index.merge_pending()
+
+    def _index(self, track_id, track):
+        self._reindex([(track_id, track)])
+
+    def _unindex(self, track_id):
+        self._reindex([(track_id, None)])
+
+    def _notify(self, event, track_id):
+        for listener in list(self.listeners):
+            listener(event, track_id)
+
+    def _drop_pending(self, track_id):
+        self.pending_plays.pop(track_id, None)
+        self.pending_counts.pop(track_id, None)
+
+    @contextmanager
+    def _writing(self):
+        """Hold the write locks with other processes' changes merged in"""
+        with self.lock.writing(), self.backend.write_lock():
+            self._merge_external(self.backend.refresh())
+            yield
+
+    def refresh(self):
+        """Pick up changes other processes saved; cheap when there are none.
+
+        Returns True if anything changed. Listeners hear about it as usual.
+        """
+        if not self.backend.changed_on_disk():
+            return False
+        with self.lock.writing():
+            return self._merge_external(self.backend.refresh())
+
+    def _merge_external(self, changes):
+        if changes is not None and not changes:
+            return False
+        # Buffered plays go on top of the other process's version of a track
+        changed = None if changes is None else {track_id for _, track_id in changes}
+        for track_id in list(self.pending_plays):
+            if changed is not None and track_id not in changed:
+                continue
+            track = self.backend.get(track_id)
+            if track is None:
+                self._drop_pending(track_id)
+            else:
+                track = track.copy()
+                track.play_count += self.pending_counts[track_id]
+                self.pending_plays[track_id] = track
+                self.backend.stage(track_id, track)
+        if changes is None or len(changes) > self.EXTERNAL_EVENTS_MAX:
+            self._rebuild_indexes()
+            self._notify('reload', None)
+            return True
+        for event, track_id in changes:
+            # None too if a later change in the batch removed it
+            track = None if event == 'remove' else self.backend.get(track_id)
+            if track is None:
+                self._unindex(track_id)
+            else:
+                self._index(track_id, track)
+            self._notify(event, track_id)
+        return True
+
+    @_reads
+    def get_track(self, track_id):
+        """Return a track by ID, raising KeyError if it does not exist"""
+        # A buffered play is newer than what the backend has stored
+        track = self.pending_plays.get(track_id) or self.backend.get(track_id)
+        if track is None:
+            raise KeyError(track_id)
+        return track
+
+    def allocate_id(self):
+        """Return a fresh track ID that no track has ever used"""
+        return self.allocate_ids(1)[0]
+
+    def allocate_ids(self, count):
+        """Reserve ``count`` fresh track IDs at once.
+
+        Another process may reserve the same IDs before they are used; to
+        add tracks, prefer add_new_track(s), which cannot race.
+        """
+        with self._writing():
+            return self.backend.allocate_ids(count)
+
+    def _check_new(self, track_ids):
+        for track_id in track_ids:
+            if self.backend.get(track_id) is not None:
+                raise ValueError(f"Track {track_id} already exists")
+
+    def add_track(self, track_id, track):
+        """Add a track under the given ID and persist it.
+
+        Raises ValueError if the ID is taken; use update_track() to change
+        an existing track.
+        """
+        with self._writing():
+            self._check_new([track_id])
+            self.backend.put(track_id, track)
+            self._index(track_id, track)
+        self._notify('add', track_id)
+
+    def add_new_track(self, track):
+        """Add a track under a fresh ID and return the ID.
+
+        The ID is allocated and used under one write lock, so another
+        process cannot take it in between.
+        """
+        with self._writing():
+            track_id = self.backend.allocate_ids(1)[0]
+            self.backend.put(track_id, track)
+            self._index(track_id, track)
+        self._notify('add', track_id)
+        return track_id
+
+    def add_tracks(self, items):
+        """Add many ``(track_id, track)`` pairs with a single write.
+
+        Listeners get one 'reload' instead of an 'add' per track. Raises
+        ValueError, adding nothing, if any ID is taken.
+        """
+        items = list(items)
+        with self._writing():
+            self._check_new(track_id for track_id, _ in items)
+            self._put_new(items)
+        self._notify('reload', None)
+
+    def add_new_tracks(self, tracks):
+        """Add many tracks under fresh IDs with a single write; return the IDs"""
+        tracks = list(tracks)
+        with self._writing():
+            track_ids = self.backend.allocate_ids(len(tracks))
+            self._put_new(list(zip(track_ids, tracks)))
+        self._notify('reload', None)
+        return track_ids
+
+    def _put_new(self, items):
+        self.backend.put_many(items)
+        self._reindex(items)
+
+    def update_track(self, track_id, **fields):
+        """Change fields of an existing track and persist it"""
+        with self._writing():
+            track = self.get_track(track_id).copy()
+            for key, value in fields.items():
+                if key not in Track.FIELDS:
+                    raise ValueError(f"Unknown track field: {key}")
+                setattr(track, key, value)
+            # Writes the buffered play count too
+            self._drop_pending(track_id)
+            self.backend.put(track_id, track)
+            self._index(track_id, track)
+        self._notify('update', track_id)
+        return track
+
+    def remove_track(self, track_id):
+        """Remove a track and persist the removal"""
+        with self._writing():
+            self.backend.delete(track_id)
+            self._drop_pending(track_id)
+            self._unindex(track_id)
+            self.recent_plays.pop(track_id, None)
+        self._notify('remove', track_id)
+
+    def record_play(self, track_id):
+        """Increment the play count of a track.
+
+        With a play_flush_interval the write is buffered; repeated plays of
+        a track are written once by the next flush_plays().
+        """
+        if self.play_flush_interval:
+            with self.lock.writing():
+                track = self.get_track(track_id).copy()
+                track.play_count += 1
+                if self.history is not None:
+                    self.history.record(track_id)
+                if not self.pending_plays:
+                    self.plays_since = time.monotonic()
+                self.pending_plays[track_id] = track
+                self.pending_counts[track_id] = self.pending_counts.get(track_id, 0) + 1
+                self.backend.stage(track_id, track)
+                self._played(track_id, track)
+            if self.play_flush_due():
+                self.flush_plays()
+        else:
+            with self._writing():
+                # Counted from the stored value, so no process's play is lost
+                track = self.get_track(track_id).copy()
+                track.play_count += 1
+                if self.history is not None:
+                    self.history.record(track_id)
+                self.backend.put(track_id, track)
+                self._played(track_id, track)
+            if self.history is not None:
+                self.history.flush()
+        self._notify('update', track_id)
+        return track
+
+    def _played(self, track_id, track):
+        self._index(track_id, track)
+        self.recent_plays[track_id] = None
+        self.recent_plays.move_to_end(track_id)
+        if len(self.recent_plays) > self.RECENT_PLAYS:
+            self.recent_plays.popitem(last=False)
+
+    def play_flush_due(self):
+        """True when buffered plays are due: the window passed or the buffer is full"""
+        if not self.pending_plays:
+            return False
+        return (len(self.pending_plays) >= self.play_flush_size
+                or time.monotonic() - self.plays_since >= self.play_flush_interval)
+
+    def flush_plays(self):
+        """Write every buffered play with one backend write"""
+        with self.lock.writing():
+            if self.history is not None:
+                self.history.flush()
+            if not self.pending_plays:
+                return
+            with self._writing():
+                pending, self.pending_plays = self.pending_plays, {}
+                counts, self.pending_counts = self.pending_counts, {}
+                try:
+                    self.backend.put_many(pending.items())
+                except Exception:
+                    # Keep them for the next attempt; newer plays win
+                    pending.update(self.pending_plays)
+                    self.pending_plays = pending
+                    for track_id, count in self.pending_counts.items():
+                        counts[track_id] = counts.get(track_id, 0) + count
+                    self.pending_counts = counts
+                    raise
+
+    def iterate(self):
+        """Yield ``(track_id, track)`` pairs without loading everything at once.
+
+        The pairs are the catalog as of the call, so writes from other
+        threads while it is consumed don't show up.
+        """
+        with self.lock.reading():
+            pairs = self.backend.iterate_snapshot()
+            pending = dict(self.pending_plays) if not self.backend.in_memory else None
+        if not pending:
+            return pairs
+        return ((track_id, pending.get(track_id, track)) for track_id, track in pairs)
+
+    @_reads
+    def search(self, query, limit=None, candidates=None):
+        """Return IDs of tracks matching every word of ``query``, best first.
+
+        ``candidates`` limits the search to a set of IDs, e.g. the results
+        of a query this one extends.
+        """
+        if self.search_index is not None:
+            return self.search_index.search(query, limit, candidates)
+        results = self.backend.search(query.strip())
+        if candidates is not None:
+            candidates = set(candidates)
+            results = [track_id for track_id in results if track_id in candidates]
+        return results if limit is None else results[:limit]
+
+    @_reads
+    def fuzzy_search(self, query, limit=10, max_distance=2):
+        """Return IDs of the ``limit`` tracks closest to ``query``.
+
+        Each word may be up to ``max_distance`` typos away from a word of
+        the name or artist (fewer for short words); closest come first.
+        """
+        if self.search_index is not None:
+            return self.search_index.fuzzy_search(query, limit, max_distance)
+        return self.backend.fuzzy_search(query, limit, max_distance)
+
+    @_reads
+    def tracks_by_artist(self, artist):
+        """Return IDs of every track by ``artist``, ignoring case and accents"""
+        if self.artist_registry is not None:
+            return self.artist_registry.tracks_by(artist)
+        return self.backend.tracks_by_artist(artist)
+
+    @_reads
+    def tracks_by_video(self, url):
+        """Return IDs of the tracks linking to the same YouTube video as ``url``"""
+        video = video_id(url)
+        if video is None:
+            return []
+        if self.video_index is not None:
+            return self.video_index.tracks_for(video)
+        return self.backend.tracks_by_video(video)
+
+    @_reads
+    def duplicate_videos(self):
+        """Return lists of track IDs that link to the same video"""
+        if self.video_index is not None:
+            return self.video_index.duplicates()
+        return self.backend.duplicate_videos()
+
+    @_reads
+    def artists(self):
+        """Return ``(artist, track count)`` pairs ordered by name"""
+        if self.artist_registry is not None:
+            return self.artist_registry.artists()
+        return self.backend.artists()
+
+    @_reads
+    def sorted_ids(self, column, reverse=False):
+        """Return all track IDs ordered by name, artist, rating or play_count"""
+        if column not in StorageBackend.SORT_COLUMNS:
+            raise ValueError(f"Cannot sort by {column}")
+        if column in self.sort_indexes:
+            return list(self.sort_indexes[column].view(reverse))
+        return self.backend.sorted_ids(column, reverse)
+
+    def sorted_view(self, column, reverse=False):
+        """Return a live sequence of track IDs sorted by ``column``.
+
+        The view follows every later change, so a track list showing it
+        only needs to redraw; it is for the thread that writes, others use
+        sorted_ids(). Returns None when the backend sorts by query
+        (SQLite); use sorted_ids() then.
+        """
+        if column not in StorageBackend.SORT_COLUMNS:
+            raise ValueError(f"Cannot sort by {column}")
+        index = self.sort_indexes.get(column)
+        if index is None:
+            return None
+        if index not in self.viewed_sort_indexes:
+            with self.lock.writing():
+                # A background load may have left it unmerged
+                index.merge_pending()
+                self.viewed_sort_indexes.add(index)
+        return index.view(reverse)
+
+    @_reads
+    def top_tracks(self, column='play_count', limit=50):
+        """Return IDs of the ``limit`` tracks with the highest rating or play_count.
+
+        Read off the front of the column's sort index, so a chart costs
+        O(limit) however large the catalog is.
+        """
+        if column not in StorageBackend.RANK_COLUMNS:
+            raise ValueError(f"Cannot rank by {column}")
+        index = self.sort_indexes.get(column)
+        if index is None:
+            return self.backend.top_ids(column, limit)
+        return index.view(reverse=True)[:limit]
+
+    @_reads
+    def top_rated_by_artist(self, artist, limit=10):
+        """Return IDs of ``artist``'s best-rated tracks, most played first on ties"""
+        if self.artist_registry is not None:
+            return _top_rated(self.artist_registry.tracks_by(artist), self.get_track, limit)
+        return self.backend.top_rated_by_artist(artist, limit)
+
+    @_reads
+    def recently_played(self, limit=50):
+        """Return IDs of the last ``limit`` distinct tracks played, newest first"""
+        recent = []
+        for track_id in reversed(self.recent_plays):
+            if self.backend.get(track_id) is not None:
+                recent.append(track_id)
+                if len(recent) == limit:
+                    break
+        return recent
+
+    @_reads
+    def plays_between(self, track_id, start, end):
+        """Plays of a track between two unix times, from the play history"""
+        if self.history is None:
+            return 0
+        return self.history.count(track_id, start, end)
+
+    @_reads
+    def trending(self, hours=24, limit=50):
+        """Return ``(track_id, plays)`` for the most played tracks of the last ``hours``"""
+        if self.history is None:
+            return []
+        trending = []
+        for track_id, plays in self.history.trending(hours):
+            # The history outlives removed tracks
+            if self.backend.get(track_id) is not None:
+                trending.append((track_id, plays))
+                if len(trending) == limit:
+                    break
+        return trending
+
+    def export(self, path, fmt=None):
+        """Stream the catalog to ``path`` as json, jsonl, csv, arrow or packed.
+
+        Unlike save_to_file() this writes compact output and never builds
+        the whole document in memory.
+        """
+        export_tracks(self.iterate(), path, fmt)
+
+    def compact(self):
+        with self._writing():
+            self.flush_plays()
+            self.backend.compact()
+
+    def close(self):
+        with self.lock.writing():
+            self.flush_plays()
+            if self.history is not None:
+                self.history.close()
+            self.backend.close()
+
+    def save_to_file(self):
+        with self._writing():
+            self.flush_plays()
+            self.backend.save()
+
+    def load_from_file(self):
+        with self.lock.writing():
+            self.flush_plays()
+            self._open_history()
+            self.backend.load()
+            self._rebuild_indexes()
+        self._notify('reload', None)
+
+    def _open_history(self):
+        if self.history is not None:
+            self.history.open()
+
+    def load_in_background(self, chunk_size=500):
+        """Read the catalog on a worker thread.
+
+        Returns a queue that receives lists of ``(track_id, track)`` pairs
+        (a None track marks a removal), then None once everything is read,
+        or the exception that stopped the load. Pass each chunk to
+        merge_loaded() and finally call finish_loading() on this thread.
+        """
+        with self.lock.writing():
+            self.flush_plays()
+            self._open_history()
+            self.backend.begin_load()
+            for index in self.indexes:
+                index.clear()
+        chunks = queue.Queue()
+
+        def worker():
+            try:
+                for chunk in self.backend.load_chunks(chunk_size):
+                    chunks.put(chunk)
+            except Exception as e:
+                chunks.put(e)
+                return
+            chunks.put(None)
+
+        threading.Thread(target=worker, daemon=True).start()
+        return chunks
+
+    def merge_loaded(self, chunk):
+        """Add a chunk produced by load_in_background() to the library.
 
-            
+        No events are sent for merged chunks; the caller already has them.
+        Sorted queries from other threads see the new tracks once the load
+        finishes; sorting every chunk in would make the load quadratic.
+        """
+        with self.lock.writing():
+            self.backend.merge(chunk)
+            self._reindex(chunk, self.viewed_sort_indexes)
 
+    def finish_loading(self):
+        with self.lock.writing():
+            self.backend.end_load()
+            for index in self.sort_indexes.values():
+                index.merge_pending()
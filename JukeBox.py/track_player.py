@@ -1,33 +1,66 @@
+import argparse
+import queue
 import tkinter as tk
 from tkinter import ttk
 import tkinter.font as tkfont
-import webbrowser
 import sv_ttk
 
 from track_library import TrackLibrary
+from sqlite_backend import SQLiteBackend
 from create_track_list import AddTrackWindow
 from create_track_list import FindTrackWindow
 from update_track import RemoveTrackWindow
 from update_track import UpdateTrackWindow
+from virtual_list import VirtualTrackList
+from charts import ChartsWindow
+from play_history import PlayHistory, history_dir
+from playback import PlaybackDispatcher, make_launcher
 
 class MainApplication:
-    def __init__(self):
+    # Treeview heading -> Track field it sorts by
+    SORT_FIELDS = {'Track': 'name', 'Artist': 'artist', 'Rating': 'rating', 'Play Count': 'play_count'}
+    # Plays are saved in batches; at most this many seconds of them can
+    # be lost if the app is killed
+    PLAY_FLUSH_SECONDS = 5
+
+    PLAYBACK_POLL_MS = 20
+
+    def __init__(self, backend=None, launcher=None):
         self.root = tk.Tk()
         self.root.title("🎵 JukeBox")
         self.root.geometry("1000x400")
         self.root.configure(bg='#1E1E1E')  # Dark background
         
-        self.library = TrackLibrary()
-        
-        try:
+        # Play events are logged next to the catalog, for charts over time
+        history = PlayHistory(history_dir(backend.path if backend is not None else 'library.json'))
+        self.library = TrackLibrary(journal=True, backups=3, backend=backend,
+                                    play_flush_interval=self.PLAY_FLUSH_SECONDS, history=history)
+        # Heading the list is sorted by (None = catalog order)
+        self.sort_column = None
+        self.sort_reverse = False
+        self.loading = False
+        self.loaded_ids = set()
+        if not self.library.backend.in_memory:
+            # SQLite reads rows on demand, so opening it is instant and
+            # the list can show the whole catalog right away.
             self.library.load_from_file()
-        except Exception as e:
-            print(f"Error loading library: {e}")
-            self.library.tracks = []
+        # Patch single rows when the library changes instead of rebuilding
+        self.library.subscribe(self.on_library_change)
+        # Opening a browser can take a while; it happens off the Tk thread
+        self.playback = PlaybackDispatcher(launcher or make_launcher('browser'))
+        self.playback_job = None
 
         sv_ttk.set_theme("dark")
         self.setup_gui()
 
+        if self.library.backend.in_memory:
+            # Show the window first and fill the track list as the catalog loads
+            self.load_queue = self.library.load_in_background(chunk_size=500)
+            self.loading = True
+            self.status_label.config(text="Loading library...")
+            self.root.after(0, self.poll_loading)
+        self.root.after(1000, self.flush_plays)
+
     def setup_gui(self):
         # Main container with padding
         main_container = ttk.Frame(self.root, padding="20 20 20 20")
@@ -53,7 +86,8 @@ class MainApplication:
             ("➕ ", self.open_add_track),
             ("➖ ", self.open_remove_track),
             ("🔍 ", self.open_find_track),
-            ("✏️ ", self.open_update_track)
+            ("✏️ ", self.open_update_track),
+            ("📊 ", self.open_charts)
         ]
 
         for text, command in action_buttons:
@@ -71,25 +105,25 @@ class MainApplication:
         track_frame.grid(row=0, column=1, sticky="nsew")
 
         columns = ('Track', 'Artist', 'Rating', 'Play Count')
-        self.track_tree = ttk.Treeview(
-            track_frame, 
-            columns=columns, 
-            show='headings', 
+        # Only the visible rows exist as Treeview items, so large
+        # libraries don't slow down every refresh
+        self.track_list = VirtualTrackList(
+            track_frame,
+            columns,
+            self.track_row_values,
             style='Custom.Treeview'
         )
+        self.track_tree = self.track_list.tree
         
-        # Configure column headings
+        # Configure column headings; clicking one sorts by it
         for col in columns:
-            self.track_tree.heading(col, text=col, anchor='center')
+            self.track_tree.heading(col, text=col, anchor='center',
+                                    command=lambda col=col: self.sort_by(col))
             self.track_tree.column(col, width=10, anchor='center')
 
-        # Add scrollbar
-        scrollbar = ttk.Scrollbar(track_frame, orient=tk.VERTICAL, command=self.track_tree.yview)
-        self.track_tree.configure(yscrollcommand=scrollbar.set)
-
         # Pack track list and scrollbar
         self.track_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.track_list.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
         # Bind double-click to play
         self.track_tree.bind('<Double-1>', self.play_selected_track)
@@ -123,41 +157,155 @@ class MainApplication:
         exit_btn = ttk.Button(
             status_frame,
             text="Exit",
-            command=self.root.destroy,
+            command=self.shutdown,
             style="Destructive.TButton"
         )
         exit_btn.pack(side=tk.RIGHT)
 
+    def track_row_values(self, track_id):
+        track = self.library.get_track(track_id)
+        return (track.name, track.artist, track.rating, track.play_count)
+
     def update_track_list(self):
-        for item in self.track_tree.get_children():
-            self.track_tree.delete(item)
-        
-        for track_id, track in self.library.tracks.items():
-            self.track_tree.insert(
-                '',
-                'end',
-                values=(track.name, track.artist, track.rating, track.play_count),
-                tags=(track_id,)
-            )
+        if self.sort_column is None:
+            self.track_list.set_rows(self.library.tracks)
+            return
+        field = self.SORT_FIELDS[self.sort_column]
+        view = self.library.sorted_view(field, self.sort_reverse)
+        if view is not None:
+            # Kept sorted by the library; the list only has to redraw
+            self.track_list.set_rows(view, live=True)
+        else:
+            self.track_list.set_rows(self.library.sorted_ids(field, self.sort_reverse))
+
+    def sort_by(self, column):
+        """Heading click: sort by ``column``, or flip the direction"""
+        if column == self.sort_column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column, self.sort_reverse = column, False
+        for col in self.SORT_FIELDS:
+            arrow = (" ▼" if self.sort_reverse else " ▲") if col == column else ""
+            self.track_tree.heading(col, text=col + arrow)
+        self.update_track_list()
+
+    def on_library_change(self, event, track_id):
+        if event == 'add' and self.loading:
+            # The loader may replay this add from the journal later
+            self.loaded_ids.add(track_id)
+        if self.sort_column is not None and event != 'reload':
+            # A change can move the row anywhere in the sorted order
+            if self.track_list.live:
+                if event == 'remove':
+                    self.track_list.remove_row(track_id)
+                else:
+                    self.track_list.render()
+            else:
+                self.update_track_list()
+        elif event == 'add':
+            self.track_list.append_rows([track_id])
+        elif event == 'update':
+            self.track_list.refresh_row(track_id)
+        elif event == 'remove':
+            self.track_list.remove_row(track_id)
+        else:
+            self.update_track_list()
+
+    def poll_loading(self):
+        try:
+            chunk = self.load_queue.get_nowait()
+        except queue.Empty:
+            self.root.after(20, self.poll_loading)
+            return
+
+        if chunk is None or isinstance(chunk, Exception):
+            self.library.finish_loading()
+            self.loading = False
+            self.loaded_ids = set()
+            if isinstance(chunk, Exception):
+                print(f"Error loading library: {chunk}")
+                self.status_label.config(text=f"Error loading library: {chunk}")
+            elif self.library.backend.recovered_from:
+                self.status_label.config(
+                    text=f"Library restored from backup {self.library.backend.recovered_from}"
+                )
+            else:
+                self.status_label.config(text="Ready to rock your music library! 🎧")
+            return
+
+        # Journal replays can change or remove rows already shown;
+        # new_ids keeps the order of the rows still to append
+        new_ids = {}
+        removed = []
+        updated = []
+        for track_id, track in chunk:
+            if track is None:
+                if track_id in new_ids:
+                    # Added earlier in this chunk, not shown yet
+                    del new_ids[track_id]
+                elif track_id in self.loaded_ids:
+                    self.loaded_ids.discard(track_id)
+                    removed.append(track_id)
+            elif track_id in self.loaded_ids:
+                updated.append(track_id)
+            else:
+                new_ids[track_id] = None
+        self.loaded_ids.update(new_ids)
+        self.library.merge_loaded(chunk)
+        if self.track_list.live:
+            # The sorted view already holds the new tracks, possibly on screen
+            self.track_list.render()
+        else:
+            for track_id in removed:
+                self.track_list.remove_row(track_id)
+            self.track_list.append_rows(new_ids)
+            for track_id in updated:
+                self.track_list.refresh_row(track_id)
+        self.status_label.config(text=f"Loading library... {len(self.library.tracks)} tracks")
+        # One chunk per event-loop turn keeps the window responsive
+        self.root.after(1, self.poll_loading)
+
+    def flush_plays(self):
+        # Saves plays once the durability window has passed, even if no
+        # further play comes along to trigger it
+        self.root.after(1000, self.flush_plays)
+        if self.library.play_flush_due():
+            self.library.flush_plays()
+        # Shows changes saved by another JukeBox or a script; two stat()
+        # calls when there are none
+        if not self.loading:
+            self.library.refresh()
 
     def play_selected_track(self, event):
         # Check if a track is selected
-        if not self.track_tree.selection():
+        track_id = self.track_list.selected_track_id()
+        if track_id is None:
             return
         
-        selected_item = self.track_tree.selection()[0]
-        track_id = self.track_tree.item(selected_item, "tags")[0]
-        track = self.library.tracks[track_id]
-        
-        track.play_count += 1
-        self.update_track_list()
-        webbrowser.open(track.youtube_url)
-        self.status_label.config(text=f"Playing: {track.name} by {track.artist}")
+        track = self.library.record_play(track_id)
+        self.playback.play(track_id, track.youtube_url)
+        self.status_label.config(text=f"Starting: {track.name} by {track.artist}...")
+        if self.playback_job is None:
+            self.playback_job = self.root.after(self.PLAYBACK_POLL_MS, self.poll_playback)
+
+    def poll_playback(self):
+        self.playback_job = None
+        # Checked first: once idle, every result is already queued
+        busy = self.playback.busy()
+        for track_id, url, error, seconds in self.playback.poll():
+            track = self.library.tracks.get(track_id)
+            name = f"{track.name} by {track.artist}" if track is not None else url
+            if error is None:
+                self.status_label.config(text=f"Playing: {name}")
+            else:
+                print(f"Error playing {url}: {error}")
+                self.status_label.config(text=f"Could not play {name}: {error}")
+        if busy:
+            self.playback_job = self.root.after(self.PLAYBACK_POLL_MS, self.poll_playback)
 
     def open_add_track(self):
         add_window = AddTrackWindow(self.root, self.library)
-        self.root.wait_window(add_window)
-        self.update_track_list()
+        self.root.wait_window(add_window.window)
         self.status_label.config(text="Track added successfully!")
 
     def open_find_track(self):
@@ -166,19 +314,32 @@ class MainApplication:
 
     def open_remove_track(self):
         remove_window = RemoveTrackWindow(self.root, self.library)
-        self.root.wait_window(remove_window)
-        self.update_track_list()
+        self.root.wait_window(remove_window.window)
         self.status_label.config(text="Track removed successfully!")
 
     def open_update_track(self):
         update_window = UpdateTrackWindow(self.root, self.library)
-        self.root.wait_window(update_window)
-        self.update_track_list()
+        self.root.wait_window(update_window.window)
         self.status_label.config(text="Track updated successfully!")
 
+    def open_charts(self):
+        ChartsWindow(self.root, self.library)
+        self.status_label.config(text="Showing charts")
+
+    def shutdown(self):
+        self.playback.close()
+        self.library.close()
+        self.root.destroy()
+
     def run(self):
+        self.root.protocol("WM_DELETE_WINDOW", self.shutdown)
         self.root.mainloop()
 
 if __name__ == "__main__":
-    app = MainApplication()
+    parser = argparse.ArgumentParser(description="JukeBox music library")
+    parser.add_argument("--db", help="use a SQLite library at this path instead of library.json")
+    parser.add_argument("--player", default="browser",
+                        help="'browser' (default) or a player command such as \"mpv --no-video\"")
+    args = parser.parse_args()
+    app = MainApplication(SQLiteBackend(args.db) if args.db else None, make_launcher(args.player))
     app.run()
\ No newline at end of file
@@ -5,8 +5,18 @@ import tkinter.scrolledtext as tkst
 import sv_ttk
 
 from track_library import Track
+from validation import validate_fields
 
 class UpdateTrackWindow:
+    PLACEHOLDERS = {
+        "track_id": "Enter the ID of the track to update",
+        "name": "Enter new track name",
+        "artist": "Enter new artist name",
+        "url": "Enter new YouTube URL",
+        "rating": "Enter new rating between 0-5"
+    }
+    PLACEHOLDER_TEXTS = frozenset(PLACEHOLDERS.values())
+
     def __init__(self, parent, library):
         self.window = tk.Toplevel(parent)
         self.window.title("🔧 Update Track")
@@ -36,15 +46,15 @@ class UpdateTrackWindow:
 
         # Input fields with improved layout
         fields = [
-            ("Track ID:", "track_id", "Enter the ID of the track to update"),
-            ("New Track Name:", "name", "Enter new track name"),
-            ("New Artist:", "artist", "Enter new artist name"),
-            ("New YouTube URL:", "url", "Enter new YouTube URL"),
-            ("New Rating (0-5):", "rating", "Enter new rating between 0-5")
+            ("Track ID:", "track_id"),
+            ("New Track Name:", "name"),
+            ("New Artist:", "artist"),
+            ("New YouTube URL:", "url"),
+            ("New Rating (0-5):", "rating")
         ]
 
         self.entries = {}
-        for label, key, placeholder in fields:
+        for label, key in fields:
             # Field container
             field_container = ttk.Frame(input_frame)
             field_container.pack(fill=tk.X, pady=5)
@@ -60,7 +70,7 @@ class UpdateTrackWindow:
             # Entry with placeholder
             entry = ttk.Entry(field_container, width=40)
             entry.pack(side=tk.LEFT, expand=True, fill=tk.X)
-            entry.insert(0, placeholder)
+            entry.insert(0, self.PLACEHOLDERS[key])
             entry.bind('<FocusIn>', lambda e, entry=entry: self.on_entry_click(e, entry))
             entry.bind('<FocusOut>', lambda e, entry=entry: self.on_entry_leave(e, entry))
             
@@ -77,25 +87,15 @@ class UpdateTrackWindow:
 
     def on_entry_click(self, event, entry):
         """Remove placeholder text when entry is clicked"""
-        if entry.get() in ["Enter the ID of the track to update", 
-                            "Enter new track name", 
-                            "Enter new artist name", 
-                            "Enter new YouTube URL", 
-                            "Enter new rating between 0-5"]:
+        if entry.get() in self.PLACEHOLDER_TEXTS:
             entry.delete(0, tk.END)
             entry.config(foreground='white')
 
     def on_entry_leave(self, event, entry):
         """Restore placeholder if no text is entered"""
         if entry.get().strip() == "":
-            default_placeholders = {
-                "track_id": "Enter the ID of the track to update",
-                "name": "Enter new track name",
-                "artist": "Enter new artist name",
-                "url": "Enter new YouTube URL",
-                "rating": "Enter new rating between 0-5"
-            }
-            entry.insert(0, default_placeholders[entry.cget('name')])
+            key = [k for k, v in self.entries.items() if v == entry][0]
+            entry.insert(0, self.PLACEHOLDERS[key])
             entry.config(foreground='gray')
 
     def update_track(self):
@@ -108,8 +108,6 @@ class UpdateTrackWindow:
             messagebox.showerror("Error", "Track ID is invalid.")
             return
 
-        track = self.library.tracks[track_id]
-
             # Update fields that are not empty or placeholders
         fields = {
                 "name": self.entries["name"].get().strip(),
@@ -117,25 +115,18 @@ class UpdateTrackWindow:
                 "url": self.entries["url"].get().strip(),
                 "rating": self.entries["rating"].get().strip()
             }
+        # Only fields that were filled in are changed
+        fields = {key: value for key, value in fields.items()
+                  if value and value not in self.PLACEHOLDER_TEXTS}
 
-        # Update name if provided and not a placeholder
-        if fields["name"] and not fields["name"].startswith("Enter new track name"):
-            track.name = fields["name"]
-
-        # Update artist if provided and not a placeholder
-        if fields["artist"] and not fields["artist"].startswith("Enter new artist name"):
-            track.artist = fields["artist"]
+        changes = {}
 
-        # Update URL if provided and not a placeholder
-        if fields["url"] and not fields["url"].startswith("Enter new YouTube URL"):
-            track.youtube_url = fields["url"]
-
-        # Update rating if provided, valid, and not a placeholder
-        if fields["rating"] and not fields["rating"].startswith("Enter new rating between 0-5"):
+        # Update rating if provided and valid
+        if "rating" in fields:
             try:
-                rating = int(fields["rating"])
+                rating = int(fields.pop("rating"))
                 if 0 <= rating <= 5:
-                    track.rating = rating
+                    changes["rating"] = rating
                 else:
                     messagebox.showerror("Error", "Rating must be between 0 and 5!")
                     return
@@ -143,8 +134,17 @@ class UpdateTrackWindow:
                 messagebox.showerror("Error", "Rating must be a number!")
                 return
 
-        # Save updated library
-        self.library.save_to_file()
+        # Name, artist and URL follow the same rules as adding a track
+        errors = validate_fields(fields)
+        if errors:
+            messagebox.showerror("Error", "\n".join(errors))
+            return
+        if "url" in fields:
+            fields["youtube_url"] = fields.pop("url")
+        changes.update(fields)
+
+        # Apply the changes and save the updated library
+        self.library.update_track(track_id, **changes)
         
         # Show success message
         messagebox.showinfo("Success", f"Track {track_id} updated successfully")
@@ -223,11 +223,8 @@ class RemoveTrackWindow:
 
         # Check if track ID exists
         if track_id in self.library.tracks:
-            # Remove the track
-            del self.library.tracks[track_id]
-            
-            # Save updated library
-            self.library.save_to_file()
+            # Remove the track and save the updated library
+            self.library.remove_track(track_id)
             
             # Show success message                             
             messagebox.showinfo("Success", f"Track {track_id} removed successfully")
@@ -0,0 +1,100 @@
+import re
+
+# Compiled once at import; matched on every keystroke and imported row
+YOUTUBE_URL = re.compile(
+    r'(https?://)?(www\.)?(youtube|youtu|youtube-nocookie)\.(com|be)/(watch\?v=|embed/|v/|.+\?v=)?([^&=%\?]{11})'
+)
+# Only the forms that name a video; the ID is exactly 11 URL-safe characters.
+# Channel, handle and playlist URLs pass YOUTUBE_URL but have no video ID.
+VIDEO_URL = re.compile(
+    r'(?:https?://)?(?:www\.|m\.)?(?:'
+    r'(?:youtube|youtube-nocookie)\.com/(?:watch\?(?:[^#]*&)?v=|embed/|v/|shorts/)'
+    r'|youtu\.be/'
+    r')([A-Za-z0-9_-]{11})(?![A-Za-z0-9_-])'
+)
+# Ratings as typed; anything else goes through int()
+VALID_RATINGS = frozenset('012345')
+NO_ERRORS = ()
+
+
+def validate_name(name):
+    """Validate track name"""
+    if len(name.strip()) < 2:
+        return "Name too short"
+    return None
+
+
+def validate_artist(artist):
+    """Validate artist name"""
+    if len(artist.strip()) < 2:
+        return "Artist name too short"
+    return None
+
+
+def validate_url(url):
+    """Validate YouTube URL"""
+    if not YOUTUBE_URL.match(url):
+        return "Invalid YouTube URL"
+    return None
+
+
+def video_id(url):
+    """The 11-character video ID of a YouTube URL, or None if it isn't one.
+
+    youtu.be/ID?si=..., youtube.com/watch?v=ID, youtube.com/embed/ID and
+    youtube.com/shorts/ID all give the same ID.
+    """
+    match = VIDEO_URL.match(url)
+    return match.group(1) if match else None
+
+
+def validate_rating(rating):
+    """Validate rating"""
+    if rating in VALID_RATINGS:
+        return None
+    try:
+        rating = int(rating)
+        if rating < 0 or rating > 5:
+            return "Rating must be between 0-5"
+    except ValueError:
+        return "Rating must be a number"
+    return None
+
+
+# Form field -> validator; "url" is what the windows call youtube_url
+VALIDATORS = {
+    'name': validate_name,
+    'artist': validate_artist,
+    'url': validate_url,
+    'youtube_url': validate_url,
+    'rating': validate_rating,
+}
+
+
+def validate_fields(fields):
+    """Return the errors for a dict of field values, checking only the fields given"""
+    return [error for error in (VALIDATORS[key](value) for key, value in fields.items()) if error]
+
+
+def validate_batch(rows):
+    """Validate many ``(name, artist, url, rating)`` rows in one pass.
+
+    Returns one tuple of error messages per row, empty when the row is
+    valid. Valid rows are recognised inline without a call per field.
+    """
+    match = YOUTUBE_URL.match
+    results = []
+    append = results.append
+    for name, artist, url, rating in rows:
+        if len(name.strip()) >= 2 and len(artist.strip()) >= 2 and rating in VALID_RATINGS and match(url):
+            append(NO_ERRORS)
+            continue
+        append(tuple(
+            error for error in (
+                validate_name(name),
+                validate_artist(artist),
+                validate_url(url),
+                validate_rating(rating),
+            ) if error
+        ))
+    return results
@@ -0,0 +1,176 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+class VirtualTrackList:
+    """A Treeview that only materializes the rows currently on screen.
+
+    The full ordering lives in ``rows`` (a list of track IDs); the tree
+    holds a small, reused pool of items for the visible window plus
+    ``overscan`` rows, so refreshing costs O(visible) Tk calls no matter
+    how long the list is.
+    """
+
+    def __init__(self, parent, columns, row_values, overscan=5, style=None):
+        # row_values(track_id) returns the tuple shown in the columns
+        self.row_values = row_values
+        self.overscan = overscan
+        self.rows = []
+        # True when rows is a live sequence the caller keeps current
+        self.live = False
+        self.first = 0
+        self.visible = 20
+        self.slots = []
+        # track ID <-> tree item for the rows currently materialized
+        self.item_for = {}
+        self.track_for = {}
+        self.selected_id = None
+
+        options = {'columns': columns, 'show': 'headings', 'selectmode': 'browse'}
+        if style:
+            options['style'] = style
+        self.tree = ttk.Treeview(parent, **options)
+        self.scrollbar = ttk.Scrollbar(parent, orient=tk.VERTICAL, command=self.on_scrollbar)
+
+        self.tree.bind('<Configure>', self.on_resize)
+        self.tree.bind('<<TreeviewSelect>>', self.on_select)
+        self.tree.bind('<MouseWheel>', self.on_mousewheel)
+        self.tree.bind('<Button-4>', lambda e: self.scroll(-3))
+        self.tree.bind('<Button-5>', lambda e: self.scroll(3))
+        self.tree.bind('<Up>', lambda e: self.move_selection(-1))
+        self.tree.bind('<Down>', lambda e: self.move_selection(1))
+        self.tree.bind('<Prior>', lambda e: self.move_selection(-self.visible))
+        self.tree.bind('<Next>', lambda e: self.move_selection(self.visible))
+        self.tree.bind('<Home>', lambda e: self.move_selection(-len(self.rows)))
+        self.tree.bind('<End>', lambda e: self.move_selection(len(self.rows)))
+
+    def set_rows(self, track_ids, live=False):
+        """Replace the whole ordering.
+
+        With ``live`` the sequence (e.g. a library sorted view) is used as
+        is and must support len, slicing and index(); it already reflects
+        changes, so the list only redraws.
+        """
+        self.rows = track_ids if live else list(track_ids)
+        self.live = live
+        self.render()
+
+    def append_rows(self, track_ids):
+        """Add rows at the end; only touches Tk if they land on screen"""
+        if not self.live:
+            self.rows.extend(track_ids)
+        if len(self.slots) < self.window_size():
+            self.render()
+        else:
+            self.update_scrollbar()
+
+    def remove_row(self, track_id):
+        if not self.live:
+            try:
+                self.rows.remove(track_id)
+            except ValueError:
+                return
+        if track_id == self.selected_id:
+            self.selected_id = None
+        self.render()
+
+    def refresh_row(self, track_id):
+        """Redraw one row in place if it is on screen"""
+        item = self.item_for.get(track_id)
+        if item is not None:
+            self.tree.item(item, values=self.row_values(track_id))
+
+    def selected_track_id(self):
+        return self.selected_id
+
+    def window_size(self):
+        return self.visible + self.overscan
+
+    def render(self):
+        self.first = max(0, min(self.first, len(self.rows) - self.visible))
+        window = self.rows[self.first:self.first + self.window_size()]
+
+        # Grow or shrink the pool of tree items to fit the window
+        while len(self.slots) < len(window):
+            self.slots.append(self.tree.insert('', 'end'))
+        while len(self.slots) > len(window):
+            self.tree.delete(self.slots.pop())
+
+        self.item_for = {}
+        self.track_for = {}
+        for item, track_id in zip(self.slots, window):
+            self.tree.item(item, values=self.row_values(track_id))
+            self.item_for[track_id] = item
+            self.track_for[item] = track_id
+
+        selected = self.item_for.get(self.selected_id)
+        if selected is not None:
+            self.tree.selection_set(selected)
+        elif self.tree.selection():
+            self.tree.selection_remove(*self.tree.selection())
+        # The tree itself never scrolls; we move the window instead
+        self.tree.yview_moveto(0)
+        self.update_scrollbar()
+
+    def update_scrollbar(self):
+        total = len(self.rows)
+        if total == 0:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self.first / total, min(1, (self.first + self.visible) / total))
+
+    def scroll(self, delta):
+        self.first += delta
+        self.render()
+        return "break"
+
+    def scroll_to(self, index):
+        """Scroll just enough to bring row ``index`` on screen"""
+        if index < self.first:
+            self.first = index
+        elif index >= self.first + self.visible:
+            self.first = index - self.visible + 1
+        self.render()
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.first = int(float(amount) * len(self.rows))
+        elif unit == 'pages':
+            self.first += int(amount) * self.visible
+        else:
+            self.first += int(amount)
+        self.render()
+
+    def on_mousewheel(self, event):
+        return self.scroll(-1 if event.delta > 0 else 1)
+
+    def on_select(self, event):
+        selection = self.tree.selection()
+        if selection and selection[0] in self.track_for:
+            self.selected_id = self.track_for[selection[0]]
+
+    def move_selection(self, delta):
+        if not self.rows:
+            return "break"
+        try:
+            index = self.rows.index(self.selected_id) + delta
+        except ValueError:
+            # Nothing selected yet: start from the top of the window
+            index = self.first
+        index = max(0, min(len(self.rows) - 1, index))
+        self.selected_id = self.rows[index]
+        self.scroll_to(index)
+        return "break"
+
+    def on_resize(self, event):
+        # Work out how many rows fit from the geometry of the first item
+        if not self.slots:
+            return
+        bbox = self.tree.bbox(self.slots[0])
+        if not bbox:
+            return
+        top, row_height = bbox[1], bbox[3]
+        visible = max(1, (event.height - top) // row_height)
+        if visible != self.visible:
+            self.visible = visible
+            self.render()